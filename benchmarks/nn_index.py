@@ -0,0 +1,213 @@
+#!/usr/bin/env python
+"""Benchmark the nearest neighbour indices that the planners use (see the
+--nn-index option of main.py).
+
+Each index is grown the same way as the tree of a planner, i.e., it is queried
+for the nearest configuration of a random sample before a new configuration is
+added, and then it is queried for the configurations within the radius of the
+new configuration. Another tree of the same size is then merged into it. Every
+exact index must produce exactly the same results as the brute force index, while
+the recall of the approximate ones (i.e. the fraction of their nearest
+configurations that are the true nearest ones, and the fraction of the true
+neighbours within the radius that they find) is reported instead. The cell size of
+the grid index is the radius, as the planners use.
+
+With an engine whose metric wraps around (e.g. klampt), the configurations are
+sampled from a full period of each dimension instead of the unit cube.
+
+Usage:
+  nn_index.py [options]
+  nn_index.py (-h | --help)
+
+Options:
+  -h --help              Show this screen.
+  -n --num-nodes=NUM     Number of configurations to add to each index.
+                         [default: 20000]
+  --dim=DIM              Number of dimensions of the configurations.
+                         [default: 2]
+  --radius=RADIUS        Radius of the neighbourhood queries, as a fraction of
+                         the side of the unit cube that the configurations are
+                         sampled from. [default: 0.02]
+  --seed=SEED            Random seed for generating the configurations.
+                         [default: 0]
+  --indices=INDICES      Comma separated indices to benchmark.
+                         [default: brute,kdtree,rtree,grid,rpforest]
+  --rpforest-trees=NUMS  Comma separated numbers of trees of the random
+                         projection forest index, each benchmarked separately.
+                         [default: 1,4,16]
+  --rpforest-leaf-size=SIZE
+                         Leaf size of the random projection forest index.
+                         [default: 32]
+  --engine=ENGINE        The engine whose metric the indices use.
+                         [default: image]
+"""
+import time
+from typing import Dict, List, Tuple
+
+import numpy as np
+from docopt import docopt
+
+from utils import nn_index
+
+
+def grow_index(
+    name: str,
+    configs: np.ndarray,
+    samples: np.ndarray,
+    radius: float,
+    other_configs: np.ndarray,
+    engine: str,
+    **options,
+) -> Dict:
+    """Grow an index like the tree of a planner, and time each kind of operation
+
+    :param name: the name of the index in :data:`utils.nn_index.NN_INDICES`
+    :param configs: the configurations to add, one per row
+    :param samples: the random samples to query the nearest configuration of
+    :param radius: the radius of the neighbourhood queries
+    :param other_configs: the configurations of the tree that is merged into it
+    :param engine: the engine whose metric the index uses
+    :param options: the other options of :func:`utils.nn_index.create_index`
+
+    :return: the elapsed time of each kind of operation, and the query results
+    """
+    index = nn_index.create_index(name, configs.shape[1], engine, radius, **options)
+    elapsed = dict(add=0.0, nearest=0.0, radius=0.0, merge=0.0)
+    nearest, neighbours = [], []
+    index.add(configs[0])
+    for pos, sample in zip(configs[1:], samples):
+        start_time = time.perf_counter()
+        nearest.append(index.nearest(sample))
+        elapsed["nearest"] += time.perf_counter() - start_time
+
+        start_time = time.perf_counter()
+        index.add(pos)
+        elapsed["add"] += time.perf_counter() - start_time
+
+        start_time = time.perf_counter()
+        neighbours.append(len(index.within_radius(pos, radius)))
+        elapsed["radius"] += time.perf_counter() - start_time
+
+    # merge another tree of the same size, as the disjoint trees of RRdT are
+    other = nn_index.create_index(name, configs.shape[1], engine, radius, **options)
+    other.add_many(other_configs)
+    start_time = time.perf_counter()
+    index.add_many(other.poses)
+    elapsed["merge"] = time.perf_counter() - start_time
+    merged = [index.nearest(sample) for sample in samples[:1000]]
+    return dict(elapsed=elapsed, results=(nearest, neighbours, merged))
+
+
+def recall(result: Dict, reference: Dict) -> Tuple[float, float]:
+    """Measure the recall of the results of an index
+
+    :param result: the results of the index
+    :param reference: the results of the brute force index
+
+    :return: the recall of the nearest configurations, and of the neighbours
+        within the radius
+    """
+    nearest, neighbours, merged = result["results"]
+    true_nearest, true_neighbours, true_merged = reference["results"]
+    nearest_recall = np.mean(
+        np.equal(nearest + merged, true_nearest + true_merged).astype(float)
+    )
+    # the neighbours that are found are always within the radius
+    return nearest_recall, np.sum(neighbours) / np.sum(true_neighbours)
+
+
+def benchmark(
+    num: int,
+    dim: int,
+    radius: float,
+    seed: int,
+    names: List[str],
+    engine: str,
+    rpforest_trees: List[int],
+    rpforest_leaf_size: int,
+):
+    """Benchmark the given indices
+
+    :param num: the number of configurations
+    :param dim: the number of dimensions of the configurations
+    :param radius: the radius of the neighbourhood queries
+    :param seed: the random seed
+    :param names: the names of the indices to benchmark
+    :param engine: the engine whose metric the indices use
+    :param rpforest_trees: the numbers of trees of the random projection forest
+        index to benchmark
+    :param rpforest_leaf_size: the leaf size of the random projection forest index
+
+    """
+    rng = np.random.default_rng(seed)
+    configs = rng.uniform(size=(num, dim))
+    samples = rng.uniform(size=(num - 1, dim))
+    other_configs = rng.uniform(size=(num, dim))
+    period = nn_index.ENGINE_PERIODS.get(engine)
+    if period is not None:
+        # a full period of angles around zero
+        configs, samples, other_configs = (
+            (x - 0.5) * period for x in (configs, samples, other_configs)
+        )
+        radius *= period
+
+    reference = grow_index("brute", configs, samples, radius, other_configs, engine)
+    mean_neighbours = np.mean(reference["results"][1])
+    print(
+        f"{num} configurations in {dim}D "
+        f"({mean_neighbours:.1f} neighbours within the radius on average)"
+    )
+    print(
+        f"  {'index':<12} {'add':>10} {'nearest':>10} {'radius':>10} {'merge':>10}"
+        f" {'recall (nearest / radius)':>26}"
+    )
+    runs = []
+    for name in names:
+        if name == "rpforest":
+            runs.extend(
+                (
+                    f"{name}/{num_trees}",
+                    name,
+                    dict(num_trees=num_trees, leaf_size=rpforest_leaf_size),
+                )
+                for num_trees in rpforest_trees
+            )
+        else:
+            runs.append((name, name, {}))
+    for label, name, options in runs:
+        if name == "brute":
+            result = reference
+        else:
+            result = grow_index(
+                name, configs, samples, radius, other_configs, engine, **options
+            )
+        if (
+            name not in nn_index.APPROXIMATE_NN_INDICES
+            and result["results"] != reference["results"]
+        ):
+            raise RuntimeError(f"Index '{name}' disagrees with the brute force index")
+        elapsed = result["elapsed"]
+        nearest_recall, radius_recall = recall(result, reference)
+        print(
+            f"  {label:<12} "
+            + " ".join(
+                f"{elapsed[op] * 1e6 / num:7.1f} us"
+                for op in ("add", "nearest", "radius")
+            )
+            + f" {elapsed['merge'] * 1e3:7.1f} ms"
+            + f" {nearest_recall:15.3f} / {radius_recall:.3f}"
+        )
+
+
+if __name__ == "__main__":
+    args = docopt(__doc__)
+    benchmark(
+        num=int(args["--num-nodes"]),
+        dim=int(args["--dim"]),
+        radius=float(args["--radius"]),
+        seed=int(args["--seed"]),
+        names=args["--indices"].split(","),
+        engine=args["--engine"],
+        rpforest_trees=list(map(int, args["--rpforest-trees"].split(","))),
+        rpforest_leaf_size=int(args["--rpforest-leaf-size"]),
+    )
@@ -0,0 +1,152 @@
+#!/usr/bin/env python
+"""Benchmark the visibility test of the image space collision checker.
+
+The original per-pixel Bresenham walk is used as the reference, and every
+benchmarked method must produce exactly the same results as the reference.
+The collision checker is benchmarked with each of the given combinations of
+acceleration structures (see the --cc-accel option of main.py).
+
+Usage:
+  visibility.py [<MAP>...] [options]
+  visibility.py (-h | --help)
+
+Options:
+  -h --help              Show this screen.
+  -n --num-edges=NUM     Number of random edges to check per map.
+                         [default: 20000]
+  --max-length=LENGTH    Maximum length of each random edge.
+                         [default: 50]
+  --seed=SEED            Random seed for generating the edges.
+                         [default: 0]
+  --accel=ACCEL          Semicolon separated combinations of acceleration
+                         structures to benchmark.
+                         [default: none;clearance;pyramid;sat;clearance,pyramid]
+"""
+import time
+from typing import Callable, List, Tuple
+
+import numpy as np
+from docopt import docopt
+
+from collisionChecker import ImgCollisionChecker
+from utils.common import MagicDict, Stats
+
+DEFAULT_MAPS = ["maps/intel_lab.png", "maps/maze1.png"]
+
+
+def visible_pixel_loop(cc: ImgCollisionChecker, pos1: np.ndarray, pos2: np.ndarray):
+    """The original visibility test that checks each pixel with a python loop
+
+    :param cc: the collision checker to check against
+    :param pos1: the starting configuration of the line
+    :param pos2: the target configuration of the line
+
+    """
+    try:
+        for p in cc.get_line(pos1, pos2):
+            if not cc.feasible(p, save_stats=False):
+                return False
+    except ValueError:
+        return False
+    return True
+
+
+def visible_pyramid(cc: ImgCollisionChecker, pos1: np.ndarray, pos2: np.ndarray):
+    """The visibility test that only descends the occupancy pyramid, for lines that
+    are within the image.
+
+    :param cc: the collision checker to check against
+    :param pos1: the starting configuration of the line
+    :param pos2: the target configuration of the line
+
+    """
+    x1, y1, x2, y2 = int(pos1[0]), int(pos1[1]), int(pos2[0]), int(pos2[1])
+    if cc._pyramid.contains(x1, y1) and cc._pyramid.contains(x2, y2):
+        return cc._pyramid.segment_free(x1, y1, x2, y2)
+    return visible_pixel_loop(cc, pos1, pos2)
+
+
+def random_edges(
+    cc: ImgCollisionChecker, num: int, max_length: float, rng: np.random.Generator
+) -> List[Tuple[np.ndarray, np.ndarray]]:
+    """Generate random edges that start in free space, similar to how a planner
+    extends from an existing tree node.
+
+    :param cc: the collision checker of the map
+    :param num: the number of edges
+    :param max_length: the maximum length of each edge
+    :param rng: the random number generator
+
+    """
+    free_pixels = np.argwhere(cc.image.T == 1)
+    starts = free_pixels[rng.integers(len(free_pixels), size=num)]
+    starts = starts + rng.uniform(0, 1, size=(num, 2))
+    directions = rng.standard_normal((num, 2))
+    directions /= np.linalg.norm(directions, axis=1)[:, None]
+    ends = starts + directions * rng.uniform(0, max_length, size=(num, 1))
+    return list(zip(starts, ends))
+
+
+def time_method(method: Callable, edges: List[Tuple[np.ndarray, np.ndarray]]):
+    """Time the given method on all edges
+
+    :param method: the visibility method to benchmark
+    :param edges: the list of edges to check
+
+    :return: the elapsed time and the results
+    """
+    start_time = time.perf_counter()
+    results = [method(pos1, pos2) for pos1, pos2 in edges]
+    return time.perf_counter() - start_time, np.array(results)
+
+
+def benchmark_map(
+    map_fname: str, num: int, max_length: float, seed: int, accels: List[str]
+):
+    """Benchmark all methods on the given map
+
+    :param map_fname: the filename of the map
+    :param num: the number of edges
+    :param max_length: the maximum length of each edge
+    :param seed: the random seed
+    :param accels: the combinations of acceleration structures to benchmark
+
+    """
+    cc = ImgCollisionChecker(map_fname, stats=Stats(), args=MagicDict())
+    edges = random_edges(cc, num, max_length, np.random.default_rng(seed))
+
+    ref_time, ref_results = time_method(
+        lambda p1, p2: visible_pixel_loop(cc, p1, p2), edges
+    )
+    print(f"{map_fname} ({num} edges, {ref_results.mean():.1%} visible)")
+    print(f"  {'pixel loop':<20} {ref_time * 1e6 / num:8.2f} us/edge")
+
+    methods = {}
+    for accel in accels:
+        methods[accel] = ImgCollisionChecker(
+            map_fname, stats=Stats(), args=MagicDict(cc_accel=accel)
+        ).visible
+    methods["pyramid only"] = lambda p1, p2: visible_pyramid(cc, p1, p2)
+    for name, method in methods.items():
+        elapsed, results = time_method(method, edges)
+        if not np.array_equal(results, ref_results):
+            raise RuntimeError(
+                f"Method '{name}' disagrees with the pixel loop on "
+                f"{np.count_nonzero(results != ref_results)} edges"
+            )
+        print(
+            f"  {name:<20} {elapsed * 1e6 / num:8.2f} us/edge "
+            f"({ref_time / elapsed:.1f}x)"
+        )
+
+
+if __name__ == "__main__":
+    args = docopt(__doc__)
+    for fname in args["<MAP>"] or DEFAULT_MAPS:
+        benchmark_map(
+            fname,
+            num=int(args["--num-edges"]),
+            max_length=float(args["--max-length"]),
+            seed=int(args["--seed"]),
+            accels=args["--accel"].split(";"),
+        )
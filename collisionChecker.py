@@ -1,10 +1,932 @@
+import functools
+import logging
 import math
+import time
 import typing
 from abc import ABC, abstractmethod
+from collections import OrderedDict, defaultdict, deque
 
 import numpy as np
+from scipy import ndimage
+
+from utils import disk_cache, tiled_map
+from utils.common import Stats, MagicDict, LatencyHistograms
+
+LOGGER = logging.getLogger(__name__)
+
+# guards the comparison of clearance against floating point round-off
+CLEARANCE_TOLERANCE = 1e-3
+# lines with fewer pixels than this are faster to rasterise than to descend the
+# occupancy pyramid
+PYRAMID_MIN_LINE_LENGTH = 256
+# the clearance maps of the checkers saturate at this distance (in pixels), as
+# lines that need more clearance than that are long enough for the pyramid
+CLEARANCE_MAP_MAX = PYRAMID_MIN_LINE_LENGTH // 2
+# the number of pixels of each band of rows whose distance transform is computed at
+# once, which bounds the float64 and index intermediates of scipy
+CLEARANCE_BAND_PIXELS = 2 ** 22
+
+# The acceleration structures that image-based collision checkers could use to skip
+# checking each pixel of a line:
+# - clearance: accept lines that are far away from obstacles by a distance transform
+# - pyramid: descend a max-pooled occupancy pyramid for long lines
+# - sat: accept lines whose bounding box is free by a summed-area table
+CC_ACCELERATIONS = ("clearance", "pyramid", "sat")
+DEFAULT_CC_ACCELERATIONS = ("clearance", "pyramid")
+
+# The methods that the 4D robot arm engine could use to interpolate edges:
+# - bresenham: one configuration per pixel of the line between the two bases
+# - displacement: enough configurations such that no point of the arm moves more
+#   than a pixel between consecutive ones, tested in bisection order
+ARM_INTERPOLATIONS = ("bresenham", "displacement")
+# the number of configurations of an edge that are tested in the first batch, when
+# they are tested in bisection order (later batches grow geometrically)
+BISECTION_FIRST_BATCH_SIZE = 8
+
+# The methods that the Klampt engine could use to check edges:
+# - klampt: Klampt's own check, from one end of the edge to the other
+# - bisection: the midpoint first and then bisect recursively
+KLAMPT_EDGE_CHECKERS = ("klampt", "bisection")
+
+
+def parse_cc_accelerations(
+    accel: typing.Optional[typing.Union[str, typing.Sequence[str]]],
+    packed_map: bool = False,
+) -> typing.Tuple[str, ...]:
+    """Parse the acceleration structures to be used by a collision checker.
+
+    :param accel: either a comma separated string or a list of names from
+        :data:`CC_ACCELERATIONS`, where "none" disables all of them. Defaults to
+        :data:`DEFAULT_CC_ACCELERATIONS` when it is ``None``.
+    :param packed_map: whether the map is stored as a :class:`PackedOccupancy`,
+        where the default is no acceleration structure at all, as each of them
+        takes more memory than the packed map itself
+
+    :return: the tuple of acceleration structures
+    """
+    if accel is None:
+        return () if packed_map else DEFAULT_CC_ACCELERATIONS
+    if isinstance(accel, str):
+        accel = accel.split(",")
+    accel = tuple(a.strip().lower() for a in accel if a.strip().lower() != "none")
+    for a in accel:
+        if a not in CC_ACCELERATIONS:
+            raise ValueError(
+                f"Unrecognised acceleration '{a}', must be one of {CC_ACCELERATIONS}"
+            )
+    return accel
+
+
+def load_occupancy_image(img: typing.IO) -> np.ndarray:
+    """Load an image as a boolean occupancy grid, where only white pixels are free.
+    The pixels are compared against white directly, such that no floating point
+    copy of the image is ever created.
+
+    :param img: a file-like object (e.g. a filename) for the image
+
+    :return: the occupancy grid where free pixels are True, indexed as ``[x, y]``
+        because pygame has a different coordinate system than matplotlib matrix
+    """
+    from PIL import Image
+
+    image = Image.open(img).convert("L")
+    return (np.asarray(image) == 255).T
+
+
+def load_occupancy_map(
+    img: typing.IO,
+) -> typing.Union[np.ndarray, tiled_map.TiledOccupancy]:
+    """Load the occupancy grid of a map, which is either an image (see
+    :func:`load_occupancy_image`) or the folder of a tiled map (see
+    :class:`utils.tiled_map.TiledOccupancy`), whose tiles are memory-mapped
+    instead of being loaded into memory.
+
+    :param img: a file-like object (e.g. a filename) for the image, or the folder
+        of a tiled map
+
+    :return: the occupancy grid where free pixels are True, indexed as ``[x, y]``
+    """
+    if tiled_map.is_tiled_map(img):
+        return tiled_map.TiledOccupancy(img)
+    return load_occupancy_image(img)
+
+
+class PackedOccupancy:
+    """A boolean occupancy grid that stores each pixel as a single bit, i.e., 8 times
+    smaller than a ``bool`` array. The pixels are packed along the second axis, such
+    that each row ``[x, :]`` can be unpacked quickly by :meth:`row`.
+
+    It supports the subset of array indexing that the collision checkers use, i.e.,
+    indexing with a pair of integers or a pair of integer arrays, where negative
+    indices wrap around.
+
+    :param free: the boolean occupancy grid where free pixels are True
+    """
+
+    def __init__(self, free: np.ndarray):
+        self.shape = free.shape
+        self.dtype = np.dtype(bool)
+        self._packed = np.packbits(free, axis=1)
+
+    @property
+    def nbytes(self) -> int:
+        """The number of bytes that store the occupancy grid"""
+        return self._packed.nbytes
+
+    def row(self, x: int) -> np.ndarray:
+        """Unpack one row of the occupancy grid
+
+        :param x: the first pixel coordinate of the row
+
+        :return: the boolean row ``[x, :]``
+        """
+        return np.unpackbits(self._packed[x], count=self.shape[1]).view(bool)
+
+    def unpack(self) -> np.ndarray:
+        """Unpack the whole occupancy grid
+
+        :return: the boolean occupancy grid where free pixels are True
+        """
+        return np.unpackbits(self._packed, axis=1, count=self.shape[1]).view(bool)
+
+    def __array__(self, dtype=None):
+        free = self.unpack()
+        return free if dtype is None else free.astype(dtype)
+
+    def __getitem__(self, index):
+        x, y = index
+        y = np.asarray(y)
+        h = self.shape[1]
+        if ((y < -h) | (y >= h)).any():
+            raise IndexError(f"index out of bounds for axis 1 with size {h}")
+        # the padding bits of the last byte must not be read by negative indices
+        y = np.where(y < 0, y + h, y)
+        return (self._packed[x, y >> 3] >> (7 - (y & 7)) & 1).astype(bool)
+
+
+def compute_clearance_map(
+    img: np.ndarray, max_clearance: typing.Optional[float] = None
+) -> np.ndarray:
+    """Compute the Euclidean distance transform of the free space, i.e., the
+    distance (in pixels) from each pixel to its closest obstacle pixel. Anything
+    outside of the image is treated as an obstacle.
+
+    With a maximum clearance, the distance transform is computed band by band of
+    rows (see :data:`CLEARANCE_BAND_PIXELS`), where each band also sees the rows
+    within the maximum clearance of it. Hence, the float64 and index intermediates
+    of :func:`scipy.ndimage.distance_transform_edt` are only as large as a band
+    rather than the whole image.
+
+    :param img: the image where free pixels have a value of 1
+    :param max_clearance: the distance that the clearance saturates at, or
+        ``None`` to transform the whole image at once
+
+    :return: the float32 clearance of each pixel, which is 0 for obstacle pixels
+    """
+    w, h = img.shape
+    clearance = np.empty((w, h), dtype=np.float32)
+    if max_clearance is None:
+        margin = band = max(w, 1)
+    else:
+        margin = int(math.ceil(max_clearance))
+        band = max(margin, CLEARANCE_BAND_PIXELS // max(h, 1), 1)
+    for start in range(0, w, band):
+        stop = min(start + band, w)
+        lo, hi = max(start - margin, 0), min(stop + margin, w)
+        # only the sides of the band that are the sides of the image are obstacles,
+        # the rows beyond the margin are farther away than the maximum clearance
+        top, bottom = int(lo == 0), int(hi == w)
+        free = np.pad(img[lo:hi] == 1, ((top, bottom), (1, 1)), constant_values=False)
+        clearance[start:stop] = ndimage.distance_transform_edt(free)[
+            start - lo + top : stop - lo + top, 1:-1
+        ]
+    if max_clearance is not None:
+        np.minimum(clearance, max_clearance, out=clearance)
+    return clearance
+
+
+# the number of maps whose clearance maps (and the number of dilated maps) that are
+# kept in memory, see :func:`dilate_occupancy`
+CLEARANCE_MAP_CACHE_SIZE = 2
+DILATED_MAP_CACHE_SIZE = 16
+_CLEARANCE_MAPS = OrderedDict()
+_DILATED_MAPS = OrderedDict()
+
+
+def _get_or_build(cache: OrderedDict, key, build: typing.Callable, max_size: int):
+    """Get an entry of an in-process LRU cache, or build it if it is not cached
+
+    :param cache: the cache, where the most recently used entry is the last one
+    :param key: the key of the entry
+    :param build: the function that builds the entry on a cache miss
+    :param max_size: the maximum number of entries in the cache
+
+    """
+    value = cache.get(key)
+    if value is None:
+        value = cache[key] = build()
+        while len(cache) > max_size:
+            cache.popitem(last=False)
+    else:
+        cache.move_to_end(key)
+    return value
+
+
+def dilate_occupancy(
+    free: np.ndarray,
+    radius: float,
+    cache_dir: typing.Optional[str] = None,
+    persist: bool = False,
+) -> np.ndarray:
+    """Dilate the obstacles of an occupancy grid by the radius of a disc robot,
+    i.e., a pixel stays free only if its distance to the closest obstacle pixel
+    (see :func:`compute_clearance_map`) is larger than the radius. A disc robot is
+    then checked as a point on the dilated map.
+
+    The dilated maps are kept in an in-process cache keyed by the content of the
+    map and the radius, and the distance transform of each map is only computed
+    once for all radii. Hence, checkers for robots of different sizes on the same
+    map reuse them.
+
+    :param free: the occupancy grid where free pixels are True
+    :param radius: the radius of the robot (in pixels)
+    :param cache_dir: the folder of the disk cache, which is used if ``persist``
+    :param persist: also load the dilated map from (or save it to) the disk cache
+
+    :return: the read-only dilated occupancy grid where free pixels are True
+    """
+    map_hash = disk_cache.hash_array(free)
+    key = dict(map=map_hash, robot_radius=float(radius))
+
+    def build():
+        clearance = _get_or_build(
+            _CLEARANCE_MAPS,
+            map_hash,
+            lambda: compute_clearance_map(free),
+            CLEARANCE_MAP_CACHE_SIZE,
+        )
+        return dict(free=clearance > radius)
+
+    def load_or_build():
+        if persist:
+            dilated = disk_cache.load_or_build(cache_dir, "dilated-map", key, build)
+        else:
+            dilated = build()
+        dilated = dilated["free"]
+        # shared by all checkers on the same map
+        dilated.flags.writeable = False
+        return dilated
+
+    return _get_or_build(
+        _DILATED_MAPS, (map_hash, float(radius)), load_or_build, DILATED_MAP_CACHE_SIZE
+    )
+
+
+def pixels_free(img: np.ndarray, xs: np.ndarray, ys: np.ndarray) -> np.ndarray:
+    """Check a batch of pixels of an image with one lookup. Pixels that are outside
+    of the image are treated as not free.
+
+    :param img: the image (or packed map), indexed as ``[x, y]``, where free pixels
+        are 1
+    :param xs: integer array of the first pixel coordinates
+    :param ys: integer array of the second pixel coordinates
+
+    :return: a boolean array that denotes whether each pixel is free
+    """
+    w, h = img.shape
+    # same bounds as indexing with a scalar, i.e., negative index wraps around
+    in_bound = (xs >= -w) & (xs < w) & (ys >= -h) & (ys < h)
+    free = np.zeros(xs.shape, dtype=bool)
+    free[in_bound] = img[xs[in_bound], ys[in_bound]] == 1
+    return free
+
+
+def compute_summed_area_table(obstacles: np.ndarray) -> np.ndarray:
+    """Compute the summed-area table (integral image) of the given obstacles, where
+    ``table[x, y]`` is the number of obstacle pixels in ``obstacles[:x, :y]``.
+
+    :param obstacles: the boolean image where obstacle pixels are True
+
+    :return: the table, which has one more row and column than the image
+    """
+    w, h = obstacles.shape
+    dtype = np.int32 if w * h < np.iinfo(np.int32).max else np.int64
+    table = np.zeros((w + 1, h + 1), dtype=dtype)
+    np.cumsum(np.cumsum(obstacles, axis=0, dtype=dtype), axis=1, out=table[1:, 1:])
+    return table
+
+
+def box_free_in_table(
+    table: np.ndarray, xmin: int, ymin: int, xmax: int, ymax: int
+) -> bool:
+    """Check if an axis-aligned box of pixels contains no obstacle, in constant
+    time. Anything outside of the image is treated as an obstacle.
+
+    :param table: the summed-area table from :func:`compute_summed_area_table`
+    :param xmin: the first coordinate of the lower corner (inclusive)
+    :param ymin: the second coordinate of the lower corner (inclusive)
+    :param xmax: the first coordinate of the upper corner (inclusive)
+    :param ymax: the second coordinate of the upper corner (inclusive)
+
+    """
+    if not (0 <= xmin <= xmax < table.shape[0] - 1):
+        return False
+    if not (0 <= ymin <= ymax < table.shape[1] - 1):
+        return False
+    return (
+        table[xmax + 1, ymax + 1]
+        - table[xmin, ymax + 1]
+        - table[xmax + 1, ymin]
+        + table[xmin, ymin]
+    ) == 0
+
+
+def segment_within_clearance(
+    clearance: np.ndarray, x1: int, y1: int, x2: int, y2: int, margin: float = 0
+) -> bool:
+    """Check if the Bresenham's line between two pixels is free by only looking at
+    the clearance of its two end pixels.
+
+    Every pixel of the line lies within half a pixel of the straight line, so each
+    of them is strictly closer to one of the end pixels than that end pixel's
+    closest obstacle, whenever the two clearance adds up to more than the length
+    of the line plus one.
+
+    :param clearance: the clearance map from :func:`compute_clearance_map`
+    :param x1: the first coordinate of the starting pixel
+    :param y1: the second coordinate of the starting pixel
+    :param x2: the first coordinate of the ending pixel
+    :param y2: the second coordinate of the ending pixel
+    :param margin: an extra distance that everything along the line should be
+        clear of
+
+    :return: whether the line is known to be free
+    """
+    w, h = clearance.shape
+    if not (0 <= x1 < w and 0 <= y1 < h and 0 <= x2 < w and 0 <= y2 < h):
+        return False
+    return clearance[x1, y1] + clearance[x2, y2] > (
+        math.hypot(x2 - x1, y2 - y1) + 1 + 2 * margin + CLEARANCE_TOLERANCE
+    )
+
+
+class OccupancyPyramid:
+    """A max-pooled pyramid of the obstacles of an image. Each level halves the
+    resolution of the previous one, where a block is marked as occupied if any of
+    its pixels is an obstacle, and as blocked if all of its pixels are obstacles.
+
+    A line segment is checked by recursively splitting its Bresenham's pixels,
+    where a part is accepted (or rejected) as soon as the coarsest blocks that cover
+    its bounding box are all free (or all blocked). Hence, the cost of a check
+    depends on how close the line is to obstacles rather than its length.
+
+    :param img: the image where free pixels have a value of 1
+    """
+
+    def __init__(self, img: np.ndarray):
+        occupied = blocked = img != 1
+        self.shape = occupied.shape
+        # Each level is stored as a flat bytes object with its row stride, which is
+        # much faster than numpy to index with scalars.
+        self.occupied = [(occupied.tobytes(), occupied.shape[1])]
+        self.blocked = [(blocked.tobytes(), blocked.shape[1])]
+        while max(occupied.shape) > 1:
+            occupied = self._pool(occupied, np.logical_or)
+            blocked = self._pool(blocked, np.logical_and)
+            self.occupied.append((occupied.tobytes(), occupied.shape[1]))
+            self.blocked.append((blocked.tobytes(), blocked.shape[1]))
+
+    @staticmethod
+    def _pool(level: np.ndarray, reduce_op: np.ufunc) -> np.ndarray:
+        """Reduce each 2x2 blocks of the given level into one.
+
+        :param level: the level to pool from
+        :param reduce_op: the reduction of each block
+
+        """
+        # anything outside of the image is an obstacle
+        w, h = level.shape
+        level = np.pad(level, ((0, w % 2), (0, h % 2)), constant_values=True)
+        level = level.reshape(level.shape[0] // 2, 2, level.shape[1] // 2, 2)
+        return reduce_op.reduce(reduce_op.reduce(level, axis=3), axis=1)
+
+    def contains(self, x: int, y: int) -> bool:
+        """Check if the given pixel is within the image
 
-from utils.common import Stats, MagicDict
+        :param x: the first coordinate of the pixel
+        :param y: the second coordinate of the pixel
+
+        """
+        return 0 <= x < self.shape[0] and 0 <= y < self.shape[1]
+
+    def segment_free(self, x1: int, y1: int, x2: int, y2: int) -> bool:
+        """Check if all pixels of the Bresenham's line between two pixels are free.
+        Both pixels must be within the image.
+
+        :param x1: the first coordinate of the starting pixel
+        :param y1: the second coordinate of the starting pixel
+        :param x2: the first coordinate of the ending pixel
+        :param y2: the second coordinate of the ending pixel
+
+        """
+        x1, y1, x2, y2 = int(x1), int(y1), int(x2), int(y2)
+        # the same parametrisation of the line as ImgCollisionChecker.get_line
+        is_steep = abs(y2 - y1) > abs(x2 - x1)
+        if is_steep:
+            x1, y1, x2, y2 = y1, x1, y2, x2
+        if x1 > x2:
+            x1, x2, y1, y2 = x2, x1, y2, y1
+        dx = x2 - x1
+        abs_dy = abs(y2 - y1)
+        ystep = 1 if y1 < y2 else -1
+        half_dx = dx // 2
+        divisor = max(dx, 1)
+
+        def pixel(i):
+            y = y1 - ystep * ((half_dx - i * abs_dy) // divisor)
+            return (y, x1 + i) if is_steep else (x1 + i, y)
+
+        pixels, stride = self.occupied[0]
+        # Bresenham's line is monotone in both coordinates, so the bounding box of
+        # any consecutive pixels is given by the first and the last one
+        parts = [(0, pixel(0), dx, pixel(dx))]
+        while parts:
+            i0, (ax, ay), i1, (bx, by) = parts.pop()
+            if i1 - i0 <= 1:
+                if pixels[ax * stride + ay] or pixels[bx * stride + by]:
+                    return False
+                continue
+            xmin, xmax = (ax, bx) if ax < bx else (bx, ax)
+            ymin, ymax = (ay, by) if ay < by else (by, ay)
+            # the coarsest level where the box spans at most two blocks per axis
+            lv = max(xmax - xmin, ymax - ymin).bit_length()
+            xmin, xmax, ymin, ymax = xmin >> lv, xmax >> lv, ymin >> lv, ymax >> lv
+            occupied, stride_lv = self.occupied[lv]
+            corners = (
+                xmin * stride_lv + ymin,
+                xmin * stride_lv + ymax,
+                xmax * stride_lv + ymin,
+                xmax * stride_lv + ymax,
+            )
+            if not any(occupied[c] for c in corners):
+                continue
+            blocked = self.blocked[lv][0]
+            if all(blocked[c] for c in corners):
+                return False
+            mid = (i0 + i1) // 2
+            mid_pixel = pixel(mid)
+            if pixels[mid_pixel[0] * stride + mid_pixel[1]]:
+                return False
+            parts.append((mid, mid_pixel, i1, (bx, by)))
+            parts.append((i0, (ax, ay), mid, mid_pixel))
+        return True
+
+
+def extract_obstacle_edges(free: np.ndarray) -> np.ndarray:
+    """Extract the boundary between the free and the occupied pixels of an image as
+    line segments, where each pixel ``(x, y)`` covers the unit square
+    ``[x, x + 1) x [y, y + 1)``. The outside of the image is treated as an
+    obstacle, hence the border of the image is part of the boundary.
+
+    The boundary consists of axis-aligned unit edges, and collinear edges that are
+    next to each other are merged into one segment. Hence, the polygons are
+    simplified without changing the free space. Diagonal or curved obstacles are
+    still staircases of pixels, whose number of segments grows with the resolution
+    of the image, unless they are simplified further by :func:`simplify_segments`.
+
+    :param free: the occupancy grid where free pixels are True, indexed as
+        ``[x, y]``
+
+    :return: an array of segments ``[x1, y1, x2, y2]``, one per row
+    """
+    obstacles = np.pad(~np.asarray(free, dtype=bool), 1, constant_values=True)
+    # vertical edges lie on x = i, between the pixels of column i - 1 and i
+    vertical = obstacles[:-1, 1:-1] != obstacles[1:, 1:-1]
+    # horizontal edges lie on y = j, between the pixels of row j - 1 and j
+    horizontal = obstacles[1:-1, :-1] != obstacles[1:-1, 1:]
+
+    def runs(mask):
+        # the maximal runs of consecutive edges along the second axis
+        steps = np.diff(np.pad(mask, ((0, 0), (1, 1))).astype(np.int8), axis=1)
+        lines, starts = np.nonzero(steps == 1)
+        _, ends = np.nonzero(steps == -1)
+        return lines, starts, ends
+
+    xs, y1s, y2s = runs(vertical)
+    ys, x1s, x2s = runs(horizontal.T)
+    return np.concatenate(
+        [
+            np.stack([xs, y1s, xs, y2s], axis=1),
+            np.stack([x1s, ys, x2s, ys], axis=1),
+        ]
+    ).astype(float)
+
+
+def chain_segments(segments: np.ndarray) -> typing.List[np.ndarray]:
+    """Join the line segments that share their ends into polylines, which are split
+    at the points where other than two segments meet. Closed loops start and end at
+    the same point.
+
+    :param segments: an array of segments ``[x1, y1, x2, y2]``, one per row
+
+    :return: the polylines, each as an array of points
+    """
+    segments = np.asarray(segments, dtype=float).reshape(-1, 4).tolist()
+    ends = defaultdict(list)
+    for i, (ax, ay, bx, by) in enumerate(segments):
+        ends[(ax, ay)].append(i)
+        ends[(bx, by)].append(i)
+    used = [False] * len(segments)
+
+    def trace(point, i):
+        points = [point]
+        while not used[i]:
+            used[i] = True
+            ax, ay, bx, by = segments[i]
+            point = (bx, by) if point == (ax, ay) else (ax, ay)
+            points.append(point)
+            if len(ends[point]) != 2:
+                break
+            i = ends[point][0] if ends[point][1] == i else ends[point][1]
+        return np.array(points)
+
+    polylines = []
+    # the open polylines start where other than two segments meet
+    for point, indices in ends.items():
+        if len(indices) != 2:
+            polylines += [trace(point, i) for i in indices if not used[i]]
+    # the rest are closed loops
+    for i, (ax, ay, _, _) in enumerate(segments):
+        if not used[i]:
+            polylines.append(trace((ax, ay), i))
+    return polylines
+
+
+def point_segment_distances(
+    points: np.ndarray, a: np.ndarray, b: np.ndarray
+) -> np.ndarray:
+    """Compute the distances from some points to the segment from ``a`` to ``b``
+
+    :param points: an array of points, one per row
+    :param a: the starting point of the segment
+    :param b: the ending point of the segment
+
+    :return: the distance of each point
+    """
+    ab = b - a
+    ap = points - a
+    length2 = ab @ ab
+    t = np.clip(ap @ ab / length2, 0, 1) if length2 > 0 else np.zeros(len(ap))
+    return np.linalg.norm(ap - t[:, np.newaxis] * ab, axis=1)
+
+
+def simplify_polyline(points: np.ndarray, tolerance: float) -> np.ndarray:
+    """Simplify a polyline with the Douglas-Peucker algorithm, which keeps a subset
+    of its points such that every removed point is within the tolerance of the
+    simplified segment that replaces it. Hence, every point along the polyline is
+    within the tolerance of the simplified one.
+
+    :param points: the points of the polyline, one per row
+    :param tolerance: the maximum distance of the removed points
+
+    :return: the kept points
+    """
+    keep = np.zeros(len(points), dtype=bool)
+    keep[[0, -1]] = True
+    spans = [(0, len(points) - 1)]
+    while spans:
+        i, j = spans.pop()
+        if j - i < 2:
+            continue
+        distances = point_segment_distances(points[i + 1 : j], points[i], points[j])
+        k = int(np.argmax(distances))
+        if distances[k] > tolerance:
+            k += i + 1
+            keep[k] = True
+            spans += [(i, k), (k, j)]
+    return points[keep]
+
+
+def simplify_segments(segments: np.ndarray, tolerance: float) -> np.ndarray:
+    """Simplify the given line segments (e.g. the staircase boundary of a diagonal
+    obstacle) into fewer segments, such that every point along the original
+    segments is within the tolerance of the simplified ones.
+
+    :param segments: an array of segments ``[x1, y1, x2, y2]``, one per row
+    :param tolerance: the maximum distance of the original segments
+
+    :return: an array of the simplified segments, one per row
+    """
+    simplified = [np.empty((0, 4))]
+    for points in chain_segments(segments):
+        points = simplify_polyline(points, tolerance)
+        simplified.append(np.concatenate([points[:-1], points[1:]], axis=1))
+    return np.concatenate(simplified)
+
+
+class SegmentBVH:
+    """A bounding volume hierarchy of 2D line segments, which answers whether a
+    query segment intersects any of them. A node is only visited if the query
+    segment passes through its bounding box, hence the cost of a query depends on
+    the number of segments that are near the query rather than its length.
+
+    The tree is stored as plain Python lists, which are much faster than numpy to
+    index with scalars.
+
+    :param segments: an array of segments ``[x1, y1, x2, y2]``, one per row
+    :param leaf_size: the maximum number of segments in a leaf
+    """
+
+    def __init__(self, segments: np.ndarray, leaf_size: int = 4):
+        self.segments = np.asarray(segments, dtype=float).reshape(-1, 4)
+        self.leaf_size = leaf_size
+        # the bounding box (xmin, ymin, xmax, ymax) of each node
+        self._boxes = []
+        # the indices of the two children of each node, or None for leaves
+        self._children = []
+        # the segments of each leaf, as tuples
+        self._leaf_segments = []
+        if len(self.segments):
+            self._build(np.arange(len(self.segments)))
+
+    def __len__(self):
+        return len(self.segments)
+
+    def _build(self, indices: np.ndarray) -> int:
+        """Recursively build the subtree of the given segments
+
+        :param indices: the indices of the segments in the subtree
+
+        :return: the index of the root of the subtree
+        """
+        segments = self.segments[indices]
+        lower = np.minimum(segments[:, :2], segments[:, 2:])
+        upper = np.maximum(segments[:, :2], segments[:, 2:])
+        node = len(self._boxes)
+        self._boxes.append((*lower.min(axis=0).tolist(), *upper.max(axis=0).tolist()))
+        self._children.append(None)
+        self._leaf_segments.append(())
+        if len(indices) <= self.leaf_size:
+            self._leaf_segments[node] = tuple(map(tuple, segments.tolist()))
+            return node
+        # split at the median of the centres along the longest axis of the box
+        centres = lower + upper
+        axis = int(np.argmax(centres.max(axis=0) - centres.min(axis=0)))
+        order = np.argsort(centres[:, axis], kind="stable")
+        half = len(indices) // 2
+        self._children[node] = (
+            self._build(indices[order[:half]]),
+            self._build(indices[order[half:]]),
+        )
+        return node
+
+    def intersects(self, x1: float, y1: float, x2: float, y2: float) -> bool:
+        """Check if the given segment intersects (or touches) any of the segments
+
+        :param x1: the first coordinate of the starting point
+        :param y1: the second coordinate of the starting point
+        :param x2: the first coordinate of the ending point
+        :param y2: the second coordinate of the ending point
+
+        """
+        for ax, ay, bx, by in self._nearby_segments(x1, y1, x2, y2):
+            if segments_intersect(x1, y1, x2, y2, ax, ay, bx, by):
+                return True
+        return False
+
+    def intersecting(
+        self, x1: float, y1: float, x2: float, y2: float
+    ) -> typing.List[typing.Tuple[float, float, float, float]]:
+        """Find the segments that the given segment intersects (or touches)
+
+        :param x1: the first coordinate of the starting point
+        :param y1: the second coordinate of the starting point
+        :param x2: the first coordinate of the ending point
+        :param y2: the second coordinate of the ending point
+
+        :return: the segments ``(x1, y1, x2, y2)``
+        """
+        return [
+            segment
+            for segment in self._nearby_segments(x1, y1, x2, y2)
+            if segments_intersect(x1, y1, x2, y2, *segment)
+        ]
+
+    def within_distance(
+        self, x1: float, y1: float, x2: float, y2: float, distance: float
+    ) -> bool:
+        """Check if the given segment is within some distance of any of the segments
+
+        :param x1: the first coordinate of the starting point
+        :param y1: the second coordinate of the starting point
+        :param x2: the first coordinate of the ending point
+        :param y2: the second coordinate of the ending point
+        :param distance: the maximum distance between the segments
+
+        """
+        for ax, ay, bx, by in self._nearby_segments(x1, y1, x2, y2, distance):
+            if segments_distance(x1, y1, x2, y2, ax, ay, bx, by) <= distance:
+                return True
+        return False
+
+    def _nearby_segments(
+        self, x1: float, y1: float, x2: float, y2: float, margin: float = 0.0
+    ) -> typing.Iterator[typing.Tuple[float, float, float, float]]:
+        """Iterate over the segments of the leaves whose bounding boxes the given
+        segment passes through (or comes within the margin of)
+
+        :param x1: the first coordinate of the starting point
+        :param y1: the second coordinate of the starting point
+        :param x2: the first coordinate of the ending point
+        :param y2: the second coordinate of the ending point
+        :param margin: the distance that the bounding boxes are expanded by
+
+        """
+        if not self._boxes:
+            return
+        dx, dy = x2 - x1, y2 - y1
+        qxmin, qxmax = min(x1, x2) - margin, max(x1, x2) + margin
+        qymin, qymax = min(y1, y2) - margin, max(y1, y2) + margin
+        # the corners are compared with the line scaled by the length of the query
+        side = margin * math.hypot(dx, dy)
+        boxes, children, leaf_segments = (
+            self._boxes,
+            self._children,
+            self._leaf_segments,
+        )
+        stack = [0]
+        while stack:
+            node = stack.pop()
+            xmin, ymin, xmax, ymax = boxes[node]
+            if xmax < qxmin or xmin > qxmax or ymax < qymin or ymin > qymax:
+                continue
+            # the box is missed if all of its corners are on the same side of the
+            # line that contains the query segment
+            c1 = dx * (ymin - y1) - dy * (xmin - x1)
+            c2 = dx * (ymin - y1) - dy * (xmax - x1)
+            c3 = dx * (ymax - y1) - dy * (xmin - x1)
+            c4 = dx * (ymax - y1) - dy * (xmax - x1)
+            if (c1 > side and c2 > side and c3 > side and c4 > side) or (
+                c1 < -side and c2 < -side and c3 < -side and c4 < -side
+            ):
+                continue
+            if children[node] is not None:
+                stack.extend(children[node])
+                continue
+            yield from leaf_segments[node]
+
+
+def segments_intersect(x1, y1, x2, y2, ax, ay, bx, by) -> bool:
+    """Check if the segment from ``(x1, y1)`` to ``(x2, y2)`` intersects (or
+    touches) the segment from ``(ax, ay)`` to ``(bx, by)``.
+
+    :return: whether the two segments have any point in common
+    """
+    # the sides of each segment that the ends of the other one are on
+    o1 = (x2 - x1) * (ay - y1) - (y2 - y1) * (ax - x1)
+    o2 = (x2 - x1) * (by - y1) - (y2 - y1) * (bx - x1)
+    o3 = (bx - ax) * (y1 - ay) - (by - ay) * (x1 - ax)
+    o4 = (bx - ax) * (y2 - ay) - (by - ay) * (x2 - ax)
+    if o1 == 0 and o2 == 0 and o3 == 0 and o4 == 0:
+        # collinear (or degenerate), hence they intersect if their bounding boxes overlap
+        return max(min(x1, x2), min(ax, bx)) <= min(max(x1, x2), max(ax, bx)) and max(
+            min(y1, y2), min(ay, by)
+        ) <= min(max(y1, y2), max(ay, by))
+    return (o1 * o2 <= 0) and (o3 * o4 <= 0)
+
+
+def point_segment_distance(px, py, ax, ay, bx, by) -> float:
+    """Compute the distance from the point ``(px, py)`` to the segment from
+    ``(ax, ay)`` to ``(bx, by)``.
+    """
+    dx, dy = bx - ax, by - ay
+    length2 = dx * dx + dy * dy
+    t = 0.0
+    if length2 > 0:
+        t = min(max(((px - ax) * dx + (py - ay) * dy) / length2, 0.0), 1.0)
+    return math.hypot(px - ax - t * dx, py - ay - t * dy)
+
+
+def segments_distance(x1, y1, x2, y2, ax, ay, bx, by) -> float:
+    """Compute the distance between the segment from ``(x1, y1)`` to ``(x2, y2)``
+    and the segment from ``(ax, ay)`` to ``(bx, by)``.
+    """
+    if segments_intersect(x1, y1, x2, y2, ax, ay, bx, by):
+        return 0.0
+    # otherwise, the closest points include an end of either segment
+    return min(
+        point_segment_distance(x1, y1, ax, ay, bx, by),
+        point_segment_distance(x2, y2, ax, ay, bx, by),
+        point_segment_distance(ax, ay, x1, y1, x2, y2),
+        point_segment_distance(bx, by, x1, y1, x2, y2),
+    )
+
+
+@functools.lru_cache(maxsize=1024)
+def bisection_order(num_steps: int) -> np.ndarray:
+    """Get the indices ``0, 1, ..., num_steps`` in bisection (van der Corput)
+    order, i.e., the midpoint first, then the midpoints of each half and so on,
+    with the two ends last.
+
+    :param num_steps: the number of steps between the two ends
+
+    :return: the read-only array of indices
+    """
+    order = []
+    intervals = deque([(0, num_steps)])
+    while intervals:
+        lo, hi = intervals.popleft()
+        if hi - lo <= 1:
+            continue
+        mid = (lo + hi) // 2
+        order.append(mid)
+        intervals.append((lo, mid))
+        intervals.append((mid, hi))
+    order += [0, num_steps] if num_steps > 0 else [0]
+    order = np.array(order, dtype=int)
+    order.flags.writeable = False
+    return order
+
+
+def angle_to_bin(angle, num_bins: int):
+    """Discretise angles (in radian) into bins that evenly divide a full circle.
+
+    :param angle: the angle, or an array of angles
+    :param num_bins: the number of bins
+
+    :return: the bin index of each angle
+    """
+    bins = np.floor(np.mod(angle, 2 * np.pi) * (num_bins / (2 * np.pi)))
+    # guards the rounding of angles that are just below 2 pi
+    return np.minimum(bins.astype(int), num_bins - 1)
+
+
+def compute_link_collision_table(
+    img: np.ndarray, length: float, num_bins: int
+) -> np.ndarray:
+    r"""Compute which placements of a stick (i.e. a link of the robot arm) collide
+    with the obstacles, by correlating the image with the rasterised stick of each
+    angle bin. Anything outside of the image is treated as an obstacle.
+
+    A stick of length :math:`L` at a real-valued position :math:`(x, y)` and an angle
+    :math:`\theta` is rasterised from pixel :math:`(\lfloor x \rfloor, \lfloor y
+    \rfloor)` to pixel :math:`(\lfloor x + L\cos\theta \rfloor, \lfloor y +
+    L\sin\theta \rfloor)`. The mask of a bin is the union of the sticks towards
+    every ending pixel that is possible within the bin, over all sub-pixel
+    positions. It is built by sampling the angles densely and conservatively
+    covering the ending pixels in-between, hence a placement is never marked as
+    free if any stick in it collides.
+
+    :param img: the image where free pixels have a value of 1
+    :param length: the length of the stick
+    :param num_bins: the number of angle bins
+
+    :return: the table of shape ``(num_bins, w, ceil(h / 8))``, where the bits of
+        ``np.unpackbits(table, axis=-1)[b, x, y]`` denotes whether the stick
+        starting at pixel :math:`(x, y)` with an angle in bin :math:`b` collides
+    """
+    obstacles = img != 1
+    w, h = obstacles.shape
+    pad = int(math.ceil(length)) + 1
+    padded = np.pad(obstacles, pad, constant_values=True)
+
+    bin_width = 2 * np.pi / num_bins
+    # Every direction within the bin is at most this far from a sampled one, and
+    # adding any sub-pixel position in [0, 1) then ends in the given pixels.
+    max_gap = 0.25
+    angles = np.linspace(
+        0, bin_width, int(math.ceil(length * bin_width / (2 * max_gap))) + 1
+    )
+    neighbours = np.arange(-1, 3)
+
+    table = np.empty((num_bins, w, (h + 7) // 8), dtype=np.uint8)
+    for b in range(num_bins):
+        thetas = b * bin_width + angles
+        directions = length * np.stack([np.cos(thetas), np.sin(thetas)], axis=1)
+        ends = np.stack(
+            np.meshgrid(neighbours, neighbours, indexing="ij"), axis=-1
+        ).reshape(-1, 2)
+        ends = np.floor(directions)[:, None, :].astype(int) + ends[None, :, :]
+        lower = np.floor(directions - max_gap)[:, None, :]
+        upper = np.floor(directions + 1 + max_gap)[:, None, :]
+        ends = ends[((ends >= lower) & (ends <= upper)).all(axis=-1)]
+        ends = np.unique(ends, axis=0)
+        offsets = np.unique(
+            np.concatenate(
+                [
+                    np.stack(
+                        ImgCollisionChecker._get_line_offsets(int(dx), int(dy)), axis=1
+                    )
+                    for dx, dy in ends
+                ]
+            ),
+            axis=0,
+        )
+        collide = np.zeros((w, h), dtype=bool)
+        for dx, dy in offsets:
+            collide |= padded[pad + dx : pad + dx + w, pad + dy : pad + dy + h]
+        table[b] = np.packbits(collide, axis=-1)
+    return table
 
 
 class CollisionChecker(ABC):
@@ -25,12 +947,29 @@ class CollisionChecker(ABC):
         r"""Check if the straight line connection between pos1 and pos2 is in
         :math:`C_\text{free}`. Internally it might calls :meth:`feasible`.
 
+        Edges are undirected, i.e., checking from pos2 to pos1 gives the same
+        result, which the planners rely on to check many edges from one
+        configuration in a batch (see :meth:`visible_many`).
+
         :param pos1: the starting configuration of the line
         :param pos2: the target configuration of th eline
 
         """
         raise NotImplementedError("Must derive from this class")
 
+    def visible_many(self, origin: np.ndarray, targets: np.ndarray) -> np.ndarray:
+        r"""Check if the straight line connections between ``origin`` and each of the
+        ``targets`` are in :math:`C_\text{free}`. This is equivalent to calling
+        :meth:`visible` on each of the targets, but derived class might check all of
+        them in one batch.
+
+        :param origin: the starting configuration of all lines
+        :param targets: an array of target configurations, one per row
+
+        :return: a boolean array that denotes the visibility of each target
+        """
+        return np.array([self.visible(origin, t) for t in targets], dtype=bool)
+
     def feasible(self, p: np.ndarray):
         r"""Check if the configuration is in free-space, i.e.,
         :math:`q \in C_\text{free}`
@@ -40,6 +979,17 @@ class CollisionChecker(ABC):
         """
         pass
 
+    def feasible_many(self, configs: np.ndarray) -> np.ndarray:
+        r"""Check if each of the configurations is in free-space. This is equivalent
+        to calling :meth:`feasible` on each of them, but derived class might check
+        all of them in one batch.
+
+        :param configs: an array of configurations, one per row
+
+        :return: a boolean array that denotes the feasibility of each configuration
+        """
+        return np.array([self.feasible(p) for p in configs], dtype=bool)
+
     def get_image_shape(self):
         """Get the image shape of the planning problem.
         Return None if this is not applicable to the current space
@@ -48,10 +998,23 @@ class CollisionChecker(ABC):
         """
         return None
 
+    @property
+    def unwrapped(self) -> "CollisionChecker":
+        """The underlying collision checker engine, i.e., without any
+        :class:`CollisionCheckerWrapper` around it.
+
+        :return: the collision checker engine
+        """
+        return self
+
 
 class ImgCollisionChecker(CollisionChecker):
     """
     2D Image Space simulator engine
+
+    The robot is either a point, or a disc whose radius is given by the
+    ``robot_radius`` argument, which is checked as a point on the map with its
+    obstacles dilated by the radius (see :func:`dilate_occupancy`).
     """
 
     def __init__(
@@ -67,24 +1030,96 @@ class ImgCollisionChecker(CollisionChecker):
         :param args: an instance of the input arguments
         """
         super().__init__(stats)
-        from PIL import Image
+        self._img = load_occupancy_map(img)
+        self.robot_radius = args.get("robot_radius")
+        if self.robot_radius:
+            if isinstance(self._img, tiled_map.TiledOccupancy):
+                raise ValueError("Tiled maps cannot be dilated by the robot radius")
+            # a disc robot is checked as a point on the dilated map
+            self._img = dilate_occupancy(
+                self._img,
+                self.robot_radius,
+                cache_dir=args.get("cache_dir"),
+                persist=bool(args.get("persist_dilated_map")),
+            )
+        self._setup_accelerations(args)
+        if args.get("packed_map") and isinstance(self._img, np.ndarray):
+            self._img = PackedOccupancy(self._img)
+
+    def _setup_accelerations(self, args: MagicDict):
+        """Build the acceleration structures that are selected by the arguments
 
-        image = Image.open(img).convert("L")
-        image = np.array(image)
-        image = image / 255
-        # white pixxel should now have value of 1
-        image[image != 1.0] = 0
-
-        # need to transpose because pygame has a difference coordinate system than matplotlib matrix
-        self._img = image.T
+        :param args: an instance of the input arguments
+        """
+        self._accel = parse_cc_accelerations(
+            args.get("cc_accel"), packed_map=bool(args.get("packed_map"))
+        )
+        if self._accel and isinstance(self._img, tiled_map.TiledOccupancy):
+            # the structures are as large as the map itself, which defeats the
+            # purpose of paging in the tiles on demand
+            LOGGER.info("Acceleration structures are disabled for tiled maps")
+            self._accel = ()
+        self._clearance = None
+        if "clearance" in self._accel:
+            self._clearance = compute_clearance_map(self._img, CLEARANCE_MAP_MAX)
+        self._pyramid = None
+        if "pyramid" in self._accel:
+            self._pyramid = OccupancyPyramid(self._img)
+        self._obstacle_sat = None
+        if "sat" in self._accel:
+            self._obstacle_sat = compute_summed_area_table(self._img != 1)
 
     @property
     def image(self) -> np.ndarray:
         """The image that represents the planning problem
 
-        :return: the input image
+        :return: the input image, where free pixels are True
         """
-        return self._img.T
+        return self._dense_image().T
+
+    def _dense_image(self) -> np.ndarray:
+        """Get the occupancy grid as an array, unpacking it if it is stored as a
+        :class:`PackedOccupancy` or loading it if it is a tiled map.
+
+        :return: the occupancy grid where free pixels are True
+        """
+        if not isinstance(self._img, np.ndarray):
+            return self._img.unpack()
+        return self._img
+
+    def clearance(self, p: np.ndarray) -> float:
+        """Get the distance (in pixels) from the given configuration to its
+        closest obstacle, which saturates at :data:`CLEARANCE_MAP_MAX`. This is zero
+        for configurations that are not free.
+
+        :param p: the configuration to query
+
+        """
+        if self._clearance is None:
+            self._clearance = compute_clearance_map(
+                self._dense_image(), CLEARANCE_MAP_MAX
+            )
+        x, y = int(p[0]), int(p[1])
+        w, h = self._clearance.shape
+        if 0 <= x < w and 0 <= y < h:
+            return float(self._clearance[x, y])
+        return 0.0
+
+    def box_free(self, xmin: int, ymin: int, xmax: int, ymax: int) -> bool:
+        """Check if an axis-aligned box of pixels contains no obstacle, in constant
+        time. Anything outside of the image is treated as an obstacle.
+
+        :param xmin: the first coordinate of the lower corner (inclusive)
+        :param ymin: the second coordinate of the lower corner (inclusive)
+        :param xmax: the first coordinate of the upper corner (inclusive)
+        :param ymax: the second coordinate of the upper corner (inclusive)
+
+        """
+        if self._obstacle_sat is None:
+            self._obstacle_sat = compute_summed_area_table(self._dense_image() != 1)
+        return box_free_in_table(
+            self._obstacle_sat, int(xmin), int(ymin), int(xmax), int(ymax)
+        )
 
     def get_image_shape(self):
         return self._img.shape
@@ -93,33 +1128,147 @@ class ImgCollisionChecker(CollisionChecker):
         return 2
 
     def get_coor_before_collision(self, pos1, pos2):
-        """Get the list of coordinate before the collision
+        """Walk along the line from the first configuration to the second one, and
+        get the first pixel that is not free, or the last pixel of the line if all
+        of them are free. The pixels are checked with one lookup into the image,
+        which are not counted as feasibility tests in the stats.
 
         :param pos1: first configuration
         :param pos2: second configuration
 
+        :return: the coordinate of the pixel
         """
-        pixels = self.get_line(pos1, pos2)
-        # check that all pixel are white (free space)
-        endPos = pos2
-        for p in pixels:
-            endPos = (p[0], p[1])
-            if not self.feasible(p):
-                break
-        return endPos
+        xs, ys = self.get_line_indices(pos1, pos2)
+        blocked = ~pixels_free(self._img, xs, ys)
+        i = int(np.argmax(blocked)) if blocked.any() else len(xs) - 1
+        return int(xs[i]), int(ys[i])
 
     def visible(self, pos1, pos2):
         self.stats.visible_cnt += 1
         try:
-            # get list of pixel between node A and B
-            pixels = self.get_line(pos1, pos2)
-            # check that all pixel are white (free space)
-            for p in pixels:
-                if not self.feasible(p, save_stats=False):
-                    return False
+            x1, y1 = int(pos1[0]), int(pos1[1])
+            x2, y2 = int(pos2[0]), int(pos2[1])
         except ValueError:
             return False
-        return True
+        if "clearance" in self._accel and segment_within_clearance(
+            self._clearance, x1, y1, x2, y2
+        ):
+            # far away from any obstacle, no need to look at each pixel
+            self.stats.clearance_accept_cnt += 1
+            return True
+        if "sat" in self._accel and box_free_in_table(
+            self._obstacle_sat, min(x1, x2), min(y1, y2), max(x1, x2), max(y1, y2)
+        ):
+            # every pixel of a line lies within the bounding box of its two ends
+            self.stats.box_accept_cnt += 1
+            return True
+        if (
+            "pyramid" in self._accel
+            and max(abs(x2 - x1), abs(y2 - y1)) >= PYRAMID_MIN_LINE_LENGTH
+            and self._pyramid.contains(x1, y1)
+            and self._pyramid.contains(x2, y2)
+        ):
+            return self._pyramid.segment_free(x1, y1, x2, y2)
+        # get the pixel indices between node A and B
+        xs, ys = self.get_line_indices((x1, y1), (x2, y2))
+        # check that all pixel are white (free space)
+        if self._within_image(xs[0], ys[0]) and self._within_image(xs[-1], ys[-1]):
+            # every pixel of a line lies within the bounding box of its two ends
+            return bool(self._img[xs, ys].all())
+        return bool(pixels_free(self._img, xs, ys).all())
+
+    def visible_many(self, origin, targets):
+        targets = np.asarray(targets)
+        self.stats.visible_cnt += len(targets)
+        result = np.zeros(len(targets), dtype=bool)
+        if len(targets) == 0 or not np.isfinite(origin[:2]).all():
+            return result
+        # non-finite targets cannot be rasterised and are never visible
+        valid = np.isfinite(targets[:, :2]).all(axis=1)
+        start = np.asarray(origin[:2]).astype(int)
+        ends = targets[valid, :2].astype(int)
+        ends_visible = np.zeros(len(ends), dtype=bool)
+        if "clearance" in self._accel:
+            # accept lines that are far away from any obstacle all at once
+            ends_visible = self._lines_within_clearance(start, ends)
+            self.stats.clearance_accept_cnt += int(np.count_nonzero(ends_visible))
+        if "sat" in self._accel:
+            # accept lines with an obstacle-free bounding box all at once
+            box_free = ~ends_visible
+            box_free[box_free] = self._lines_box_free(start, ends[box_free])
+            self.stats.box_accept_cnt += int(np.count_nonzero(box_free))
+            ends_visible |= box_free
+        if not ends_visible.all():
+            xs, ys, line_starts = self.get_lines_indices(
+                np.broadcast_to(start, (np.count_nonzero(~ends_visible), 2)),
+                ends[~ends_visible],
+            )
+            # check all pixels at once, then reduce it back to each line
+            ends_visible[~ends_visible] = np.logical_and.reduceat(
+                pixels_free(self._img, xs, ys), line_starts
+            )
+        result[valid] = ends_visible
+        return result
+
+    def _lines_box_free(self, start: np.ndarray, ends: np.ndarray):
+        """Vectorised version of :meth:`box_free` on the bounding boxes of lines that
+        share the same starting pixel.
+
+        :param start: the starting pixel of all lines
+        :param ends: the ending pixels, one per row
+
+        :return: a boolean array that denotes whether each bounding box is free
+        """
+        w, h = self._img.shape
+        if not (0 <= start[0] < w and 0 <= start[1] < h):
+            return np.zeros(len(ends), dtype=bool)
+        box_free = (
+            (ends[:, 0] >= 0) & (ends[:, 0] < w) & (ends[:, 1] >= 0) & (ends[:, 1] < h)
+        )
+        lower = np.minimum(ends[box_free], start)
+        upper = np.maximum(ends[box_free], start) + 1
+        table = self._obstacle_sat
+        box_free[box_free] = (
+            table[upper[:, 0], upper[:, 1]]
+            - table[lower[:, 0], upper[:, 1]]
+            - table[upper[:, 0], lower[:, 1]]
+            + table[lower[:, 0], lower[:, 1]]
+        ) == 0
+        return box_free
+
+    def _lines_within_clearance(self, start: np.ndarray, ends: np.ndarray):
+        """Vectorised version of :func:`segment_within_clearance` for lines that
+        share the same starting pixel.
+
+        :param start: the starting pixel of all lines
+        :param ends: the ending pixels, one per row
+
+        :return: a boolean array that denotes whether each line is known to be free
+        """
+        w, h = self._clearance.shape
+        if not (0 <= start[0] < w and 0 <= start[1] < h):
+            return np.zeros(len(ends), dtype=bool)
+        within_clearance = (
+            (ends[:, 0] >= 0) & (ends[:, 0] < w) & (ends[:, 1] >= 0) & (ends[:, 1] < h)
+        )
+        within_ends = ends[within_clearance]
+        within_clearance[within_clearance] = self._clearance[
+            start[0], start[1]
+        ] + self._clearance[within_ends[:, 0], within_ends[:, 1]] > (
+            np.hypot(*(within_ends - start).T) + 1 + CLEARANCE_TOLERANCE
+        )
+        return within_clearance
+
+    def _within_image(self, x: int, y: int) -> bool:
+        """Check if the given pixel can be used to index into the image.
+
+        :param x: the first pixel coordinate
+        :param y: the second pixel coordinate
+
+        """
+        w, h = self._img.shape
+        # same bounds as indexing with a scalar, i.e., negative index wraps around
+        return -w <= x < w and -h <= y < h
 
     def feasible(self, p, save_stats=True):
         if save_stats:
@@ -191,9 +1340,106 @@ class ImgCollisionChecker(CollisionChecker):
             points.reverse()
         return points
 
+    @staticmethod
+    def get_line_indices(start, end) -> typing.Tuple[np.ndarray, np.ndarray]:
+        """Vectorised version of :meth:`get_line`.
+        Produces the exact same pixels (in the same order) as two integer arrays,
+        which can be used to index into the image directly.
+
+        :param start: the starting pixel coordinate
+        :param end: the ending pixel coordinate
+
+        :return: the array of first coordinates and the array of second coordinates
+        """
+        # indexing is much cheaper than iterating through a numpy array
+        x1, y1 = int(start[0]), int(start[1])
+        x2, y2 = int(end[0]), int(end[1])
+        # Bresenham's line is translation invariant, so we only need the offsets
+        offset_xs, offset_ys = ImgCollisionChecker._get_line_offsets(x2 - x1, y2 - y1)
+        return x1 + offset_xs, y1 + offset_ys
+
+    @staticmethod
+    def get_lines_indices(
+        starts: np.ndarray, ends: np.ndarray
+    ) -> typing.Tuple[np.ndarray, np.ndarray, np.ndarray]:
+        """Batched version of :meth:`get_line_indices` that rasterises many lines
+        at once. The pixels of all lines are concatenated together.
+
+        :param starts: an array of (finite) starting pixel coordinates, one per row
+        :param ends: an array of (finite) ending pixel coordinates, one per row
+
+        :return: the array of first coordinates, the array of second coordinates,
+            and the index of the first pixel of each line within those arrays
+        """
+        # same as int(), casting truncates towards zero
+        starts = np.asarray(starts).astype(int)
+        ends = np.asarray(ends).astype(int)
+        offsets = [
+            ImgCollisionChecker._get_line_offsets(dx, dy)
+            for dx, dy in (ends - starts).tolist()
+        ]
+        lengths = np.array([len(offset_xs) for offset_xs, _ in offsets])
+        xs = np.concatenate([offset_xs for offset_xs, _ in offsets])
+        ys = np.concatenate([offset_ys for _, offset_ys in offsets])
+        xs += np.repeat(starts[:, 0], lengths)
+        ys += np.repeat(starts[:, 1], lengths)
+        return xs, ys, np.cumsum(lengths) - lengths
+
+    @staticmethod
+    @functools.lru_cache(maxsize=16384)
+    def _get_line_offsets(dx: int, dy: int) -> typing.Tuple[np.ndarray, np.ndarray]:
+        """Produces the pixel offsets of a Bresenham's line from the origin to
+        ``(dx, dy)``. Edges are mostly bounded by epsilon, hence there are only a few
+        unique offsets and they are cached.
+
+        :param dx: the offset of the ending pixel in the first coordinate
+        :param dy: the offset of the ending pixel in the second coordinate
+
+        """
+        x1, y1, x2, y2 = 0, 0, dx, dy
+
+        # Rotate line if it is steep
+        is_steep = abs(dy) > abs(dx)
+        if is_steep:
+            x1, y1 = y1, x1
+            x2, y2 = y2, x2
+
+        # Swap start and end points if necessary
+        swapped = x1 > x2
+        if swapped:
+            x1, x2 = x2, x1
+            y1, y2 = y2, y1
+
+        dx = x2 - x1
+        abs_dy = abs(y2 - y1)
+        ystep = 1 if y1 < y2 else -1
+
+        # The error term of Bresenham's loop always stays within [0, dx), hence the
+        # number of steps that y had taken before the i-th pixel is given by
+        # ceil((i * |dy| - error_0) / dx).
+        steps = np.arange(dx + 1)
+        xs = x1 + steps
+        ys = y1 - ystep * ((int(dx / 2.0) - steps * abs_dy) // max(dx, 1))
+
+        if is_steep:
+            xs, ys = ys, xs
+        if swapped:
+            xs, ys = xs[::-1], ys[::-1]
+        # these are shared by all callers
+        xs.flags.writeable = False
+        ys.flags.writeable = False
+        return xs, ys
+
 
 class KlamptCollisionChecker(CollisionChecker):
-    """A wrapper around Klampt's 3D simulator"""
+    """A wrapper around Klampt's 3D simulator
+
+    Edges are either checked by Klampt itself, which tests the configurations along
+    the edge at a fixed resolution from one end to the other, or by
+    :meth:`_bisection_visible`, which tests the same configurations in bisection
+    order (see ``--klampt-edge-checker``). Either way, each edge goes the shorter
+    way around each joint (see :meth:`unwrap_target`).
+    """
 
     def __init__(self, xml: str, stats: Stats, args: MagicDict):
         """
@@ -209,9 +1455,23 @@ class KlamptCollisionChecker(CollisionChecker):
         world.readFile(xml)  # very cluttered
         robot = world.robot(0)
 
+        self.edge_check_resolution = args.get("klampt_edge_resolution") or 0.1
+        self.edge_checker = args.get("klampt_edge_checker") or "klampt"
+        if self.edge_checker not in KLAMPT_EDGE_CHECKERS:
+            raise ValueError(
+                f"Unrecognised edge checker '{self.edge_checker}', must be one of "
+                f"{KLAMPT_EDGE_CHECKERS}"
+            )
+        # an upper bound of the displacement of any point of the robot per unit of
+        # joint motion (summed over all joints), which enables skipping sub-segments
+        # of edges by the distance from the robot to obstacles
+        self.lipschitz = args.get("klampt_lipschitz")
+
         # this is the CSpace that will be used.
         # Standard collision and joint limit constraints will be checked
-        space = robotplanning.makeSpace(world, robot, edgeCheckResolution=0.1)
+        space = robotplanning.makeSpace(
+            world, robot, edgeCheckResolution=self.edge_check_resolution
+        )
 
         self.space = space
         self.robot = robot
@@ -262,12 +1522,130 @@ class KlamptCollisionChecker(CollisionChecker):
         pos = link.getWorldPosition([0, 0, 0])
         return pos
 
+    @staticmethod
+    def unwrap_target(a, b) -> np.ndarray:
+        r"""Get the target configuration that is the shorter way around each joint
+        from the starting configuration, which may lie outside of
+        :math:`[-\pi, \pi)`. Klampt interpolates the joints linearly, hence the
+        edge towards it is the one that :meth:`env.Env.radian_dist` measures.
+
+        :param a: the starting configuration
+        :param b: the target configuration
+
+        """
+        a = np.asarray(a, dtype=float)
+        return a + (np.asarray(b, dtype=float) - a + np.pi) % (2 * np.pi) - np.pi
+
     def visible(self, a, b):
+        b = self.unwrap_target(a, b)
         a = self.translate_to_klampt(a)
         b = self.translate_to_klampt(b)
         self.stats.visible_cnt += 1
+        if self.edge_checker == "bisection":
+            return self._bisection_visible(a, b)
+        # Klampt does not report where it stops, hence this counts every
+        # configuration along the edge, which is exact for free edges and an upper
+        # bound for blocked ones
+        self.stats.edge_query_cnt += max(self._num_edge_steps(a, b) - 1, 0)
         return self.space.isVisible(a, b)
 
+    def _num_edge_steps(self, a, b) -> int:
+        """Get the number of steps of an edge at the edge check resolution, where
+        the configurations between the steps are the ones that are tested
+
+        :param a: the starting configuration in Klampt's protocol
+        :param b: the target configuration in Klampt's protocol
+
+        """
+        return int(math.ceil(self.space.distance(a, b) / self.edge_check_resolution))
+
+    def _bisection_visible(self, a, b) -> bool:
+        """Check the same configurations along an edge as Klampt does, but test the
+        midpoint first and then bisect each half recursively (i.e. van der Corput
+        order), which finds collisions in the middle of an edge much earlier. Each
+        tested configuration is counted in :attr:`Stats.edge_query_cnt`.
+
+        If :attr:`lipschitz` is given, the distance from the robot to the obstacles
+        at each tested configuration is used to skip the sub-segment around it when
+        the robot provably cannot reach any obstacle within that sub-segment.
+
+        :param a: the starting configuration in Klampt's protocol
+        :param b: the target configuration in Klampt's protocol
+
+        """
+        num_steps = self._num_edge_steps(a, b)
+        # the total joint motion along the edge
+        motion = sum(abs(x - y) for x, y in zip(a, b))
+        # intervals of the step indices, whose interior steps are not yet tested
+        intervals = deque([(0, num_steps)])
+        while intervals:
+            lo, hi = intervals.popleft()
+            if hi - lo <= 1:
+                continue
+            mid = (lo + hi) // 2
+            q = self.space.interpolate(a, b, mid / num_steps)
+            self.stats.edge_query_cnt += 1
+            if not self.space.isFeasible(q):
+                return False
+            if self.lipschitz and hi - lo > 2:
+                # every configuration within this interval is at most this far
+                # (in joint motion) from the tested one
+                reach = motion * max(mid - lo, hi - mid) / num_steps
+                clearance = self.clearance(q)
+                if clearance is not None and clearance > self.lipschitz * reach:
+                    continue
+            intervals.append((lo, mid))
+            intervals.append((mid, hi))
+        return True
+
+    def clearance(self, q) -> typing.Optional[float]:
+        """Get a lower bound of the distance that any point of the robot could move
+        before it collides, i.e., the distance between the robot and the obstacles,
+        or half of the distance between two links that could collide with each
+        other (as both of them could move).
+
+        :param q: the configuration in Klampt's protocol
+
+        :return: the clearance, or ``None`` if distance queries are not available
+            in this version of Klampt
+        """
+        try:
+            self.robot.setConfig(q)
+            obstacles = [
+                self.world.terrain(i).geometry()
+                for i in range(self.world.numTerrains())
+            ] + [
+                self.world.rigidObject(i).geometry()
+                for i in range(self.world.numRigidObjects())
+            ]
+            links = [
+                (i, self.robot.link(i).geometry()) for i in range(self.robot.numLinks())
+            ]
+            links = [(i, g) for i, g in links if not g.empty()]
+            clearance = math.inf
+            for i, link in links:
+                for obstacle in obstacles:
+                    clearance = min(clearance, self._distance(link, obstacle))
+                for j, other in links:
+                    if i < j and self.robot.selfCollisionEnabled(i, j):
+                        clearance = min(clearance, self._distance(link, other) / 2)
+            return clearance
+        except (AttributeError, TypeError, NotImplementedError):
+            if self.lipschitz:
+                import warnings
+
+                warnings.warn(
+                    "Distance queries are not available in this version of Klampt"
+                )
+                self.lipschitz = None
+            return None
+
+    @staticmethod
+    def _distance(geometry, other) -> float:
+        result = geometry.distance(other)
+        # older versions of Klampt return the distance directly
+        return float(getattr(result, "d", result))
+
     def feasible(self, p, save_stats=True):
         p = self.translate_to_klampt(p)
         self.stats.feasible_cnt += 1
@@ -300,33 +1678,84 @@ class RobotArm4dCollisionChecker(CollisionChecker):
         """
         super().__init__(stats)
         if map_mat is None:
-            from PIL import Image
-
-            image = Image.open(img).convert("L")
-            image = np.array(image)
-            image = image / 255
-            # white pixxel should now have value of 1
-            image[image != 1.0] = 0
-
-            # import matplotlib.pyplot as plt
-            # plt.imshow(image)
-            # plt.colorbar()
-            self._img = image
-
+            self._img = load_occupancy_map(img)
         else:
-            self._img = (map_mat / map_mat.max()).astype(int)
+            # only pixels with the maximum value are free
+            # need to transpose because pygame has a difference coordinate system
+            # than matplotlib matrix
+            self._img = (map_mat == map_mat.max()).T
 
         if stick_robot_length_config is not None:
             self.stick_robot_length_config = stick_robot_length_config
         else:
             self.stick_robot_length_config = args.rover_arm_robot_lengths
 
-        # need to transpose because pygame has a difference coordinate system than matplotlib matrix
-        self._img = self._img.T
+        ImgCollisionChecker._setup_accelerations(self, args)
+
+        # Every body point of the arm is within this distance to the pixel of its
+        # base, which accounts for the truncation of the joints to pixels.
+        self._arm_reach = sum(self.stick_robot_length_config) + 2
+
+        self._interpolation = args.get("interpolation_4d") or "bresenham"
+        if self._interpolation not in ARM_INTERPOLATIONS:
+            raise ValueError(
+                f"Unrecognised interpolation '{self._interpolation}', must be one of "
+                f"{ARM_INTERPOLATIONS}"
+            )
+
+        self._cspace_bins = args.get("cspace_bins")
+        self._link_tables = None
+        if self._cspace_bins:
+            if isinstance(self._img, tiled_map.TiledOccupancy):
+                raise ValueError(
+                    "The C-space tables cannot be precomputed for tiled maps"
+                )
+            self._link_tables = self._load_link_tables(args.get("cache_dir"))
+        if args.get("packed_map") and isinstance(self._img, np.ndarray):
+            self._img = PackedOccupancy(self._img)
+
+    def _load_link_tables(self, cache_dir: typing.Optional[str]):
+        """Load the collision tables of the two sticks (see
+        :func:`compute_link_collision_table`) from the disk cache, or build them if
+        they are not cached yet.
+
+        :param cache_dir: the folder that stores the cache
+
+        :return: the collision tables of the two sticks
+        """
+        lengths = [float(l) for l in self.stick_robot_length_config]
+        key = dict(
+            map=disk_cache.hash_array(self._img == 1),
+            rover_arm_robot_lengths=lengths,
+            bins=int(self._cspace_bins),
+        )
+
+        def build():
+            tables = {}
+            for i, length in enumerate(lengths):
+                tables[f"link{i}"] = compute_link_collision_table(
+                    self._img, length, int(self._cspace_bins)
+                )
+            return tables
+
+        tables = disk_cache.load_or_build(cache_dir, "4d-cspace", key, build)
+        return tables["link0"], tables["link1"]
 
     @property
     def image(self):
-        return self._img.T
+        return self._dense_image().T
+
+    def _dense_image(self) -> np.ndarray:
+        return ImgCollisionChecker._dense_image(self)
+
+    def clearance(self, p: np.ndarray) -> float:
+        """Get the distance (in pixels) from the base of the arm to its closest
+        obstacle. This is zero if the base is not in free space.
+
+        :param p: the configuration to query
+
+        """
+        return ImgCollisionChecker.clearance(self, p)
 
     def get_image_shape(self):
         return self._img.shape
@@ -355,12 +1784,15 @@ class RobotArm4dCollisionChecker(CollisionChecker):
         return steps[:, None] * np.arange(N) + start[:, None]
 
     def _interpolate_configs(self, c1, c2):
-        """Given two configs (x, y, r1, r2), return interpolate in-between
+        """Given two configs (x, y, r1, r2), return interpolate in-between, with the
+        interpolation that is selected by ``--4d-interpolation``
 
         :param c1: the first configuration
         :param c2: the second configuration
 
         """
+        if self._interpolation == "displacement":
+            return self._interpolate_configs_by_displacement(c1, c2)
         loc_interpolate = self._get_line(c1[:2], c2[:2])
         # print(np.array(loc_interpolate).T)
         if len(loc_interpolate) == 1:
@@ -373,14 +1805,169 @@ class RobotArm4dCollisionChecker(CollisionChecker):
 
         return combined
 
+    def _interpolate_configs_by_displacement(self, c1, c2):
+        """Given two configs (x, y, r1, r2), return interpolate in-between, such that
+        no point of the arm moves more than a pixel between consecutive
+        configurations. The configurations are returned in bisection order (see
+        :func:`bisection_order`), such that collisions are found early when they
+        are tested in order.
+
+        :param c1: the first configuration
+        :param c2: the second configuration
+
+        """
+        c1, c2 = np.asarray(c1, dtype=float), np.asarray(c2, dtype=float)
+        # any point of a stick moves no more than its joint plus the arc of its tip
+        displacement = (
+            math.hypot(c2[0] - c1[0], c2[1] - c1[1])
+            + self.stick_robot_length_config[0] * abs(c2[2] - c1[2])
+            + self.stick_robot_length_config[1] * abs(c2[3] - c1[3])
+        )
+        if not math.isfinite(displacement):
+            # nothing to interpolate, and the ends are never feasible
+            return np.stack([c1, c2])
+        num_steps = max(int(math.ceil(displacement)), 1)
+        ts = bisection_order(num_steps) / num_steps
+        return c1 + ts[:, None] * (c2 - c1)
+
     def visible(self, pos1, pos2):
         # get list of pixel between node A and B
         self.stats.visible_cnt += 1
-        for p in self._interpolate_configs(pos1, pos2):
-            if not self.feasible(p, save_stats=False):
+        if self._edge_within_clearance(pos1, pos2):
+            self.stats.clearance_accept_cnt += 1
+            return True
+        configs = self._interpolate_configs(pos1, pos2)
+        if self._interpolation != "displacement":
+            return bool(self._configs_feasible(configs).all())
+        # test in batches that grow geometrically, to stop at the first collision
+        # without giving up the vectorised checks
+        start, size = 0, BISECTION_FIRST_BATCH_SIZE
+        while start < len(configs):
+            if not self._configs_feasible(configs[start : start + size]).all():
+                return False
+            start, size = start + size, size * 4
+        return True
+
+    def visible_many(self, origin, targets):
+        self.stats.visible_cnt += len(targets)
+        result = np.array([self._edge_within_clearance(origin, t) for t in targets])
+        self.stats.clearance_accept_cnt += int(np.count_nonzero(result))
+        if result.all():
+            return result.astype(bool)
+        edges = [
+            self._interpolate_configs(origin, t)
+            for t, within_clearance in zip(targets, result)
+            if not within_clearance
+        ]
+        configs_free = self._configs_feasible(np.concatenate(edges))
+        # reduce the configurations back to each edge
+        edge_starts = np.cumsum([0] + [len(e) for e in edges[:-1]])
+        result[~result] = np.logical_and.reduceat(configs_free, edge_starts)
+        return result
+
+    def _edge_within_clearance(self, pos1: np.ndarray, pos2: np.ndarray) -> bool:
+        """Check if the arm is free along the entire edge, by only looking at the
+        clearance of the bases of the two configurations.
+
+        :param pos1: the starting configuration of the edge
+        :param pos2: the target configuration of the edge
+
+        """
+        if "clearance" not in self._accel:
+            return False
+        return segment_within_clearance(
+            self._clearance,
+            int(pos1[0]),
+            int(pos1[1]),
+            int(pos2[0]),
+            int(pos2[1]),
+            margin=self._arm_reach,
+        )
+
+    def feasible_many(self, configs):
+        self.stats.feasible_cnt += len(configs)
+        if len(configs) == 0:
+            return np.zeros(0, dtype=bool)
+        return self._configs_feasible(configs)
+
+    def _configs_feasible(self, configs: np.ndarray) -> np.ndarray:
+        """Check a batch of configurations by rasterising the sticks of all
+        configurations at once, then check all of their pixels with one gather.
+
+        :param configs: an array of configurations, one per row
+
+        :return: a boolean array that denotes whether each configuration is free
+        """
+        configs = np.asarray(configs, dtype=float)
+        if self._link_tables is not None:
+            return self._configs_feasible_by_tables(configs)
+        pt1 = configs[:, :2]
+        pt2 = pt1 + self.stick_robot_length_config[0] * np.stack(
+            [np.cos(configs[:, 2]), np.sin(configs[:, 2])], axis=1
+        )
+        pt3 = pt2 + self.stick_robot_length_config[1] * np.stack(
+            [np.cos(configs[:, 3]), np.sin(configs[:, 3])], axis=1
+        )
+        xs, ys, line_starts = ImgCollisionChecker.get_lines_indices(
+            np.concatenate([pt1, pt2]), np.concatenate([pt2, pt3])
+        )
+        sticks_free = np.logical_and.reduceat(
+            pixels_free(self._img, xs, ys), line_starts
+        )
+        # both sticks of a configuration should be free
+        return sticks_free[: len(configs)] & sticks_free[len(configs) :]
+
+    def _feasible_by_tables(self, p) -> bool:
+        """Check if a configuration is free by looking up the precomputed collision
+        tables of the two sticks, at the discretised angles of each stick.
+
+        :param p: the configuration to check
+
+        """
+        if not all(math.isfinite(v) for v in p):
+            return False
+        w, h = self._img.shape
+        x, y = p[0], p[1]
+        for i, angle in enumerate(p[2:4]):
+            if not (0 <= x < w and 0 <= y < h):
+                return False
+            xi, yi = int(x), int(y)
+            b = min(
+                int(angle % (2 * math.pi) * self._cspace_bins / (2 * math.pi)),
+                self._cspace_bins - 1,
+            )
+            if (self._link_tables[i][b, xi, yi >> 3] >> (7 - (yi & 7))) & 1:
                 return False
+            # the joint of the second stick
+            x += self.stick_robot_length_config[i] * math.cos(angle)
+            y += self.stick_robot_length_config[i] * math.sin(angle)
         return True
 
+    def _configs_feasible_by_tables(self, configs: np.ndarray) -> np.ndarray:
+        """Vectorised version of :meth:`_feasible_by_tables`
+
+        :param configs: an array of configurations, one per row
+
+        :return: a boolean array that denotes whether each configuration is free
+        """
+        configs = np.asarray(configs, dtype=float)
+        w, h = self._img.shape
+        free = np.isfinite(configs).all(axis=1)
+        configs = np.where(free[:, None], configs, 0)
+        elbows = configs[:, :2] + self.stick_robot_length_config[0] * np.stack(
+            [np.cos(configs[:, 2]), np.sin(configs[:, 2])], axis=1
+        )
+        for i, (starts, angles) in enumerate(
+            ((configs[:, :2], configs[:, 2]), (elbows, configs[:, 3]))
+        ):
+            free &= (starts >= 0).all(axis=1) & (starts[:, 0] < w) & (starts[:, 1] < h)
+            xs = np.where(free, starts[:, 0], 0).astype(int)
+            ys = np.where(free, starts[:, 1], 0).astype(int)
+            bins = angle_to_bin(angles, self._cspace_bins)
+            collide = (self._link_tables[i][bins, xs, ys >> 3] >> (7 - (ys & 7))) & 1
+            free &= collide == 0
+        return free
+
     def _pt_feasible(self, p):
         """check if point is white (which means free space) in 2d
 
@@ -395,25 +1982,56 @@ class RobotArm4dCollisionChecker(CollisionChecker):
     def feasible(self, p, save_stats=True):
         if save_stats:
             self.stats.feasible_cnt += 1
+        if self._link_tables is not None:
+            return self._feasible_by_tables(p)
         pt1 = p[:2]
         pt2 = self.get_pt_from_angle_and_length(
             pt1, p[2], self.stick_robot_length_config[0]
         )
 
         # this stick should be free
-        for __p in self._get_line(pt1, pt2):
-            if not self._pt_feasible(__p):
-                return False
+        if not self._stick_feasible(pt1, pt2):
+            return False
 
         pt3 = self.get_pt_from_angle_and_length(
             pt2, p[3], self.stick_robot_length_config[1]
         )
 
         # this stick should be free
-        for __p in self._get_line(pt2, pt3):
+        if not self._stick_feasible(pt2, pt3):
+            return False
+
+        return True
+
+    def _stick_feasible(self, pt1, pt2):
+        """Check if one stick of the arm is in free space
+
+        :param pt1: the starting point of the stick
+        :param pt2: the ending point of the stick
+
+        """
+        x1, y1 = int(pt1[0]), int(pt1[1])
+        x2, y2 = int(pt2[0]), int(pt2[1])
+        if "clearance" in self._accel and segment_within_clearance(
+            self._clearance, x1, y1, x2, y2
+        ):
+            self.stats.clearance_accept_cnt += 1
+            return True
+        if "sat" in self._accel and box_free_in_table(
+            self._obstacle_sat, min(x1, x2), min(y1, y2), max(x1, x2), max(y1, y2)
+        ):
+            self.stats.box_accept_cnt += 1
+            return True
+        if (
+            "pyramid" in self._accel
+            and max(abs(x2 - x1), abs(y2 - y1)) >= PYRAMID_MIN_LINE_LENGTH
+            and self._pyramid.contains(x1, y1)
+            and self._pyramid.contains(x2, y2)
+        ):
+            return self._pyramid.segment_free(x1, y1, x2, y2)
+        for __p in self._get_line(pt1, pt2):
             if not self._pt_feasible(__p):
                 return False
-
         return True
 
     @staticmethod
@@ -492,3 +2110,773 @@ class RobotArm4dCollisionChecker(CollisionChecker):
         if swapped:
             points.reverse()
         return points
+
+
+class VoxelCollisionChecker(CollisionChecker):
+    """N-dimensional voxel space engine, e.g., for point robots in 3D.
+
+    The map is a ``.npy`` file of an N-D occupancy array, where non-zero voxels are
+    obstacles and each voxel is a unit cube. The array is memory-mapped instead of
+    being loaded into memory, hence only the voxels that are being queried are paged
+    in. Anything outside of the array is treated as an obstacle.
+    """
+
+    def __init__(self, fname: str, stats: Stats, args: MagicDict):
+        """
+        :param fname: the filename of the ``.npy`` occupancy array
+        :param stats: the Stats object to keep track of stats
+        :param args: an instance of the input arguments
+        """
+        super().__init__(stats)
+        self._occupancy = np.load(fname, mmap_mode="r")
+        if self._occupancy.ndim < 1 or self._occupancy.dtype.hasobject:
+            raise ValueError(f"'{fname}' is not an N-D occupancy array")
+        self._shape = np.array(self._occupancy.shape)
+
+    def get_image_shape(self):
+        return self._occupancy.shape
+
+    def get_dimension(self):
+        return self._occupancy.ndim
+
+    def _voxels_free(self, voxels: np.ndarray) -> np.ndarray:
+        """Check a batch of voxels with one lookup into the occupancy array.
+        Voxels that are outside of the array are treated as not free.
+
+        :param voxels: integer array of voxel indices, one per row
+
+        :return: a boolean array that denotes whether each voxel is free
+        """
+        in_bound = ((voxels >= 0) & (voxels < self._shape)).all(axis=1)
+        free = np.zeros(len(voxels), dtype=bool)
+        free[in_bound] = self._occupancy[tuple(voxels[in_bound].T)] == 0
+        return free
+
+    def feasible(self, p, save_stats=True):
+        if save_stats:
+            self.stats.feasible_cnt += 1
+        p = np.asarray(p, dtype=float)
+        if not np.isfinite(p).all():
+            return False
+        return bool(self._voxels_free(np.floor(p).astype(int)[np.newaxis])[0])
+
+    def feasible_many(self, configs):
+        configs = np.asarray(configs, dtype=float)
+        self.stats.feasible_cnt += len(configs)
+        # non-finite configurations are never free
+        valid = np.isfinite(configs).all(axis=1)
+        result = np.zeros(len(configs), dtype=bool)
+        result[valid] = self._voxels_free(np.floor(configs[valid]).astype(int))
+        return result
+
+    def visible(self, pos1, pos2):
+        self.stats.visible_cnt += 1
+        pos1, pos2 = np.asarray(pos1, dtype=float), np.asarray(pos2, dtype=float)
+        if not (np.isfinite(pos1).all() and np.isfinite(pos2).all()):
+            return False
+        start = np.floor(pos1).astype(int)
+        end = np.floor(pos2).astype(int)
+        return bool(
+            self._voxels_free(start + self._get_line_offsets(end - start)).all()
+        )
+
+    def visible_many(self, origin, targets):
+        targets = np.asarray(targets, dtype=float)
+        self.stats.visible_cnt += len(targets)
+        result = np.zeros(len(targets), dtype=bool)
+        origin = np.asarray(origin, dtype=float)
+        if len(targets) == 0 or not np.isfinite(origin).all():
+            return result
+        # non-finite targets cannot be rasterised and are never visible
+        valid = np.isfinite(targets).all(axis=1)
+        start = np.floor(origin).astype(int)
+        offsets = [
+            self._get_line_offsets(d)
+            for d in np.floor(targets[valid]).astype(int) - start
+        ]
+        if offsets:
+            lengths = np.array([len(o) for o in offsets])
+            # check all voxels at once, then reduce it back to each line
+            result[valid] = np.logical_and.reduceat(
+                self._voxels_free(start + np.concatenate(offsets)),
+                np.cumsum(lengths) - lengths,
+            )
+        return result
+
+    @staticmethod
+    def get_line_indices(start, end) -> np.ndarray:
+        """Produces the voxels of a digital line between two voxels, which is the
+        N-dimensional generalisation of Bresenham's line.
+
+        :param start: the starting voxel
+        :param end: the ending voxel
+
+        :return: the array of voxel indices along the line, one per row
+        """
+        start = np.asarray(start, dtype=int)
+        return start + VoxelCollisionChecker._get_line_offsets(
+            np.asarray(end, dtype=int) - start
+        )
+
+    @staticmethod
+    def _get_line_offsets(delta: np.ndarray) -> np.ndarray:
+        """Produces the voxel offsets of a digital line from the origin to
+        ``delta``.
+
+        :param delta: the offset of the ending voxel
+
+        """
+        return VoxelCollisionChecker._get_cached_line_offsets(tuple(delta.tolist()))
+
+    @staticmethod
+    @functools.lru_cache(maxsize=16384)
+    def _get_cached_line_offsets(delta: typing.Tuple[int, ...]) -> np.ndarray:
+        """Cached version of :meth:`_get_line_offsets`. Edges are mostly bounded by
+        epsilon, hence there are only a few unique offsets.
+
+        :param delta: the offset of the ending voxel as a tuple of integers
+
+        """
+        delta = np.array(delta, dtype=int)
+        num_steps = int(np.abs(delta).max(initial=0))
+        # step along the major axis one voxel at a time, and round the other
+        # coordinates to the nearest voxel with integer arithmetic, such that
+        # consecutive voxels are always adjacent
+        steps = np.arange(num_steps + 1)[:, np.newaxis]
+        offsets = (2 * steps * delta + num_steps) // (2 * max(num_steps, 1))
+        # these are shared by all callers
+        offsets.flags.writeable = False
+        return offsets
+
+
+class PolygonCollisionChecker(CollisionChecker):
+    """2D vector map engine, which uses the same images as
+    :class:`ImgCollisionChecker`.
+
+    The boundary of the obstacles is extracted from the image once (see
+    :func:`extract_obstacle_edges`) and indexed in a :class:`SegmentBVH`. An edge is
+    visible if both of its ends are free and it does not cross the boundary, which
+    is an analytic test whose cost scales with the number of nearby obstacle edges
+    instead of the number of pixels along the edge. Each pixel ``(x, y)`` covers the
+    unit square ``[x, x + 1) x [y, y + 1)``, and anything outside of the image is
+    treated as an obstacle. An edge is visible exactly when every point along it is
+    feasible, hence edges that only touch the boundary (e.g. running along the side
+    of an obstacle that belongs to the free pixels next to it) could be visible.
+
+    The boundary of diagonal or curved obstacles is a staircase of pixels, whose
+    number of edges grows with the resolution of the map. With
+    ``--polygon-simplify``, the boundary is simplified within a tolerance instead
+    (see :func:`simplify_segments`), and an edge is only visible if both of its
+    ends are free and it stays further than the tolerance from the simplified
+    boundary. This is conservative, as every point of the exact boundary is within
+    the tolerance of the simplified one.
+    """
+
+    def __init__(self, img: typing.IO, stats: Stats, args: MagicDict):
+        """
+        :param img: a file-like object (e.g. a filename) for the image as the
+            environment that the planning operates in
+        :param stats: the Stats object to keep track of stats
+        :param args: an instance of the input arguments
+        """
+        super().__init__(stats)
+        # the boundary is extracted from the whole map, even for a tiled one
+        self._img = np.asarray(load_occupancy_map(img))
+        edges = extract_obstacle_edges(self._img)
+        # the map is convex, hence edges between two points within the map never
+        # cross its border, and the border would only enlarge the bounding boxes
+        w, h = self._img.shape
+        on_border = ((edges[:, 0] == edges[:, 2]) & np.isin(edges[:, 0], (0, w))) | (
+            (edges[:, 1] == edges[:, 3]) & np.isin(edges[:, 1], (0, h))
+        )
+        edges = edges[~on_border]
+        self.simplify_tolerance = args.get("polygon_simplify")
+        if self.simplify_tolerance is not None and self.simplify_tolerance <= 0:
+            raise ValueError(
+                f"The simplification tolerance must be positive, got "
+                f"{self.simplify_tolerance}"
+            )
+        if self.simplify_tolerance:
+            num_edges = len(edges)
+            edges = simplify_segments(edges, self.simplify_tolerance)
+            LOGGER.info(
+                f"Simplified {num_edges} obstacle edges into {len(edges)} within "
+                f"{self.simplify_tolerance} pixels"
+            )
+        self.bvh = SegmentBVH(edges)
+        LOGGER.info(f"Indexed {len(self.bvh)} obstacle edges of the map")
+
+    @property
+    def image(self) -> np.ndarray:
+        """The image that represents the planning problem
+
+        :return: the input image, where free pixels are True
+        """
+        return self._img.T
+
+    def get_image_shape(self):
+        return self._img.shape
+
+    def get_dimension(self):
+        return 2
+
+    def _point_free(self, x: float, y: float) -> bool:
+        """Check if the pixel that contains the given point is free
+
+        :param x: the first coordinate of the point
+        :param y: the second coordinate of the point
+
+        """
+        w, h = self._img.shape
+        return 0 <= x < w and 0 <= y < h and bool(self._img[int(x), int(y)])
+
+    def feasible(self, p, save_stats=True):
+        if save_stats:
+            self.stats.feasible_cnt += 1
+        # comparisons with nan are always False
+        return self._point_free(float(p[0]), float(p[1]))
+
+    def visible(self, pos1, pos2):
+        self.stats.visible_cnt += 1
+        x1, y1 = float(pos1[0]), float(pos1[1])
+        x2, y2 = float(pos2[0]), float(pos2[1])
+        if not (math.isfinite(x2) and math.isfinite(y2)):
+            return False
+        # the free space is bounded by the obstacle edges and the border of the map,
+        # hence the whole edge is free if both of its ends are free and it never
+        # meets any obstacle edge
+        if not (self._point_free(x1, y1) and self._point_free(x2, y2)):
+            return False
+        if self.simplify_tolerance:
+            # every point along the exact boundary is within the tolerance of the
+            # simplified one, and an edge with free ends that meets an obstacle
+            # meets the exact boundary
+            return not self.bvh.within_distance(
+                x1, y1, x2, y2, self.simplify_tolerance + CLEARANCE_TOLERANCE
+            )
+        contacts = self.bvh.intersecting(x1, y1, x2, y2)
+        return not contacts or self._free_along_contacts(x1, y1, x2, y2, contacts)
+
+    def _free_along_contacts(
+        self,
+        x1: float,
+        y1: float,
+        x2: float,
+        y2: float,
+        contacts: typing.List[typing.Tuple[float, float, float, float]],
+    ) -> bool:
+        """Check an edge with free ends that meets some obstacle edges. It is
+        blocked if it crosses any of them. Otherwise, it only touches the boundary
+        at some points (or runs along it), which split the edge into parts that are
+        either entirely free or entirely within an obstacle. Hence, the edge is
+        free if each of those points, and a point within each part, is free.
+
+        :param x1: the first coordinate of the starting point
+        :param y1: the second coordinate of the starting point
+        :param x2: the first coordinate of the ending point
+        :param y2: the second coordinate of the ending point
+        :param contacts: the obstacle edges that the edge intersects or touches
+
+        """
+        dx, dy = x2 - x1, y2 - y1
+        length2 = dx * dx + dy * dy
+        # the parameter along the edge and the exact coordinates of each point
+        points = [(0.0, x1, y1), (1.0, x2, y2)]
+        for ax, ay, bx, by in contacts:
+            # the same orientations as segments_intersect
+            o1 = dx * (ay - y1) - dy * (ax - x1)
+            o2 = dx * (by - y1) - dy * (bx - x1)
+            o3 = (bx - ax) * (y1 - ay) - (by - ay) * (x1 - ax)
+            o4 = (bx - ax) * (y2 - ay) - (by - ay) * (x2 - ax)
+            if o1 * o2 < 0 and o3 * o4 < 0:
+                # crosses the interior of the obstacle edge
+                return False
+            if length2 == 0:
+                # a single point, which is free
+                continue
+            # the ends of the obstacle edge that lie on the edge
+            for px, py, o in ((ax, ay, o1), (bx, by, o2)):
+                t = ((px - x1) * dx + (py - y1) * dy) / length2
+                if o == 0 and 0 <= t <= 1:
+                    points.append((t, px, py))
+            if o1 == 0 and o2 == 0:
+                # Runs along an axis-aligned obstacle edge, where the pixels that
+                # contain its points change at each grid line. The edge is
+                # axis-aligned as well, hence the coordinates are exact.
+                t_a = ((ax - x1) * dx + (ay - y1) * dy) / length2
+                t_b = ((bx - x1) * dx + (by - y1) * dy) / length2
+                t_lo, t_hi = max(min(t_a, t_b), 0.0), min(max(t_a, t_b), 1.0)
+                if dx != 0:
+                    lo, hi = sorted((x1 + t_lo * dx, x1 + t_hi * dx))
+                    for x in range(math.ceil(lo), math.floor(hi) + 1):
+                        points.append(((x - x1) / dx, float(x), y1))
+                else:
+                    lo, hi = sorted((y1 + t_lo * dy, y1 + t_hi * dy))
+                    for y in range(math.ceil(lo), math.floor(hi) + 1):
+                        points.append(((y - y1) / dy, x1, float(y)))
+        points.sort()
+        for (t1, _, _), (t2, px, py) in zip(points, points[1:]):
+            if not self._point_free(px, py):
+                return False
+            t = (t1 + t2) / 2
+            if t2 > t1 and not self._point_free(x1 + t * dx, y1 + t * dy):
+                return False
+        return True
+
+
+class CollisionCheckerWrapper(CollisionChecker):
+    """Base class for collision checkers that add functionality around an existing
+    collision checker. Everything is passed through to the wrapped collision
+    checker, unless it is overridden by the derived class.
+
+    :param cc: the collision checker to wrap around
+    """
+
+    def __init__(self, cc: CollisionChecker):
+        super().__init__(cc.stats)
+        self.cc = cc
+
+    def __getattr__(self, attr):
+        """This is called when self.attr doesn't exist, which passes through to the
+        wrapped collision checker.
+
+        :param attr: attribute to access
+        :return: self.cc.attr
+        """
+        if attr == "cc":
+            # not yet initialised
+            raise AttributeError(attr)
+        return getattr(self.cc, attr)
+
+    @property
+    def unwrapped(self) -> CollisionChecker:
+        return self.cc.unwrapped
+
+    def get_dimension(self):
+        return self.cc.get_dimension()
+
+    def visible(self, pos1, pos2):
+        return self.cc.visible(pos1, pos2)
+
+    def visible_many(self, origin, targets):
+        return self.cc.visible_many(origin, targets)
+
+    def feasible(self, p, *args, **kwargs):
+        return self.cc.feasible(p, *args, **kwargs)
+
+    def feasible_many(self, configs):
+        return self.cc.feasible_many(configs)
+
+    def get_image_shape(self):
+        return self.cc.get_image_shape()
+
+
+class EdgeCacheCollisionChecker(CollisionCheckerWrapper):
+    """Caches the results of visibility tests of the wrapped collision checker,
+    which helps planners that test the same edge repeatedly (e.g. RRT* tests the
+    same pair of nodes when choosing parent and when rewiring). The least recently
+    used edges are evicted when the cache is full.
+
+    An edge is keyed by the unordered pair of its two endpoints, which are
+    quantised to the given resolution by truncating towards zero. The planners
+    pass the positions of nodes rather than the nodes themselves, hence without
+    quantisation, the same two nodes share a cache entry through their identical
+    positions. Quantisation makes results approximate in general, but it is exact
+    for the image space engine with a resolution of 1, which truncates
+    configurations to pixels in the same way.
+
+    :param cc: the collision checker to wrap around
+    :param max_size: the maximum number of edges to keep
+    :param resolution: the resolution to quantise the endpoints with, or ``None``
+        to use the exact endpoints
+    """
+
+    def __init__(
+        self,
+        cc: CollisionChecker,
+        max_size: int,
+        resolution: typing.Optional[float] = None,
+    ):
+        super().__init__(cc)
+        if max_size <= 0:
+            raise ValueError("The size of the edge cache must be positive")
+        self.max_size = max_size
+        self.resolution = resolution
+        self._cache = OrderedDict()
+
+    def _key(self, pos1: np.ndarray, pos2: np.ndarray) -> tuple:
+        """Get the key of the edge between the two configurations
+
+        :param pos1: the starting configuration of the edge
+        :param pos2: the target configuration of the edge
+
+        """
+        pos1, pos2 = np.asarray(pos1, dtype=float), np.asarray(pos2, dtype=float)
+        if self.resolution is not None:
+            # truncated as the image space engine converts them to pixels, where
+            # adding zero turns -0.0 into 0.0, which has different bytes
+            pos1 = np.trunc(pos1 / self.resolution) + 0.0
+            pos2 = np.trunc(pos2 / self.resolution) + 0.0
+        key1, key2 = pos1.tobytes(), pos2.tobytes()
+        return (key1, key2) if key1 <= key2 else (key2, key1)
+
+    def _lookup(self, key: tuple) -> typing.Optional[bool]:
+        """Look up the cached visibility of an edge, and record the hit or miss
+
+        :param key: the key of the edge
+
+        :return: the cached visibility, or ``None`` if it is not cached
+        """
+        result = self._cache.get(key)
+        if result is None:
+            self.stats.edge_cache_miss_cnt += 1
+        else:
+            self.stats.edge_cache_hit_cnt += 1
+            self._cache.move_to_end(key)
+        return result
+
+    def _store(self, key: tuple, result: bool):
+        """Store the visibility of an edge, and evict the least recently used edge
+        if the cache is full
+
+        :param key: the key of the edge
+        :param result: the visibility of the edge
+
+        """
+        self._cache[key] = result
+        if len(self._cache) > self.max_size:
+            self._cache.popitem(last=False)
+
+    def visible(self, pos1, pos2):
+        key = self._key(pos1, pos2)
+        result = self._lookup(key)
+        if result is None:
+            result = bool(self.cc.visible(pos1, pos2))
+            self._store(key, result)
+        return result
+
+    def visible_many(self, origin, targets):
+        keys = [self._key(origin, t) for t in targets]
+        cached = [self._lookup(k) for k in keys]
+        result = np.array([bool(r) for r in cached], dtype=bool)
+        missed = np.array([r is None for r in cached], dtype=bool)
+        if missed.any():
+            result[missed] = self.cc.visible_many(origin, np.asarray(targets)[missed])
+            for i in np.flatnonzero(missed):
+                self._store(keys[i], bool(result[i]))
+        return result
+
+    def clear(self):
+        """Remove all cached edges"""
+        self._cache.clear()
+
+
+class FeasibleCacheCollisionChecker(CollisionCheckerWrapper):
+    """Caches the results of feasibility tests of the wrapped collision checker,
+    which helps expensive engines (e.g. Klampt) where samplers retry nearly
+    identical configurations. The least recently used configurations are evicted
+    when the cache is full.
+
+    A configuration is keyed by quantising each of its coordinates to the given
+    resolution by truncating towards zero, hence configurations within the same
+    cell share the same result, which is exact for the image space engine with a
+    resolution of 1.
+    The cache could be persisted to the disk (see :mod:`utils.disk_cache`) under a
+    key that identifies the world, such that later runs on the same world start
+    with the results of earlier ones.
+
+    :param cc: the collision checker to wrap around
+    :param max_size: the maximum number of configurations to keep
+    :param resolution: the resolution to quantise the configurations with
+    :param cache_dir: the folder that persists the cache
+    :param world_key: a json serialisable dictionary that identifies the world
+        (e.g. the digest of its file), or ``None`` to not persist the cache
+    """
+
+    def __init__(
+        self,
+        cc: CollisionChecker,
+        max_size: int,
+        resolution: float,
+        cache_dir: typing.Optional[str] = None,
+        world_key: typing.Optional[typing.Dict] = None,
+    ):
+        super().__init__(cc)
+        if max_size <= 0:
+            raise ValueError("The size of the feasibility cache must be positive")
+        if resolution <= 0:
+            raise ValueError("The resolution of the feasibility cache must be positive")
+        self.max_size = max_size
+        self.resolution = resolution
+        self.cache_dir = cache_dir
+        self._persist_key = None
+        if world_key is not None:
+            self._persist_key = dict(
+                world_key, resolution=float(resolution), quantisation="trunc"
+            )
+        self._cache = OrderedDict()
+        self.load()
+
+    def _key(self, p: np.ndarray) -> bytes:
+        """Get the key of a configuration
+
+        :param p: the configuration
+
+        """
+        p = np.asarray(p, dtype=float)
+        # non-finite coordinates cannot be quantised, and are keyed as they are,
+        # where the rest are truncated as the image space engine converts them to
+        # pixels, and adding zero turns -0.0 into 0.0, which has different bytes
+        quantised = np.where(np.isfinite(p), np.trunc(p / self.resolution), p) + 0.0
+        return quantised.tobytes()
+
+    def _lookup(self, key: bytes) -> typing.Optional[bool]:
+        """Look up the cached feasibility of a configuration, and record the hit or
+        miss
+
+        :param key: the key of the configuration
+
+        :return: the cached feasibility, or ``None`` if it is not cached
+        """
+        result = self._cache.get(key)
+        if result is None:
+            self.stats.feasible_cache_miss_cnt += 1
+        else:
+            self.stats.feasible_cache_hit_cnt += 1
+            self._cache.move_to_end(key)
+        return result
+
+    def _store(self, key: bytes, result: bool):
+        """Store the feasibility of a configuration, and evict the least recently
+        used configuration if the cache is full
+
+        :param key: the key of the configuration
+        :param result: the feasibility of the configuration
+
+        """
+        self._cache[key] = result
+        if len(self._cache) > self.max_size:
+            self._cache.popitem(last=False)
+
+    def feasible(self, p, *args, **kwargs):
+        key = self._key(p)
+        result = self._lookup(key)
+        if result is None:
+            result = bool(self.cc.feasible(p, *args, **kwargs))
+            self._store(key, result)
+        return result
+
+    def feasible_many(self, configs):
+        keys = [self._key(p) for p in configs]
+        cached = [self._lookup(k) for k in keys]
+        result = np.array([bool(r) for r in cached], dtype=bool)
+        missed = np.array([r is None for r in cached], dtype=bool)
+        if missed.any():
+            result[missed] = self.cc.feasible_many(np.asarray(configs)[missed])
+            for i in np.flatnonzero(missed):
+                self._store(keys[i], bool(result[i]))
+        return result
+
+    def load(self):
+        """Load the persisted cache of the world, if there is any"""
+        if self._persist_key is None:
+            return
+        arrays = disk_cache.load(self.cache_dir, "feasible-cache", self._persist_key)
+        if arrays is None:
+            return
+        # the most recently used entries are stored last
+        for key, result in zip(
+            arrays["keys"][-self.max_size :], arrays["results"][-self.max_size :]
+        ):
+            self._cache[key.tobytes()] = bool(result)
+
+    def save(self):
+        """Persist the cache of the world to the disk"""
+        if self._persist_key is None or not self._cache:
+            return
+        keys = np.frombuffer(b"".join(self._cache), dtype=float)
+        keys = keys.reshape(len(self._cache), -1)
+        results = np.fromiter(self._cache.values(), dtype=bool, count=len(self._cache))
+        disk_cache.save(
+            self.cache_dir,
+            "feasible-cache",
+            self._persist_key,
+            dict(keys=keys, results=results),
+        )
+
+    def clear(self):
+        """Remove all cached configurations"""
+        self._cache.clear()
+
+
+class TimingCollisionChecker(CollisionCheckerWrapper):
+    """Records the latency of each call to the wrapped collision checker into
+    log-bucketed histograms (see :class:`utils.common.LatencyHistograms`), per
+    method and per outcome (free or blocked; a batch is free only if all of it is
+    free). Visibility tests are further bucketed by the length of the edge.
+
+    The collision checker is only wrapped when timing is requested, hence there is
+    no cost at all otherwise.
+
+    :param cc: the collision checker to wrap around
+    """
+
+    def __init__(self, cc: CollisionChecker):
+        super().__init__(cc)
+        if self.stats.latency is None:
+            self.stats.latency = LatencyHistograms()
+        self._record = self.stats.latency.record
+
+    def visible(self, pos1, pos2):
+        start = time.perf_counter_ns()
+        result = self.cc.visible(pos1, pos2)
+        elapsed = time.perf_counter_ns() - start
+        length = np.linalg.norm(np.subtract(pos2, pos1))
+        self._record(
+            "visible",
+            "free" if result else "blocked",
+            elapsed,
+            LatencyHistograms.length_to_bucket(length),
+        )
+        return result
+
+    def visible_many(self, origin, targets):
+        start = time.perf_counter_ns()
+        result = self.cc.visible_many(origin, targets)
+        elapsed = time.perf_counter_ns() - start
+        self._record("visible_many", "free" if result.all() else "blocked", elapsed)
+        return result
+
+    def feasible(self, p, *args, **kwargs):
+        start = time.perf_counter_ns()
+        result = self.cc.feasible(p, *args, **kwargs)
+        elapsed = time.perf_counter_ns() - start
+        self._record("feasible", "free" if result else "blocked", elapsed)
+        return result
+
+    def feasible_many(self, configs):
+        start = time.perf_counter_ns()
+        result = self.cc.feasible_many(configs)
+        elapsed = time.perf_counter_ns() - start
+        self._record("feasible_many", "free" if result.all() else "blocked", elapsed)
+        return result
+
+
+# the collision checker of the current worker process of a
+# ProcessPoolCollisionChecker
+_WORKER_CC = None
+
+
+def _init_worker(cc_factory: typing.Callable[[], CollisionChecker]):
+    """Create the collision checker of a worker process
+
+    :param cc_factory: a picklable function that creates the collision checker
+
+    """
+    global _WORKER_CC
+    _WORKER_CC = cc_factory()
+
+
+def _worker_call(method: str, *args) -> typing.Tuple[np.ndarray, typing.Dict[str, int]]:
+    """Call a method of the collision checker of the current worker process
+
+    :param method: the name of the method
+    :param args: the arguments of the method
+
+    :return: the result, and the counts that the call added to the stats of the
+        worker, which are lost unless they are sent back to the main process
+    """
+    before = _WORKER_CC.stats.counts()
+    result = getattr(_WORKER_CC, method)(*args)
+    after = _WORKER_CC.stats.counts()
+    return result, {
+        attr: count - before.get(attr, 0)
+        for attr, count in after.items()
+        if count != before.get(attr, 0)
+    }
+
+
+class ProcessPoolCollisionChecker(CollisionCheckerWrapper):
+    """Distributes batched collision checks (i.e. :meth:`visible_many` and
+    :meth:`feasible_many`) across a pool of worker processes, where each worker
+    creates its own collision checker (e.g. loads its own Klampt world from the same
+    xml file). This is most useful for engines with expensive checks, such as the
+    Klampt engine, whose checks are not vectorised and hold the interpreter.
+
+    Single queries and batches that are smaller than ``min_batch_size`` are checked
+    by the wrapped collision checker in the main process, as they are not worth the
+    cost of sending them to the workers. The counts that the checks of the workers
+    add to their own stats are added to the stats of the main process.
+
+    :param cc: the collision checker to wrap around
+    :param cc_factory: a picklable function (e.g. a :func:`functools.partial` of
+        a collision checker class) that creates an equivalent collision checker in
+        each worker process
+    :param num_workers: the number of worker processes
+    :param min_batch_size: the minimum size of a batch to be checked by the workers
+    """
+
+    def __init__(
+        self,
+        cc: CollisionChecker,
+        cc_factory: typing.Callable[[], CollisionChecker],
+        num_workers: int,
+        min_batch_size: int = 2,
+    ):
+        super().__init__(cc)
+        if num_workers <= 0:
+            raise ValueError("The number of collision checker workers must be positive")
+        import multiprocessing
+        import weakref
+
+        self.num_workers = num_workers
+        self.min_batch_size = max(min_batch_size, 1)
+        # start fresh interpreters, as the state of simulators (e.g. Klampt) in the
+        # main process might not survive a fork
+        self._pool = multiprocessing.get_context("spawn").Pool(
+            num_workers, initializer=_init_worker, initargs=(cc_factory,)
+        )
+        weakref.finalize(self, self._pool.terminate)
+
+    def _split(self, array: np.ndarray) -> typing.List[np.ndarray]:
+        """Split a batch evenly into one chunk per worker
+
+        :param array: the batch to split
+
+        """
+        return [c for c in np.array_split(array, self.num_workers) if len(c) > 0]
+
+    def _gather(self, results) -> np.ndarray:
+        """Gather the results of the workers, and add their counts to the stats
+
+        :param results: the result and the counts of each worker
+
+        """
+        for _, counts in results:
+            self.stats.add_counts(counts)
+        return np.concatenate([result for result, _ in results]).astype(bool)
+
+    def visible_many(self, origin, targets):
+        targets = np.asarray(targets)
+        if len(targets) < self.min_batch_size:
+            return self.cc.visible_many(origin, targets)
+        return self._gather(
+            self._pool.starmap(
+                _worker_call,
+                [("visible_many", origin, c) for c in self._split(targets)],
+            )
+        )
+
+    def feasible_many(self, configs):
+        configs = np.asarray(configs)
+        if len(configs) < self.min_batch_size:
+            return self.cc.feasible_many(configs)
+        return self._gather(
+            self._pool.starmap(
+                _worker_call, [("feasible_many", c) for c in self._split(configs)]
+            )
+        )
+
+    def close(self):
+        """Stop the worker processes"""
+        self._pool.terminate()
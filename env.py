@@ -1,13 +1,17 @@
 #!/usr/bin/env python
+import functools
 import logging
 import math
+import os
 import random
 import time
+import typing
 
 import numpy as np
 from tqdm import tqdm
 
 import collisionChecker
+from utils import disk_cache, nn_index
 from utils.common import Node, MagicDict, Stats
 from utils.csv_stats_logger import setup_csv_stats_logger, get_non_existing_filename
 from visualiser import VisualiserSwitcher
@@ -40,19 +44,71 @@ class Env:
             "image": (collisionChecker.ImgCollisionChecker, self.euclidean_dist),
             "4d": (collisionChecker.RobotArm4dCollisionChecker, self.euclidean_dist),
             "klampt": (collisionChecker.KlamptCollisionChecker, self.radian_dist),
+            "voxel": (collisionChecker.VoxelCollisionChecker, self.euclidean_dist_nd),
+            "polygon": (collisionChecker.PolygonCollisionChecker, self.euclidean_dist),
         }[self.args.engine]
+        # the period of each dimension of the configurations if dist wraps around
+        self.dist_period = nn_index.ENGINE_PERIODS.get(self.args.engine)
+        # whether dist is the metric of the nearest neighbour indices of the
+        # planners, i.e. the Euclidean distance over all dimensions of the
+        # configurations (which wraps around with dist_period), such that the
+        # planners could find the nodes within a radius with their indices
+        self.dist_matches_nn_index = self.args.engine in (
+            "image",
+            "voxel",
+            "polygon",
+            "klampt",
+        )
         self.cc = cc_type(self.args.image, stats=self.stats, args=self.args)
+        if self.args.get("cc_workers"):
+            # workers only receive the arguments that could be sent to them
+            cc_args = MagicDict(
+                (k, v)
+                for k, v in self.args.items()
+                if isinstance(v, (str, int, float, bool, tuple, list, type(None)))
+            )
+            self.cc = collisionChecker.ProcessPoolCollisionChecker(
+                self.cc,
+                functools.partial(cc_type, self.args.image, Stats(), cc_args),
+                num_workers=self.args.cc_workers,
+            )
+        self._feasible_cache = None
+        if self.args.get("feasible_cache_size"):
+            self.cc = (
+                self._feasible_cache
+            ) = collisionChecker.FeasibleCacheCollisionChecker(
+                self.cc,
+                max_size=self.args.feasible_cache_size,
+                resolution=self.args.feasible_cache_resolution,
+                cache_dir=self.args.get("cache_dir"),
+                world_key=self._get_world_key()
+                if self.args.get("persist_feasible_cache")
+                else None,
+            )
+        if self.args.get("edge_cache_size"):
+            self.cc = collisionChecker.EdgeCacheCollisionChecker(
+                self.cc,
+                max_size=self.args.edge_cache_size,
+                resolution=self.args.get("edge_cache_resolution"),
+            )
+
+        if self.args.get("time_cc"):
+            # outermost, such that it measures the time that the planner spends
+            self.cc = collisionChecker.TimingCollisionChecker(self.cc)
 
         # setup visualiser
         if self.args.no_display:
             # use pass-through visualiser
             VisualiserSwitcher.choose_visualiser("base")
         else:
-            if self.args.engine in ("image", "4d"):
+            if self.args.engine in ("image", "4d", "polygon"):
                 # use pygame visualiser
                 VisualiserSwitcher.choose_visualiser("pygame")
             elif self.args.engine == "klampt":
                 VisualiserSwitcher.choose_visualiser("klampt")
+            elif self.args.engine == "voxel":
+                # there is no visualiser for N-D voxel maps
+                VisualiserSwitcher.choose_visualiser("base")
 
         self.args["num_dim"] = self.cc.get_dimension()
         self.args["image_shape"] = self.cc.get_image_shape()
@@ -164,6 +220,17 @@ class Env:
         p = p1 - p2
         return math.sqrt(p[0] ** 2 + p[1] ** 2)
 
+    @staticmethod
+    def euclidean_dist_nd(p1: np.ndarray, p2: np.ndarray):
+        """Return the Euclidean distance between p1 and p2 over all of their
+        dimensions
+
+        :param p1: first configuration :math:`q_1`
+        :param p2: second configuration :math:`q_2`
+
+        """
+        return math.sqrt(sum((a - b) ** 2 for a, b in zip(p1, p2)))
+
     def step_from_to(self, p1: np.ndarray, p2: np.ndarray):
         """Get a new point from p1 to p2, according to step size.
 
@@ -177,21 +244,55 @@ class Env:
             # p1 is at the same point as p2
             return p2
         unit_vector = p2 - p1
+        if self.dist_period is not None:
+            # step along the shorter way around, as measured by dist
+            unit_vector = (
+                unit_vector + self.dist_period / 2
+            ) % self.dist_period - self.dist_period / 2
+            if np.isclose(unit_vector, 0).all():
+                # p1 is at the same point as p2 after wrapping around
+                return p2
         unit_vector = unit_vector / np.linalg.norm(unit_vector)
         step_size = self.dist(p1, p2)
         step_size = min(step_size, self.args.epsilon)
-        return p1 + step_size * unit_vector
+        new_pos = p1 + step_size * unit_vector
+        if self.dist_period is not None:
+            # wrap the new configuration back into [-period / 2, period / 2)
+            new_pos = (
+                new_pos + self.dist_period / 2
+            ) % self.dist_period - self.dist_period / 2
+        return new_pos
+
+    def _get_world_key(self) -> typing.Optional[typing.Dict]:
+        """Get the key that identifies the world, i.e., the content of the map
+        together with the arguments that affect the feasibility of configurations.
+
+        :return: the key, or ``None`` if the map cannot be identified
+        """
+        if not isinstance(self.args.image, str) or not os.path.isfile(self.args.image):
+            LOGGER.warning(
+                f"Unable to identify the map '{self.args.image}', the feasibility "
+                f"cache will not be persisted"
+            )
+            return None
+        key = dict(engine=self.args.engine, world=disk_cache.hash_file(self.args.image))
+        if self.args.engine == "4d":
+            key["rover_arm_robot_lengths"] = list(
+                map(float, self.args.rover_arm_robot_lengths)
+            )
+            key["cspace_bins"] = self.args.get("cspace_bins")
+        return key
 
     def run(self):
         """Run until we reached the specified max nodes"""
         self.started = True
 
+        csv_fname = None
         if self.args.save_output:
-            setup_csv_stats_logger(
-                get_non_existing_filename(
-                    self.args.output_dir + "/%Y-%m-%d_%H-%M{}.csv"
-                )
+            csv_fname = get_non_existing_filename(
+                self.args.output_dir + "/%Y-%m-%d_%H-%M{}.csv"
             )
+            setup_csv_stats_logger(csv_fname)
             csv_logger = logging.getLogger("CSV_STATS")
             csv_logger.info(
                 [
@@ -199,6 +300,7 @@ class Env:
                     "time",
                     "cc_feasibility",
                     "cc_visibility",
+                    "cc_edge_queries",
                     "invalid_feasibility",
                     "invalid_visibility",
                     "c_max",
@@ -232,6 +334,7 @@ class Env:
                             time.time() - start_time,
                             self.stats.feasible_cnt,
                             self.stats.visible_cnt,
+                            self.stats.edge_query_cnt,
                             self.stats.invalid_samples_obstacles,
                             self.stats.invalid_samples_connections,
                             self.planner.c_max,
@@ -239,4 +342,13 @@ class Env:
                     )
                 pbar.refresh()
 
+        if self._feasible_cache is not None:
+            LOGGER.info(
+                f"Feasibility cache hit rate: {self.stats.feasible_cache_hit_rate:.2%}"
+            )
+            self._feasible_cache.save()
+        if self.stats.latency is not None and csv_fname is not None:
+            latency_fname = os.path.splitext(csv_fname)[0] + ".latency.csv"
+            self.stats.latency.write_csv(latency_fname)
+            LOGGER.info(f"Saved the latency of collision checks to '{latency_fname}'")
         self.visualiser.terminates_hook()
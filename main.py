@@ -12,7 +12,10 @@ Usage:
 
 Arguments:
   (rrt|...|...)          Set the sampler to be used by the RRT*.
-  <MAP>                  An image/xml file that represent the map.
+  <MAP>                  An image/xml file that represent the map, the folder
+                         of a tiled map (see utils/tiled_map.py) that is paged
+                         in on demand, or a .npy file of an N-D occupancy array
+                         where non-zero voxels are obstacles.
 
 General Options:
   -h --help              Show this screen.
@@ -21,15 +24,79 @@ General Options:
 
 Environment Options:
   -e --engine=ENGINE     Environment engine to use.
-                         Could be either "image", "klampt" or "4d".
+                         Could be either "image", "polygon", "klampt", "4d" or
+                         "voxel".
                          "image" engine uses an image as the map.
+                         "polygon" engine uses the obstacle boundary of an image
+                           as the map, and checks edges analytically.
                          "4d" engine uses an image as the map and an 4d robot arm.
                          "klampt" engine is a multi-dof engine that is more
                            features rich.
+                         "voxel" engine uses an N-D occupancy array as the map
+                           for a point robot.
   -o --output-dir=STATS_DIR
                          Specify the output folder [default: runs]
   --save-output          When set, the planning stats will be saved under the
                          'STATS_DIR' folder
+  --cc-accel=STRUCTURES  Comma separated list of acceleration structures that
+                         the "image" and "4d" engines use to avoid checking
+                         each pixel of a line.
+                         Supported structures are:
+                         - clearance (distance transform of the free space)
+                         - pyramid (max-pooled occupancy pyramid)
+                         - sat (summed-area table of the obstacles)
+                         - none (always check each pixel)
+                         Defaults to "clearance,pyramid", or to "none" with
+                         --packed-map as each structure takes more memory
+                         than the packed map.
+  --edge-cache=SIZE      Cache the results of up to SIZE visibility tests, where
+                         the least recently used ones are evicted first.
+                         Disabled when not given.
+  --edge-cache-resolution=RES
+                         Quantise the endpoints of the cached edges to this
+                         resolution, such that nearby edges share the same
+                         result (exact for the "image" engine when it is 1).
+                         Uses the exact endpoints when not given.
+  --feasible-cache=SIZE  Cache the results of up to SIZE feasibility tests, where
+                         the least recently used ones are evicted first.
+                         Disabled when not given.
+  --feasible-cache-resolution=RES
+                         Quantise the cached configurations to this resolution,
+                         such that nearby configurations share the same result
+                         (exact for the "image" engine when it is 1).
+                         [default: 0.001]
+  --persist-feasible-cache
+                         Persist the feasibility cache under 'CACHE_DIR' at the
+                         end of the run, and start with the persisted cache of
+                         earlier runs on the same map.
+  --time-cc              Record log-bucketed histograms of the latency of the
+                         collision checks, which are saved next to the planning
+                         stats (see --save-output) as '*.latency.csv'.
+  --cc-workers=N         Distribute batched collision checks across N worker
+                         processes, each with its own copy of the map. This is
+                         most useful for the "klampt" engine, whose checks
+                         are expensive. Disabled when not given.
+  --packed-map           Store the occupancy of the "image" and "4d" maps as one
+                         bit per pixel, which trades the speed of each pixel
+                         lookup for a smaller memory footprint.
+  --robot-radius=RADIUS  Treat the robot of the "image" engine as a disc of
+                         this radius (in pixels) instead of a point, by checking
+                         it as a point on the map with its obstacles dilated by
+                         the radius. Disabled when not given.
+  --polygon-simplify=TOL
+                         Simplify the obstacle boundary of the "polygon"
+                         engine with Douglas-Peucker within this tolerance (in
+                         pixels), such that the number of obstacle edges does
+                         not grow with the resolution of the map for diagonal
+                         or curved obstacles. Edges that come within the
+                         tolerance of the simplified boundary are rejected,
+                         which is conservative. Disabled when not given, where
+                         edges are checked exactly.
+  --persist-dilated-map  Cache the dilated map of each robot radius under
+                         'CACHE_DIR', such that later runs on the same map
+                         reuse it.
+  --cache-dir=CACHE_DIR  Specify the folder that caches precomputed data
+                         structures across runs [default: ~/.cache/sbp-env]
 
 Display Options:
   --always-refresh       Set if the display should refresh on every ticks.
@@ -49,13 +116,72 @@ General Planner Options:
   --goal-bias=BIAS       Probability of biasing goal position.
                          [default: 0.02]
   --skip-optimality      Skip optimality guarantee (i.e. skip performing rewiring)
+  --nn-index=INDEX       Set the index that the tree-based planners use to find
+                         the nearest nodes and the nodes within the radius.
+                         Supported indices are:
+                         - auto (grid for the "image" engine, and kdtree
+                           otherwise)
+                         - kdtree (a forest of k-d trees that are rebuilt in
+                           geometric batches)
+                         - rtree (an R-tree that is bulk loaded when trees
+                           are merged)
+                         - grid (a hash grid whose cells are as large as the
+                           radius)
+                         - rpforest (a forest of random projection trees for
+                           high dimensional spaces, whose nearest nodes are
+                           approximate but radius queries are exact)
+                         - brute (compute the distances to all nodes)
+                         For the "klampt" engine, the distances wrap around
+                         the angles, which only kdtree, rpforest and brute
+                         support.
+                         [default: auto]
+  --rpforest-trees=NUM   Number of trees of the "rpforest" index. More trees
+                         find the true nearest nodes more often, but are slower
+                         to build and to query. [default: 4]
+  --rpforest-leaf-size=SIZE
+                         Number of nodes within each leaf of the trees of the
+                         "rpforest" index. Larger leaves find the true nearest
+                         nodes more often, but are slower to query.
+                         [default: 32]
 
 4D Simulaotr Options:
   --4d-robot-lengths=LENGTH_1,LENGTH_2
                          Set the lengths of the 4D rover arm manipulator. Should be
                          a comma separated list of two numbers.
                          [default: 30,30]
-
+  --4d-cspace-bins=BINS  Precompute the configuration space obstacles of the
+                         4D rover arm, with the angle of each joint discretised
+                         into BINS bins. Configurations are then checked by
+                         table lookups, which conservatively reject any
+                         configuration that might collide within its bins.
+                         The tables are cached under 'CACHE_DIR'.
+  --4d-interpolation=METHOD
+                         Set the interpolation of the edges of the 4D rover arm.
+                         Supported methods are:
+                         - bresenham (one configuration per pixel of the line
+                           between the two bases)
+                         - displacement (no point of the arm moves more than a
+                           pixel between configurations, which are tested from
+                           the midpoint of the edge in bisection order)
+                         [default: bresenham]
+
+Klampt Options:
+  --klampt-edge-checker=METHOD
+                         Set the method that checks the edges.
+                         Supported methods are:
+                         - klampt (Klampt's own check, from one end of the edge
+                           to the other)
+                         - bisection (test the midpoint first and then bisect
+                           recursively, which stops at the first collision)
+                         [default: klampt]
+  --klampt-edge-resolution=RES
+                         Set the resolution that the edges are checked at.
+                         [default: 0.1]
+  --klampt-lipschitz=L   An upper bound of how far any point of the robot moves
+                         per unit of joint motion (summed over all joints). When
+                         given, the bisection edge checker uses distance
+                         queries to skip the parts of an edge that provably
+                         cannot collide.
 
 Random Sampler Options:
   --random-method=METHOD
@@ -104,9 +230,10 @@ from typing import Optional, Union
 import numpy as np
 from docopt import docopt
 
+import collisionChecker
 import env
 import planners
-from utils import planner_registry
+from utils import nn_index, planner_registry, tiled_map
 from utils.common import MagicDict
 
 assert planners
@@ -156,7 +283,7 @@ def generate_args(
 
     # setup environment engine
     args["--engine"] = "" if args["--engine"] is None else args["--engine"].lower()
-    if args["--engine"] not in ("image", "klampt", "4d", ""):
+    if args["--engine"] not in ("image", "polygon", "klampt", "4d", "voxel", ""):
         raise RuntimeError(
             f"Unrecognised value '{args['--engine']}' for engine option!"
         )
@@ -171,14 +298,17 @@ def generate_args(
                 "No --engine given and file has no extension. "
                 "Unable to infer engine."
             )
-        _file_extension = args["<MAP>"].split(".")[-1]
+        _file_extension = args["<MAP>"].rstrip("/").split(".")[-1]
         if _file_extension in ("xml",):
             args["--engine"] = "klampt"
         elif _file_extension in (
             "jpg",
             "png",
+            "tiles",
         ):
             args["--engine"] = "image"
+        elif _file_extension in ("npy",):
+            args["--engine"] = "voxel"
         else:
             raise RuntimeError(
                 "No engine given and unable to infer engine from "
@@ -186,6 +316,11 @@ def generate_args(
             )
         LOGGER.info(_notice.format(args["--engine"], _file_extension))
 
+    if tiled_map.is_tiled_map(args["<MAP>"]) and not args["--no-display"]:
+        raise RuntimeError("Tiled maps cannot be displayed, use --no-display.")
+    if args["--engine"] == "voxel" and not args["--no-display"]:
+        raise RuntimeError("Voxel maps cannot be displayed, use --no-display.")
+
     args["--4d-robot-lengths"] = args["--4d-robot-lengths"].split(",")
     if len(args["--4d-robot-lengths"]) != 2:
         raise RuntimeError(
@@ -193,6 +328,41 @@ def generate_args(
         )
     args["--4d-robot-lengths"] = tuple(map(float, args["--4d-robot-lengths"]))
 
+    if args["--4d-interpolation"] not in collisionChecker.ARM_INTERPOLATIONS:
+        raise RuntimeError(
+            f"Unrecognised value '{args['--4d-interpolation']}' for "
+            f"--4d-interpolation option!"
+        )
+    if args["--klampt-edge-checker"] not in collisionChecker.KLAMPT_EDGE_CHECKERS:
+        raise RuntimeError(
+            f"Unrecognised value '{args['--klampt-edge-checker']}' for "
+            f"--klampt-edge-checker option!"
+        )
+
+    if (
+        args["--nn-index"] != nn_index.AUTO_NN_INDEX
+        and args["--nn-index"] not in nn_index.NN_INDICES
+    ):
+        raise RuntimeError(
+            f"Unrecognised value '{args['--nn-index']}' for --nn-index option!"
+        )
+    if (
+        args["--engine"] in nn_index.ENGINE_PERIODS
+        and args["--nn-index"] in nn_index.NN_INDICES
+        and not nn_index.NN_INDICES[args["--nn-index"]].supports_period
+    ):
+        raise RuntimeError(
+            f"The --nn-index={args['--nn-index']} option does not support the "
+            f"{args['--engine']} engine, whose angles wrap around!"
+        )
+
+    try:
+        args["--cc-accel"] = collisionChecker.parse_cc_accelerations(
+            args["--cc-accel"], packed_map=args["--packed-map"]
+        )
+    except ValueError as e:
+        raise RuntimeError(f"Invalid value for --cc-accel option: {e}")
+
     ########################################
 
     if args["--verbose"] > 2:
@@ -241,6 +411,9 @@ def generate_args(
     planning_option = MagicDict(
         planner_data_pack=planner_data_pack,
         skip_optimality=args["--skip-optimality"],
+        nn_index=args["--nn-index"],
+        rpforest_trees=int(args["--rpforest-trees"]),
+        rpforest_leaf_size=int(args["--rpforest-leaf-size"]),
         showSampledPoint=not args["--hide-sampled-points"],
         scaling=float(args["--scaling"]),
         goalBias=float(args["--goal-bias"]),
@@ -258,6 +431,44 @@ def generate_args(
         start_pt=args["<start_x1,x2,..,xn>"],
         goal_pt=args["<goal_x1,x2,..,xn>"],
         rover_arm_robot_lengths=args["--4d-robot-lengths"],
+        cc_accel=args["--cc-accel"],
+        cspace_bins=(
+            None if args["--4d-cspace-bins"] is None else int(args["--4d-cspace-bins"])
+        ),
+        cache_dir=args["--cache-dir"],
+        interpolation_4d=args["--4d-interpolation"],
+        packed_map=args["--packed-map"],
+        robot_radius=(
+            None if args["--robot-radius"] is None else float(args["--robot-radius"])
+        ),
+        persist_dilated_map=args["--persist-dilated-map"],
+        polygon_simplify=(
+            None
+            if args["--polygon-simplify"] is None
+            else float(args["--polygon-simplify"])
+        ),
+        feasible_cache_size=(
+            None if args["--feasible-cache"] is None else int(args["--feasible-cache"])
+        ),
+        feasible_cache_resolution=float(args["--feasible-cache-resolution"]),
+        persist_feasible_cache=args["--persist-feasible-cache"],
+        klampt_edge_checker=args["--klampt-edge-checker"],
+        klampt_edge_resolution=float(args["--klampt-edge-resolution"]),
+        klampt_lipschitz=(
+            None
+            if args["--klampt-lipschitz"] is None
+            else float(args["--klampt-lipschitz"])
+        ),
+        time_cc=args["--time-cc"],
+        cc_workers=None if args["--cc-workers"] is None else int(args["--cc-workers"]),
+        edge_cache_size=(
+            None if args["--edge-cache"] is None else int(args["--edge-cache"])
+        ),
+        edge_cache_resolution=(
+            None
+            if args["--edge-cache-resolution"] is None
+            else float(args["--edge-cache-resolution"])
+        ),
         output_dir=args["--output-dir"],
         save_output=args["--save-output"],
     )
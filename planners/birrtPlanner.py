@@ -26,12 +26,20 @@ class BiRRTPlanner(RRTPlanner):
                 kwargs["num_dim"],
             )
         )
+        self.goal_tree_nn_index = self.create_nn_index()
         self.goal_tree_nodes.append(self.args.env.goal_pt)
         self.goal_tree_poses[0] = self.args.env.goal_pt.pos
+        self.goal_tree_nn_index.add(self.args.env.goal_pt.pos)
 
         self.found_solution = False
         self.goal_tree_turn = False
 
+    @overrides
+    def _get_nn_index(self, nodes):
+        if nodes is self.goal_tree_nodes:
+            return self.goal_tree_nn_index
+        return super()._get_nn_index(nodes)
+
     @overrides
     def run_once(self):
         if self.goal_tree_turn and not self.found_solution:
@@ -50,8 +58,8 @@ class BiRRTPlanner(RRTPlanner):
         rand_pos, report_success, report_fail = self.args.sampler.get_valid_next_pos()
         # Found a node that is not in X_obs
 
-        idx = self.find_nearest_neighbour_idx(rand_pos, poses[: len(nodes)])
-        nn = nodes[idx]
+        index = self._get_nn_index(nodes)
+        nn = nodes[index.nearest(rand_pos)]
         # get an intermediate node according to step-size
         newpos = self.args.env.step_from_to(nn.pos, rand_pos)
         # check if it has a free path to nn or not
@@ -66,6 +74,7 @@ class BiRRTPlanner(RRTPlanner):
             poses[len(nodes)] = newnode.pos
 
             nodes.append(newnode)
+            index.add(newnode.pos)
             # rewire to see what the newly added node can do for us
             self.rewire(newnode, nodes)
 
@@ -78,11 +87,8 @@ class BiRRTPlanner(RRTPlanner):
                 else:
                     other_poses = self.poses
                     other_nodes = self.nodes
-                distances = np.linalg.norm(
-                    other_poses[: len(self.nodes)] - newpos, axis=1
-                )
-                if min(distances) < self.args.epsilon:
-                    idx = np.argmin(distances)
+                idx = self._get_nn_index(other_nodes).nearest(newpos)
+                if self.args.env.dist(other_poses[idx], newpos) < self.args.epsilon:
                     if self.args.env.cc.visible(other_poses[idx], newpos):
 
                         self.found_solution = True
@@ -113,6 +119,7 @@ class BiRRTPlanner(RRTPlanner):
 
                             self.poses[len(self.nodes)] = _nextnode.pos
                             self.nodes.append(_nextnode)
+                            self.nn_index.add(_nextnode.pos)
                             to_be_removed.append(_nextnode)
 
                             nn = _nextnode
@@ -8,7 +8,7 @@ import tqdm
 from env import Node
 from planners.rrtPlanner import RRTPlanner
 from samplers import prmSampler
-from utils import planner_registry
+from utils import nn_index, planner_registry
 
 volume_of_unit_ball = {
     1: 2,
@@ -25,22 +25,23 @@ volume_of_unit_ball = {
 
 
 def nearest_neighbours(
-    nodes: List[Node], poses: np.ndarray, pos: np.ndarray, radius: float
+    nodes: List[Node],
+    index: nn_index.NearestNeighbourIndex,
+    pos: np.ndarray,
+    radius: float,
 ):
     """A helper function to find the nearest neighbours from a roadmap
 
     :param nodes: the list of nodes to search against
-    :param poses: array of positions
+    :param index: the nearest neighbour index of the nodes
     :param pos: the position of interest
-    :param radius: the maximum radius of distance
+    :param radius: the maximum radius of distance (exclusive)
 
     """
-    distances = np.linalg.norm(poses[: len(nodes)] - pos, axis=1)
-    neighbours = []
-    for i, d in enumerate(distances):
-        if d < radius:
-            neighbours.append(nodes[i])
-    return neighbours
+    idxs = index.within_radius(pos, radius)
+    # the index includes the nodes that are exactly at the radius
+    idxs = idxs[index.distances(idxs, pos) < radius]
+    return list(map(nodes.__getitem__, idxs.tolist()))
 
 
 class PRMPlanner(RRTPlanner):
@@ -84,7 +85,7 @@ class PRMPlanner(RRTPlanner):
         radius = self.gamma * np.power(np.log(n + 1) / (n + 1), 1 / self.args.num_dim)
 
         for v in tqdm.tqdm(self.nodes, desc="Building graph"):
-            m_near = nearest_neighbours(self.nodes, self.poses, v.pos, radius)
+            m_near = nearest_neighbours(self.nodes, self.nn_index, v.pos, radius)
             for m_g in m_near:
                 if m_g is v:
                     continue
@@ -124,11 +125,11 @@ class PRMPlanner(RRTPlanner):
         """Build the solution path"""
         # get two nodes that is cloest to start/goal and are free routes
         m_near = nearest_neighbours(
-            self.nodes, self.poses, self.args.sampler.start_pos, self.args.epsilon
+            self.nodes, self.nn_index, self.args.sampler.start_pos, self.args.epsilon
         )
         start = self.get_nearest_free(self.args.env.start_pt, m_near)
         m_near = nearest_neighbours(
-            self.nodes, self.poses, self.args.sampler.goal_pos, self.args.epsilon
+            self.nodes, self.nn_index, self.args.sampler.goal_pos, self.args.epsilon
         )
         goal = self.get_nearest_free(self.args.env.goal_pt, m_near)
 
@@ -12,7 +12,7 @@ from tqdm import tqdm
 from planners.rrtPlanner import RRTPlanner
 from samplers.baseSampler import Sampler
 from samplers.randomPolicySampler import RandomPolicySampler
-from utils import planner_registry
+from utils import nn_index, planner_registry
 from utils.common import BFS, MagicDict
 
 LOGGER = logging.getLogger(__name__)
@@ -132,7 +132,10 @@ class DisjointTreeParticle:
             merged_tree.particle_handlers.append(self)
         else:
             # spawn a new tree
-            self.tree = TreeDisjoint(dim=self.p_manager.args.num_dim)
+            self.tree = TreeDisjoint(
+                dim=self.p_manager.args.num_dim,
+                index=self.planner.create_nn_index(),
+            )
             self.register_tree(self.tree)
             self.tree.add_newnode(Node(pos))
             self.planner.add_tree(self.tree)
@@ -288,7 +291,9 @@ class RRdTSampler(Sampler):
         goal_dt_p.tree.add_newnode(self.args.env.goal_pt)
 
         # spawn one that comes from the root
-        self.args.planner.root = TreeRoot(dim=self.args.num_dim)
+        self.args.planner.root = TreeRoot(
+            dim=self.args.num_dim, index=self.args.planner.create_nn_index()
+        )
         root_particle = self._add_particle(
             pos=self.start_pos, isroot=self.args.planner.root
         )
@@ -564,10 +569,7 @@ class RRdTPlanner(RRTPlanner):
             nn = last_node
             newpos = rand_pos
         else:
-            idx = self.find_nearest_neighbour_idx(
-                rand_pos, parent_tree.poses[: len(parent_tree.nodes)]
-            )
-            nn = parent_tree.nodes[idx]
+            nn = parent_tree.nodes[parent_tree.nn_index.nearest(rand_pos)]
             # get an intermediate node according to step-size
             newpos = self.args.env.step_from_to(nn.pos, rand_pos)
         # check if it is free or not
@@ -585,6 +587,12 @@ class RRdTPlanner(RRTPlanner):
             # try to add this newnode to existing trees
             self.add_pos_to_existing_tree(newnode, parent_tree)
 
+    @overrides
+    def _get_nn_index(self, nodes):
+        if nodes is self.root.nodes:
+            return self.root.nn_index
+        return super()._get_nn_index(nodes)
+
     def rrt_star_add_node(self, newnode: Node, nn: Optional[Node] = None):
         """This function perform finding optimal parent, and rewiring.
 
@@ -702,9 +710,14 @@ class RRdTPlanner(RRTPlanner):
             if tree is parent_tree:
                 # skip self
                 continue
-            idx = self.find_nearest_neighbour_idx(
-                node.pos, tree.poses[: len(tree.nodes)]
-            )
+            if self.args.env.dist_matches_nn_index:
+                # only visits the nodes around the given node, instead of finding
+                # the nearest node of a tree that is far away
+                idx = tree.nn_index.nearest_within_radius(node.pos, radius)
+                if idx is None:
+                    continue
+            else:
+                idx = tree.nn_index.nearest(node.pos)
             nn = tree.nodes[idx]
             if self.args.env.dist(nn.pos, node.pos) < radius:
                 nearest_nodes[tree] = nn
@@ -818,6 +831,7 @@ class RRdTPlanner(RRTPlanner):
             tree1.extend_tree(tree2)
         del tree2.nodes
         del tree2.poses
+        del tree2.nn_index
 
         # remove the tree from the list of trees first, so that when the particle is
         # restarting it wont try to connects back to the, now non-existence, tree.
@@ -852,14 +866,24 @@ class RRdTPlanner(RRTPlanner):
 
 
 class DTreeType:
-    """Abstract d-tree type"""
+    """Abstract d-tree type
+
+    :param dim: the number of dimensions of the configurations
+    :param index: the empty nearest neighbour index of the nodes, defaults to the
+        default index if it is ``None``
+    """
 
-    def __init__(self, dim: int):
+    def __init__(
+        self, dim: int, index: Optional[nn_index.NearestNeighbourIndex] = None
+    ):
         self.particle_handlers: List[DisjointTreeParticle] = []
         self.nodes = []
         self.poses = np.empty(
             (MAX_NUMBER_NODES * 2 + 50, dim)
         )  # +50 to prevent over flow
+        if index is None:
+            index = nn_index.create_index(None, dim)
+        self.nn_index = index
         # This stores the last node added to this tree (by local sampler)
 
     def add_newnode(self, node: Node):
@@ -870,6 +894,7 @@ class DTreeType:
         """
         self.poses[len(self.nodes)] = node.pos
         self.nodes.append(node)
+        self.nn_index.add(node.pos)
 
     def extend_tree(self, tree: DTreeType):
         """Extend nodes from the given tree to this tree
@@ -881,6 +906,7 @@ class DTreeType:
             : len(tree.nodes)
         ]
         self.nodes.extend(tree.nodes)
+        self.nn_index.add_many(tree.nn_index.poses)
 
     def __repr__(self):
         string = super().__repr__()
@@ -1,12 +1,12 @@
 """Represent a planner."""
 import operator
-from typing import List
+from typing import List, Optional, Sequence, Tuple
 
 import numpy as np
 
 from planners.basePlanner import Planner
-from utils import planner_registry
-from utils.common import Node, Tree
+from utils import nn_index, planner_registry
+from utils.common import Node
 
 
 class RRTPlanner(Planner):
@@ -30,14 +30,14 @@ class RRTPlanner(Planner):
             (self.args.max_number_nodes * 2 + 50, kwargs["num_dim"])
         )  # +50 to prevent over flow
         self.c_max = float("inf")
-        # this dict is to temporarily store distance of a new node to all others
-        # so that in the next run other functions
-        # (eg choose_least_cost_parent and rwire)
-        # and take advantage to the already computed values
-        self._new_node_dist_to_all_others = {}
+        # this stores the neighbourhood of the last new node, so that the next
+        # function (i.e. rewire after choose_least_cost_parent) could take advantage
+        # of the already computed values
+        self._new_node_neighbourhood = None
         self.nodes = []
+        # the nearest neighbour index of the configurations of the nodes
+        self.nn_index = self.create_nn_index()
         self.args.env = None  # will be set by env itself
-        self.tree = Tree(kwargs["num_dim"])
         self.found_solution = True
 
         if self.args["skip_optimality"]:
@@ -79,8 +79,7 @@ class RRTPlanner(Planner):
         # Get an sample that is free (not in blocked space)
         rand_pos, report_success, report_fail = self.args.sampler.get_valid_next_pos()
         # Found a node that is not in X_obs
-        idx = self.find_nearest_neighbour_idx(rand_pos, self.poses[: len(self.nodes)])
-        nn = self.nodes[idx]
+        nn = self.nodes[self.nn_index.nearest(rand_pos)]
         # get an intermediate node according to step-size
         newpos = self.args.env.step_from_to(nn.pos, rand_pos)
         # check if it has a free path to nn or not
@@ -116,6 +115,77 @@ class RRTPlanner(Planner):
         """
         self.poses[len(self.nodes)] = node.pos
         self.nodes.append(node)
+        self.nn_index.add(node.pos)
+
+    def create_nn_index(self) -> nn_index.NearestNeighbourIndex:
+        """Create an empty nearest neighbour index for a tree of this planner, as
+        chosen by the ``nn_index`` option (see :func:`utils.nn_index.create_index`)
+
+        :return: the nearest neighbour index
+        """
+        return nn_index.create_index(
+            self.args.get("nn_index"),
+            self.args.num_dim,
+            engine=self.args.get("engine"),
+            radius=self.args.get("radius"),
+            num_trees=self.args.get("rpforest_trees"),
+            leaf_size=self.args.get("rpforest_leaf_size"),
+        )
+
+    def _get_nn_index(
+        self, nodes: Sequence[Node]
+    ) -> Optional[nn_index.NearestNeighbourIndex]:
+        """Get the nearest neighbour index of the given list of nodes
+
+        :param nodes: the list of nodes of a tree
+
+        :return: the index of the nodes, or ``None`` if they are not indexed
+        """
+        if nodes is self.nodes:
+            return self.nn_index
+        return None
+
+    def _get_neighbourhood(
+        self, newnode: Node, nodes: List[Node]
+    ) -> Tuple[List[Node], np.ndarray, np.ndarray]:
+        """Get the nodes within the radius of the given new node. The nearest
+        neighbour index of the nodes is used if it shares the same metric as the
+        environment, otherwise the distances to all nodes are computed. The result
+        is reused when it is asked again for the same new node and list of nodes.
+
+        :param newnode: the node at the centre of the neighbourhood
+        :param nodes: the list of node to search against
+
+        :return: the nodes within the radius in their original order, an array of
+            their positions, and an array of their distances to the new node
+        """
+        if self._new_node_neighbourhood is not None:
+            _newnode, _nodes, neighbourhood = self._new_node_neighbourhood
+            if _newnode is newnode and _nodes is nodes:
+                return neighbourhood
+        index = self._get_nn_index(nodes)
+        if index is not None and self.args.env.dist_matches_nn_index:
+            # slightly enlarged, such that rounding errors never exclude any neighbour
+            idxs = index.within_radius(newnode.pos, self.args.radius * 1.000001)
+            poses = index.poses[idxs]
+            distances = index.distances(idxs, newnode.pos)
+            within = distances <= self.args.radius
+            idxs, poses, distances = idxs[within], poses[within], distances[within]
+            neighbours = list(map(nodes.__getitem__, idxs.tolist()))
+        else:
+            neighbours, distances = [], []
+            for p in nodes:
+                _newnode_to_p_cost = self.args.env.dist(newnode.pos, p.pos)
+                if _newnode_to_p_cost <= self.args.radius:
+                    neighbours.append(p)
+                    distances.append(_newnode_to_p_cost)
+            poses = np.array([p.pos for p in neighbours]).reshape(
+                len(neighbours), len(newnode.pos)
+            )
+            distances = np.array(distances, dtype=float)
+        neighbourhood = neighbours, poses, distances
+        self._new_node_neighbourhood = newnode, nodes, neighbourhood
+        return neighbourhood
 
     def choose_least_cost_parent(
         self,
@@ -134,13 +204,13 @@ class RRTPlanner(Planner):
         :param nn: the current closest node, optional.
         :param nodes: the list of node to search against
         :param skip_optimality: skip searching for optimality (i.e. non-asymptomatic)
-        :param use_rtree: whether use rtree to store tree or not
+        :param use_rtree: unused, as the nodes of the planner are always searched
+            with its nearest neighbour index (see :mod:`utils.nn_index`)
         :param poses: list of configurations, with the same length as ``nodes``
 
         :return: the node with the lowest cost
         """
         skip_optimality = False
-        use_rtree = False
 
         if skip_optimality:
             if nn is None:
@@ -150,13 +220,10 @@ class RRTPlanner(Planner):
             newnode.cost = nn.cost + self.args.env.dist(nn.pos, newnode.pos)
             return newnode, nn
 
-        if use_rtree or poses is not None:
+        if poses is not None:
             nn2 = None
-            if use_rtree:
-                canidates = list(self.tree.nearby(newnode.pos, n=20))
-            else:
-                distances = np.linalg.norm(poses - newnode.pos, axis=1)
-                canidates = [nodes[idx] for idx in np.argsort(distances)[:20]]
+            distances = nn_index.distances(poses, newnode.pos, self.nn_index.period)
+            canidates = [nodes[idx] for idx in np.argsort(distances)[:20]]
 
             canidates.sort(key=operator.attrgetter("cost"))
 
@@ -177,19 +244,22 @@ class RRTPlanner(Planner):
 
         if nn is not None:
             _newnode_to_nn_cost = self.args.env.dist(newnode.pos, nn.pos)
-        self._new_node_dist_to_all_others = {}
-        for p in nodes:
-            _newnode_to_p_cost = self.args.env.dist(newnode.pos, p.pos)
-            self._new_node_dist_to_all_others[(newnode, p)] = _newnode_to_p_cost
-            if _newnode_to_p_cost <= self.args.radius and self.args.env.cc.visible(
-                newnode.pos, p.pos
-            ):
-                # This is another valid parent. Check if it's better than our current one.
-                if nn is None or (
-                    p.cost + _newnode_to_p_cost < nn.cost + _newnode_to_nn_cost
-                ):
-                    nn = p
-                    _newnode_to_nn_cost = _newnode_to_p_cost
+        neighbours, poses, distances = self._get_neighbourhood(newnode, nodes)
+        costs = distances + np.fromiter(
+            map(operator.attrgetter("cost"), neighbours), float, len(neighbours)
+        )
+        order = np.argsort(costs, kind="stable")
+        if nn is not None:
+            # only the neighbours that are better than our current one are considered
+            order = order[costs[order] < nn.cost + _newnode_to_nn_cost]
+        # check the visibility to all of these neighbours in one batch, where the
+        # parent is the first visible one in the order of their cost
+        if len(order) > 0:
+            visible = np.flatnonzero(
+                self.args.env.cc.visible_many(newnode.pos, poses[order])
+            )
+            if len(visible) > 0:
+                nn = neighbours[order[visible[0]]]
         if nn is None:
             raise LookupError(
                 "ERROR: Provided nn=None, and cannot find any valid nn by this function. This newnode is not close to the root tree...?"
@@ -215,21 +285,19 @@ class RRTPlanner(Planner):
         :param nodes: the list of node to search against
         :param already_rewired: if the node had already been rewired previously
         :param skip_optimality: skip optimality to speed up (reduce to RRT as opposed to RRT*)
-        :param use_rtree: if we should use rtree as opposed to native numpy operations
+        :param use_rtree: unused, as the nodes of the planner are always searched
+            with its nearest neighbour index (see :mod:`utils.nn_index`)
         :param poses: an array of positions
 
         """
         if skip_optimality or len(nodes) < 1:
             return
 
-        if use_rtree or poses is not None:
+        if poses is not None:
             if already_rewired is None:
                 already_rewired = {newnode}
-            if use_rtree:
-                canidates = list(self.tree.nearby(newnode.pos, n=20))
-            else:
-                distances = np.linalg.norm(poses - newnode.pos, axis=1)
-                canidates = [nodes[idx] for idx in np.argsort(distances)[:20]]
+            distances = nn_index.distances(poses, newnode.pos, self.nn_index.period)
+            canidates = [nodes[idx] for idx in np.argsort(distances)[:20]]
 
             canidates.sort(key=operator.attrgetter("cost"))
 
@@ -254,25 +322,31 @@ class RRTPlanner(Planner):
 
         if already_rewired is None:
             already_rewired = {newnode}
-        for n in (x for x in nodes if x not in already_rewired):
-            if len(already_rewired) <= 1:
-                _newnode_to_n_cost = self._new_node_dist_to_all_others[newnode, n]
-            else:
-                _newnode_to_n_cost = self.args.env.dist(newnode.pos, n.pos)
-            if (
-                n != newnode.parent
-                and _newnode_to_n_cost <= self.args.radius
-                and self.args.env.cc.visible(n.pos, newnode.pos)
-                and newnode.cost + _newnode_to_n_cost < n.cost
-            ):
+        neighbours, _, distances = self._get_neighbourhood(newnode, nodes)
+        costs = np.fromiter(
+            map(operator.attrgetter("cost"), neighbours), float, len(neighbours)
+        )
+        candidates = []
+        for i in np.flatnonzero(newnode.cost + distances < costs):
+            n = neighbours[i]
+            if n not in already_rewired and n != newnode.parent:
+                candidates.append((n, float(distances[i])))
+        # only the candidates that would benefit from rewiring need to be checked,
+        # and they are checked in one batch from the new node, as edges are
+        # undirected (see CollisionChecker.visible)
+        candidates_visible = self.args.env.cc.visible_many(
+            newnode.pos, np.array([n.pos for n, _ in candidates])
+        )
+        for (n, _newnode_to_n_cost), visible in zip(candidates, candidates_visible):
+            if visible:
                 # draw over the old wire
-                reconsider = (n.parent, *n.children)
                 n.parent = newnode
                 n.cost = newnode.cost + _newnode_to_n_cost
 
-    @staticmethod
-    def find_nearest_neighbour_idx(pos: np.ndarray, poses: np.ndarray):
-        """Find the nearest neighbour from the list of nodes
+    def find_nearest_neighbour_idx(self, pos: np.ndarray, poses: np.ndarray):
+        """Find the nearest neighbour from the list of nodes, under the metric of the
+        nearest neighbour index of the planner (which wraps around the angles of
+        the ``klampt`` engine)
 
         :param pos: the position to search against the array of positions
         :param poses: the array of positions
@@ -280,10 +354,239 @@ class RRTPlanner(Planner):
         """
         # Make use of numpy fast parallel operation to find
         # all distance with one operation.
-        distances = np.linalg.norm(poses - pos, axis=1)
+        distances = nn_index.distances(poses, pos, self.nn_index.period)
         return np.argmin(distances)
 
 
+class LazyRRTPlanner(RRTPlanner):
+    r"""The Lazy RRT*, which is the same as
+    :class:`~planners.rrtPlanner.RRTPlanner` except that the visibility of the edges
+    created when choosing the parent of a new node and when rewiring are assumed,
+    and only tested once the edges become part of a candidate solution path.
+
+    The edge that extends the tree towards each new node is always tested, hence
+    every node keeps a verified parent, and these verified edges form a collision
+    free tree. When an assumed edge is found to be invalid, its child falls back to
+    the verified parent, which repairs the affected subtree. The reported
+    :attr:`c_max` is always the cost of a fully verified solution path.
+    """
+
+    def __init__(self, **kwargs):
+        super().__init__(**kwargs)
+        # the nodes within the radius of the new node, and their distances to it
+        self._new_node_neighbours = []
+        # the verified parent of each node, i.e., the tree of collision free edges
+        self._verified_parent = {}
+        # the edges that are known to be valid or invalid, as pairs of nodes
+        self._valid_edges = set()
+        self._invalid_edges = set()
+
+    def run_once(self):
+        # Get an sample that is free (not in blocked space)
+        rand_pos, report_success, report_fail = self.args.sampler.get_valid_next_pos()
+        # Found a node that is not in X_obs
+        nn = self.nodes[self.nn_index.nearest(rand_pos)]
+        # get an intermediate node according to step-size
+        newpos = self.args.env.step_from_to(nn.pos, rand_pos)
+        # the tree is always extended with a verified edge
+        if not self.args.env.cc.visible(nn.pos, newpos):
+            self.args.env.stats.add_invalid(obs=False)
+            report_fail(pos=rand_pos, free=False)
+            return
+        newnode = Node(newpos)
+        self.args.env.stats.add_free()
+        self.args.sampler.add_tree_node(pos=newnode.pos)
+        report_success(pos=newnode.pos, nn=nn, rand_pos=rand_pos)
+        self._verified_parent[newnode] = nn
+        self._valid_edges.add(frozenset((nn, newnode)))
+        ######################
+        newnode, nn = self.choose_least_cost_parent(newnode, nn, nodes=self.nodes)
+        self.add_newnode(newnode)
+        # rewire to see what the newly added node can do for us
+        self.rewire(newnode, self.nodes)
+
+        solution_changed = False
+        if self.goal_pt.parent is not None:
+            # the solution path might had been rewired with assumed edges
+            self._verify_path(self.goal_pt.parent)
+            solution_changed = self._update_c_max(self.goal_pt.parent)
+        if (
+            self.args.env.dist(newnode.pos, self.goal_pt.pos) < self.args.goal_radius
+            and newnode.cost < self.c_max
+            and self.args.env.cc.visible(newnode.pos, self.goal_pt.pos)
+        ):
+            # costs of assumed edges are optimistic, so only a verified path counts
+            self._verify_path(newnode)
+            if newnode.cost < self.c_max:
+                self.goal_pt.parent = newnode
+                solution_changed = self._update_c_max(newnode)
+        if solution_changed:
+            self.visualiser.draw_solution_path()
+
+    def _update_c_max(self, node: Node) -> bool:
+        """Update the cost of the solution that goes through the given node.
+
+        :param node: the last node before the goal in the solution path
+
+        :return: whether the cost is changed
+        """
+        if node.cost == self.c_max:
+            return False
+        self.c_max = node.cost
+        return True
+
+    def _is_verified(self, parent: Node, child: Node) -> bool:
+        """Check if the edge between the two nodes is known to be valid
+
+        :param parent: the parent node of the edge
+        :param child: the child node of the edge
+
+        """
+        return (
+            self._verified_parent.get(child) is parent
+            or frozenset((parent, child)) in self._valid_edges
+        )
+
+    def _verify_path(self, node: Node):
+        """Test all assumed edges on the path from the root to the given node, and
+        repair the tree until the path consists of only valid edges. The costs of
+        the nodes along the path are updated accordingly.
+
+        :param node: the last node of the path
+
+        """
+        while True:
+            path = []
+            n = node
+            while n.parent is not None:
+                path.append(n)
+                n = n.parent
+            for child in reversed(path):
+                parent = child.parent
+                if self._is_verified(parent, child):
+                    continue
+                if self.args.env.cc.visible(parent.pos, child.pos):
+                    self._mark_valid(parent, child)
+                else:
+                    self._invalid_edges.add(frozenset((parent, child)))
+                    self._repair(child)
+                    break
+            else:
+                for child in reversed(path):
+                    child.cost = child.parent.cost + self.args.env.dist(
+                        child.parent.pos, child.pos
+                    )
+                return
+
+    def _mark_valid(self, parent: Node, child: Node):
+        """Record the edge as valid, and use it as the verified parent of the child
+        if it does not create a cycle within the verified tree.
+
+        :param parent: the parent node of the edge
+        :param child: the child node of the edge
+
+        """
+        self._valid_edges.add(frozenset((parent, child)))
+        n = parent
+        while n is not None:
+            if n is child:
+                return
+            n = self._verified_parent.get(n)
+        self._verified_parent[child] = parent
+
+    def _repair(self, node: Node):
+        """Reconnect a node to its verified parent, after the edge to its current
+        parent is found to be invalid. Any cycle that it creates is broken by also
+        reconnecting the nodes in the cycle to their verified parents.
+
+        :param node: the node with an invalid edge to its parent
+
+        """
+        to_reconnect = [node]
+        while to_reconnect:
+            n = to_reconnect.pop()
+            if n.parent is not self._verified_parent[n]:
+                n.parent = self._verified_parent[n]
+                n.cost = n.parent.cost + self.args.env.dist(n.parent.pos, n.pos)
+            # walk towards the root to look for a cycle
+            cycle = []
+            m = n.parent
+            while m is not None and m is not n:
+                cycle.append(m)
+                m = m.parent
+            if m is n:
+                # every cycle has at least one unverified edge
+                to_reconnect.extend(
+                    c for c in cycle if c.parent is not self._verified_parent[c]
+                )
+
+    def _is_ancestor(self, node: Node, other: Node) -> bool:
+        """Check if the node is an ancestor of (or is) the other node
+
+        :param node: the potential ancestor
+        :param other: the node to start searching from
+
+        """
+        while other is not None:
+            if other is node:
+                return True
+            other = other.parent
+        return False
+
+    def choose_least_cost_parent(
+        self, newnode: Node, nn: Node = None, nodes: List[Node] = None, **_
+    ):
+        """Given a new node, choose the parent with the least cost among the nodes
+        within the radius, assuming that the edge would be valid unless it is known
+        to be invalid.
+
+        :param newnode: the newly created node that we want to search for a new parent
+        :param nn: the verified parent of the new node
+        :param nodes: the list of node to search against
+
+        :return: the new node and the chosen parent
+        """
+        _newnode_to_nn_cost = float("inf")
+        if nn is not None:
+            _newnode_to_nn_cost = self.args.env.dist(newnode.pos, nn.pos)
+        neighbours, _, distances = self._get_neighbourhood(newnode, nodes)
+        self._new_node_neighbours = list(zip(neighbours, distances.tolist()))
+        for p, _newnode_to_p_cost in self._new_node_neighbours:
+            if (
+                nn is None
+                or p.cost + _newnode_to_p_cost < nn.cost + _newnode_to_nn_cost
+            ) and frozenset((p, newnode)) not in self._invalid_edges:
+                nn = p
+                _newnode_to_nn_cost = _newnode_to_p_cost
+        if nn is None:
+            raise LookupError("Unable to find any node within the radius of newnode")
+        newnode.cost = nn.cost + _newnode_to_nn_cost
+        newnode.parent = nn
+        return newnode, nn
+
+    def rewire(self, newnode: Node, nodes: List[Node], **_):
+        """Rewire the nodes within the radius to the given new node if it lowers their
+        cost, assuming that the edges would be valid unless they are known to be
+        invalid.
+
+        :param newnode: the newly created node that we want to rewires
+        :param nodes: the list of node to search against, where only those within
+            the radius (found when choosing the parent) are considered
+
+        """
+        for n, _newnode_to_n_cost in self._new_node_neighbours:
+            if n is newnode.parent:
+                continue
+            if (
+                newnode.cost + _newnode_to_n_cost < n.cost
+                and frozenset((n, newnode)) not in self._invalid_edges
+                # costs of the subtrees are not updated, which must not form a cycle
+                and not self._is_ancestor(n, newnode)
+            ):
+                n.parent = newnode
+                n.cost = newnode.cost + _newnode_to_n_cost
+
+
 # Methods for visualisation
 
 
@@ -343,4 +646,11 @@ planner_registry.register_planner(
     visualise_klampt_paint=klampt_rrt_paint,
     sampler_id="random",
 )
+planner_registry.register_planner(
+    "lazyrrt",
+    planner_class=LazyRRTPlanner,
+    visualise_pygame_paint=pygame_rrt_paint,
+    visualise_klampt_paint=klampt_rrt_paint,
+    sampler_id="random",
+)
 # finish register
@@ -1,11 +1,14 @@
 from io import BytesIO
+from types import MethodType
+from typing import Callable
 
 import numpy as np
 from PIL import Image
 
+from collisionChecker import CollisionChecker, ImgCollisionChecker
 from planners.basePlanner import Planner
 from samplers.baseSampler import Sampler
-from utils.common import MagicDict
+from utils.common import MagicDict, Stats
 from utils.planner_registry import PlannerDataPack
 from visualiser import VisualiserSwitcher
 
@@ -88,3 +91,65 @@ class MockNumpyEquality:
         else:
             np.testing.assert_array_equal(self.target, other)
         return True
+
+
+def use_looped_visible_many(cc: CollisionChecker):
+    """Make the batched visibility test of the collision checker goes through
+    ``cc.visible``, such that a mocked ``cc.visible`` also applies to it.
+
+    :param cc: the collision checker to patch
+    """
+    cc.visible_many = MethodType(CollisionChecker.visible_many, cc)
+
+
+class CollisionCheckerWrapperTests:
+    """Tests that every :class:`collisionChecker.CollisionCheckerWrapper` around an
+    image space collision checker of the test image shares. It is mixed into a
+    :class:`unittest.TestCase` that implements :meth:`wrap`.
+    """
+
+    def wrap(self, cc: CollisionChecker) -> CollisionChecker:
+        """Wrap the collision checker with the one to test
+
+        :param cc: the collision checker to wrap around
+        """
+        raise NotImplementedError()
+
+    def setUp(self) -> None:
+        self.inner_cc = ImgCollisionChecker(
+            create_test_image(), stats=Stats(), args=MagicDict()
+        )
+        self.stats = self.inner_cc.stats
+        self.cc = self.wrap(self.inner_cc)
+
+    def test_pass_through(self):
+        self.assertIs(self.cc.stats, self.stats)
+        self.assertIs(self.cc.unwrapped, self.inner_cc)
+        self.assertEqual(self.cc.get_dimension(), 2)
+        self.assertEqual(self.cc.get_image_shape(), self.inner_cc.get_image_shape())
+        self.assertTrue(np.array_equal(self.cc.image, self.inner_cc.image))
+        self.assertTrue(self.cc.feasible((1.5, 0.5)))
+        self.assertFalse(self.cc.feasible((3.5, 0.5)))
+        self.assertTrue(self.cc.visible(np.array([0.5, 2.5]), np.array([1.5, 3.5])))
+        self.assertFalse(self.cc.visible(np.array([0.5, 2.5]), np.array([1.5, 5.5])))
+
+    def assert_lru_eviction(
+        self, query: Callable[[int], bool], miss_cnt: Callable[[], int]
+    ):
+        """Check that a cache of three entries evicts the least recently used one
+
+        :param query: query the collision checker with the i-th entry
+        :param miss_cnt: get the number of cache misses so far
+
+        """
+        for i in range(3):
+            query(i)
+        # refresh the first entry, such that the second one is the oldest
+        query(0)
+        query(3)
+        self.assertEqual(miss_cnt(), 4)
+
+        query(0)
+        self.assertEqual(miss_cnt(), 4)
+        query(1)
+        self.assertEqual(miss_cnt(), 5)
@@ -1,8 +1,15 @@
+import tempfile
 from unittest import TestCase
+from unittest.mock import patch
 
 import numpy as np
 
-from collisionChecker import RobotArm4dCollisionChecker
+from collisionChecker import (
+    PYRAMID_MIN_LINE_LENGTH,
+    RobotArm4dCollisionChecker,
+    angle_to_bin,
+    bisection_order,
+)
 from tests.test_image_space_collision_checker import (
     mock_image_as_np,
     create_test_image,
@@ -72,6 +79,200 @@ class TestRobotArm4dCollisionChecker(TestCase):
         self.assertFalse(self.cc.visible(pt(0.5, 2.5, 1, 2.5), pt(1.5, 5.5, 0, -1.5)))
         self.assertFalse(self.cc.visible(pt(0.5, 0.5, -1, 1), pt(3.5, 0.5, 2, 0.4)))
 
+    def test_visible_many(self):
+        origin = pt(0.5, 2.5, 1, 2.5)
+        targets = np.array([[1.5, 3.5, 0, -1.5], [1.5, 5.5, 0, -1.5]])
+        self.assertEqual(self.cc.visible_many(origin, targets).tolist(), [True, False])
+        self.assertEqual(
+            self.cc.visible_many(origin, targets).tolist(),
+            [self.cc.visible(origin, t) for t in targets],
+        )
+
+    def test_clearance(self):
+        self.assertEqual(self.cc.clearance(pt(0.5, 2.5, 1, 2.5)), 1)
+        self.assertEqual(self.cc.clearance(pt(3.5, 0.5, 1, 1)), 0)
+        self.assertEqual(self.cc.clearance(pt(-1.5, 3.5, 1, 1)), 0)
+
+    def test_short_sticks_skip_pyramid(self):
+        self.assertIn("pyramid", self.cc._accel)
+        with patch.object(self.cc._pyramid, "segment_free") as segment_free:
+            # the sticks are much shorter than the lines worth descending for
+            self.assertTrue(self.cc._stick_feasible((0.5, 2.5), (1.5, 3.5)))
+            self.assertFalse(self.cc._stick_feasible((0.5, 0.5), (3.5, 0.5)))
+            segment_free.assert_not_called()
+        self.assertGreater(PYRAMID_MIN_LINE_LENGTH, 4)
+
+    def test_feasible_many(self):
+        configs = np.array(
+            [
+                [0.5, 2.5, 1, 2.5],
+                [1.5, 3.5, 0, -1.5],
+                [3.5, 0.5, 1, 1],
+                [-1.5, 3.5, 1, 1],
+                [1.78, 4.5, 1, 1],
+            ]
+        )
+        self.cc.stats.feasible_cnt = 0
+        self.assertEqual(
+            self.cc.feasible_many(configs).tolist(), [True, True, False, False, False]
+        )
+        self.assertEqual(self.cc.stats.feasible_cnt, len(configs))
+        self.assertEqual(len(self.cc.feasible_many(np.empty((0, 4)))), 0)
+
+    def test_angle_to_bin(self):
+        self.assertEqual(angle_to_bin(0, 4), 0)
+        self.assertEqual(angle_to_bin(np.pi / 2 + 0.1, 4), 1)
+        self.assertEqual(angle_to_bin(-0.1, 4), 3)
+        self.assertEqual(angle_to_bin(-np.pi, 4), 2)
+        self.assertEqual(angle_to_bin(np.array([0.1, 7]), 4).tolist(), [0, 0])
+
+    def test_cspace_tables(self):
+        with tempfile.TemporaryDirectory() as cache_dir:
+            args = MagicDict(cspace_bins=16, cache_dir=cache_dir)
+            cc = RobotArm4dCollisionChecker(
+                "maps/room1.png",
+                stick_robot_length_config=[12.3, 7.7],
+                stats=Stats(),
+                args=args,
+            )
+            # the second one should be loaded from the cache
+            cached_cc = RobotArm4dCollisionChecker(
+                "maps/room1.png",
+                stick_robot_length_config=[12.3, 7.7],
+                stats=Stats(),
+                args=args,
+            )
+        self.assertTrue(np.array_equal(cc._link_tables[0], cached_cc._link_tables[0]))
+        self.assertTrue(np.array_equal(cc._link_tables[1], cached_cc._link_tables[1]))
+
+        ref_cc = RobotArm4dCollisionChecker(
+            "maps/room1.png",
+            stick_robot_length_config=[12.3, 7.7],
+            stats=Stats(),
+            args=MagicDict(),
+        )
+        w, h = cc.get_image_shape()
+        rng = np.random.default_rng(0)
+        configs = np.concatenate(
+            [rng.uniform(-2, [w + 2, h + 2], (2000, 2)), rng.uniform(-4, 4, (2000, 2))],
+            axis=1,
+        )
+        feasible = np.array([cc.feasible(p) for p in configs])
+        ref_feasible = np.array([ref_cc.feasible(p) for p in configs])
+        # the tables should be conservative
+        self.assertFalse((feasible & ~ref_feasible).any())
+        self.assertGreater(
+            np.count_nonzero(feasible), 0.8 * np.count_nonzero(ref_feasible)
+        )
+        self.assertEqual(cc._configs_feasible(configs).tolist(), feasible.tolist())
+
+    def test_packed_map(self):
+        kwargs = dict(stick_robot_length_config=[12.3, 7.7], stats=Stats())
+        cc = RobotArm4dCollisionChecker(
+            "maps/room1.png", args=MagicDict(packed_map=True), **kwargs
+        )
+        ref_cc = RobotArm4dCollisionChecker(
+            "maps/room1.png", args=MagicDict(), **kwargs
+        )
+        self.assertTrue(np.array_equal(cc.image, ref_cc.image))
+
+        w, h = cc.get_image_shape()
+        rng = np.random.default_rng(1)
+        configs = np.concatenate(
+            [rng.uniform(-2, [w + 2, h + 2], (500, 2)), rng.uniform(-4, 4, (500, 2))],
+            axis=1,
+        )
+        self.assertEqual(
+            [cc.feasible(p) for p in configs], [ref_cc.feasible(p) for p in configs]
+        )
+        self.assertEqual(
+            cc.feasible_many(configs).tolist(), ref_cc.feasible_many(configs).tolist()
+        )
+        self.assertEqual(
+            [cc.visible(a, b) for a, b in zip(configs[:-1], configs[1:])],
+            [ref_cc.visible(a, b) for a, b in zip(configs[:-1], configs[1:])],
+        )
+
+    def test_bisection_order(self):
+        self.assertEqual(bisection_order(0).tolist(), [0])
+        self.assertEqual(bisection_order(1).tolist(), [0, 1])
+        self.assertEqual(bisection_order(8).tolist(), [4, 2, 6, 1, 3, 5, 7, 0, 8])
+        self.assertEqual(sorted(bisection_order(13).tolist()), list(range(14)))
+
+    def test_displacement_interpolation(self):
+        # a small obstacle that is only hit by rotating the arm
+        map_mat = np.ones((30, 30))
+        map_mat[21:23, 21:23] = 0
+        kwargs = dict(map_mat=map_mat, stick_robot_length_config=[12, 1])
+        cc = RobotArm4dCollisionChecker(
+            None,
+            stats=Stats(),
+            args=MagicDict(interpolation_4d="displacement"),
+            **kwargs,
+        )
+        ref_cc = RobotArm4dCollisionChecker(
+            None, stats=Stats(), args=MagicDict(), **kwargs
+        )
+        c1, c2 = pt(15.5, 15.5, 0, 0), pt(15.5, 15.5, np.pi / 2, np.pi / 2)
+        self.assertTrue(cc.feasible(c1) and cc.feasible(c2))
+        # a pure rotation only has the two ends with the bresenham interpolation
+        self.assertEqual(len(ref_cc._interpolate_configs(c1, c2)), 2)
+        self.assertTrue(ref_cc.visible(c1, c2))
+        self.assertFalse(cc.visible(c1, c2))
+        self.assertEqual(
+            cc.visible_many(c1, np.array([c2, c1])).tolist(), [False, True]
+        )
+
+        configs = cc._interpolate_configs(c1, c2)
+        # no point of the arm moves more than a pixel between configurations
+        ordered = configs[np.argsort(configs[:, 2])]
+        self.assertLessEqual(np.abs(np.diff(ordered[:, 2])).max() * 13, 1 + 1e-9)
+        self.assertTrue(np.allclose(configs[0], (c1 + c2) / 2, atol=0.05))
+        self.assertTrue(np.allclose(configs[-2:], [c1, c2]))
+
+    def test_displacement_interpolation_visible(self):
+        kwargs = dict(stick_robot_length_config=[12.3, 7.7], stats=Stats())
+        cc = RobotArm4dCollisionChecker(
+            "maps/room1.png", args=MagicDict(interpolation_4d="displacement"), **kwargs
+        )
+        w, h = cc.get_image_shape()
+        rng = np.random.default_rng(0)
+        configs = np.concatenate(
+            [rng.uniform(0, [w, h], (200, 2)), rng.uniform(-4, 4, (200, 2))], axis=1
+        )
+        ends = configs[1:]
+        ends[:, :2] = configs[:-1, :2] + rng.uniform(-15, 15, (199, 2))
+        visible = [cc.visible(a, b) for a, b in zip(configs[:-1], ends)]
+        # checking every configuration at once gives the same results
+        self.assertEqual(
+            visible,
+            [
+                bool(cc._configs_feasible(cc._interpolate_configs(a, b)).all())
+                for a, b in zip(configs[:-1], ends)
+            ],
+        )
+        self.assertEqual(
+            cc.visible_many(configs[0], ends).tolist(),
+            [cc.visible(configs[0], b) for b in ends],
+        )
+        self.assertIn(True, visible)
+        self.assertIn(False, visible)
+        # edges are undirected, with either interpolation
+        for interpolation in ("displacement", "bresenham"):
+            cc = RobotArm4dCollisionChecker(
+                "maps/room1.png",
+                args=MagicDict(interpolation_4d=interpolation),
+                **kwargs,
+            )
+            self.assertEqual(
+                [cc.visible(b, a) for a, b in zip(configs[:-1], ends)],
+                [cc.visible(a, b) for a, b in zip(configs[:-1], ends)],
+            )
+        with self.assertRaises(ValueError):
+            RobotArm4dCollisionChecker(
+                "maps/room1.png", args=MagicDict(interpolation_4d="unknown"), **kwargs
+            )
+
     def test_feasible(self):
         self.assertTrue(self.cc.feasible(pt(0.5, 2.5, 1, 2.5)))
         self.assertTrue(self.cc.feasible(pt(1.5, 3.5, 0, -1.5)))
@@ -3,7 +3,7 @@ from unittest import TestCase
 import numpy as np
 
 from planners.rrdtPlanner import Node as NodeWithEdge
-from utils.common import MagicDict, BFS, Tree, Node
+from utils.common import MagicDict, BFS, Tree, Node, Stats
 
 
 class TestNode(TestCase):
@@ -178,3 +178,21 @@ class TestBFS(TestCase):
         self.assertEqual(bfs.next().name, "n1_0_1_0")
         self.assertEqual(bfs.next().name, "n1_2_0")
         self.assertFalse(bfs.has_next())
+
+
+class TestStats(TestCase):
+    def test_counts(self):
+        stats = Stats()
+        stats.visible_cnt = 3
+        stats.edge_query_cnt = 10
+        counts = stats.counts()
+        self.assertEqual(counts["visible_cnt"], 3)
+        # only the counters are included
+        self.assertNotIn("showSampledPoint", counts)
+        self.assertNotIn("sampledNodes", counts)
+
+        other = Stats()
+        other.visible_cnt = 1
+        other.add_counts(dict(visible_cnt=3, edge_query_cnt=10))
+        self.assertEqual(other.visible_cnt, 4)
+        self.assertEqual(other.edge_query_cnt, 10)
@@ -0,0 +1,107 @@
+import os
+import tempfile
+from unittest import TestCase
+
+import numpy as np
+
+from utils import disk_cache
+
+
+class TestDiskCache(TestCase):
+    def setUp(self) -> None:
+        self.tmp_dir = tempfile.TemporaryDirectory()
+        self.cache_dir = self.tmp_dir.name
+        self.build_cnt = 0
+
+    def tearDown(self) -> None:
+        self.tmp_dir.cleanup()
+
+    def build(self):
+        self.build_cnt += 1
+        return dict(a=np.arange(5), b=np.eye(2, dtype=bool))
+
+    def test_hash_array(self):
+        a = np.arange(6)
+        self.assertEqual(disk_cache.hash_array(a), disk_cache.hash_array(a.copy()))
+        self.assertNotEqual(
+            disk_cache.hash_array(a), disk_cache.hash_array(a.reshape(2, 3))
+        )
+        self.assertNotEqual(
+            disk_cache.hash_array(a), disk_cache.hash_array(a.astype(float))
+        )
+
+    def test_load_or_build(self):
+        key = dict(map="abc", bins=4)
+        arrays = disk_cache.load_or_build(self.cache_dir, "test", key, self.build)
+        self.assertEqual(self.build_cnt, 1)
+        self.assertTrue(
+            os.path.exists(disk_cache.get_cache_filename(self.cache_dir, "test", key))
+        )
+
+        cached = disk_cache.load_or_build(self.cache_dir, "test", key, self.build)
+        self.assertEqual(self.build_cnt, 1)
+        self.assertEqual(cached.keys(), arrays.keys())
+        for k in arrays:
+            self.assertTrue(np.array_equal(cached[k], arrays[k]))
+            self.assertEqual(cached[k].dtype, arrays[k].dtype)
+
+        # a different key is a different entry
+        disk_cache.load_or_build(self.cache_dir, "test", dict(key, bins=8), self.build)
+        self.assertEqual(self.build_cnt, 2)
+
+    def test_corrupted_cache(self):
+        key = dict(map="abc")
+        fname = disk_cache.get_cache_filename(self.cache_dir, "test", key)
+        with open(fname, "w") as f:
+            f.write("not a npz file")
+        arrays = disk_cache.load_or_build(self.cache_dir, "test", key, self.build)
+        self.assertEqual(self.build_cnt, 1)
+        self.assertTrue(np.array_equal(arrays["a"], np.arange(5)))
+
+    def test_truncated_cache(self):
+        key = dict(map="abc")
+        disk_cache.save(self.cache_dir, "test", key, dict(a=np.random.rand(100, 100)))
+        fname = disk_cache.get_cache_filename(self.cache_dir, "test", key)
+        with open(fname, "rb") as f:
+            content = f.read()
+        corrupted = bytearray(content)
+        corrupted[len(content) // 3 : len(content) // 3 + 16] = b"x" * 16
+        # cut in half, or with the compressed arrays corrupted
+        for content in (content[: len(content) // 2], bytes(corrupted)):
+            with open(fname, "wb") as f:
+                f.write(content)
+            self.assertIsNone(disk_cache.load(self.cache_dir, "test", key))
+        arrays = disk_cache.load_or_build(self.cache_dir, "test", key, self.build)
+        self.assertEqual(self.build_cnt, 1)
+        self.assertTrue(np.array_equal(arrays["a"], np.arange(5)))
+        # the rebuilt entry replaces the truncated one
+        self.assertTrue(
+            np.array_equal(
+                disk_cache.load(self.cache_dir, "test", key)["a"], np.arange(5)
+            )
+        )
+
+    def test_hash_file(self):
+        fname = os.path.join(self.cache_dir, "world.xml")
+        with open(fname, "w") as f:
+            f.write("<world/>")
+        digest = disk_cache.hash_file(fname)
+        self.assertEqual(digest, disk_cache.hash_file(fname))
+        with open(fname, "a") as f:
+            f.write(" ")
+        self.assertNotEqual(digest, disk_cache.hash_file(fname))
+
+    def test_load_and_save(self):
+        key = dict(map="abc")
+        self.assertIsNone(disk_cache.load(self.cache_dir, "test", key))
+        disk_cache.save(self.cache_dir, "test", key, self.build())
+        self.assertTrue(
+            np.array_equal(
+                disk_cache.load(self.cache_dir, "test", key)["a"], np.arange(5)
+            )
+        )
+        # saving again replaces the entry
+        disk_cache.save(self.cache_dir, "test", key, dict(a=np.zeros(2)))
+        self.assertEqual(
+            disk_cache.load(self.cache_dir, "test", key)["a"].tolist(), [0, 0]
+        )
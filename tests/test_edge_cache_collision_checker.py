@@ -0,0 +1,110 @@
+from unittest import TestCase
+from unittest.mock import patch
+
+import numpy as np
+
+from collisionChecker import EdgeCacheCollisionChecker
+from tests.common_vars import CollisionCheckerWrapperTests
+from tests.test_image_space_collision_checker import pt
+
+
+class TestEdgeCacheCollisionChecker(CollisionCheckerWrapperTests, TestCase):
+    def wrap(self, cc):
+        return EdgeCacheCollisionChecker(cc, max_size=3)
+
+    def test_invalid_size(self):
+        with self.assertRaises(ValueError):
+            EdgeCacheCollisionChecker(self.inner_cc, max_size=0)
+
+    def test_visible(self):
+        self.assertTrue(self.cc.visible(pt(0.5, 2.5), pt(1.5, 3.5)))
+        self.assertFalse(self.cc.visible(pt(0.5, 2.5), pt(1.5, 5.5)))
+        self.assertEqual(self.stats.edge_cache_miss_cnt, 2)
+        self.assertEqual(self.stats.visible_cnt, 2)
+
+        # the edges are undirected
+        self.assertTrue(self.cc.visible(pt(1.5, 3.5), pt(0.5, 2.5)))
+        self.assertFalse(self.cc.visible(pt(0.5, 2.5), pt(1.5, 5.5)))
+        self.assertEqual(self.stats.edge_cache_hit_cnt, 2)
+        self.assertEqual(self.stats.edge_cache_miss_cnt, 2)
+        # cached results are not passed to the collision checker
+        self.assertEqual(self.stats.visible_cnt, 2)
+
+    def test_lru_eviction(self):
+        self.assert_lru_eviction(
+            lambda i: self.cc.visible(pt(0.5, 0.5), pt(1.5, i + 0.5)),
+            lambda: self.stats.edge_cache_miss_cnt,
+        )
+
+    def test_quantised_keys(self):
+        cc = EdgeCacheCollisionChecker(self.inner_cc, max_size=10, resolution=1)
+        key = cc._key(pt(0.5, 2.5), pt(1.5, 3.5))
+        # configurations within the same pixels, in either order
+        self.assertEqual(cc._key(pt(0.1, 2.9), pt(1.7, 3.2)), key)
+        self.assertEqual(cc._key(pt(1.9, 3.0), pt(0.0, 2.99)), key)
+        # an endpoint within the next pixel
+        self.assertNotEqual(cc._key(pt(0.5, 2.5), pt(1.5, 4.0)), key)
+        # without a resolution, only the same configurations share a key
+        self.assertNotEqual(
+            self.cc._key(pt(0.1, 2.9), pt(1.7, 3.2)),
+            self.cc._key(pt(0.5, 2.5), pt(1.5, 3.5)),
+        )
+
+        self.assertTrue(cc.visible(pt(0.5, 2.5), pt(1.5, 3.5)))
+        self.assertTrue(cc.visible(pt(1.7, 3.2), pt(0.1, 2.9)))
+        self.assertEqual(self.stats.edge_cache_hit_cnt, 1)
+        self.assertEqual(self.stats.edge_cache_miss_cnt, 1)
+        self.assertFalse(cc.visible(pt(0.5, 2.5), pt(1.5, 5.0)))
+        self.assertEqual(self.stats.edge_cache_miss_cnt, 2)
+
+    def test_quantised_keys_match_pixels(self):
+        cc = EdgeCacheCollisionChecker(self.inner_cc, max_size=1000, resolution=1)
+        # configurations are truncated to pixels as the image space engine does
+        self.assertEqual(
+            cc._key(pt(-0.5, 0.5), pt(1, 1)), cc._key(pt(0.5, 0), pt(1, 1))
+        )
+        self.assertNotEqual(
+            cc._key(pt(-1.0, 0.5), pt(1, 1)), cc._key(pt(-0.5, 0.5), pt(1, 1))
+        )
+        rng = np.random.default_rng(0)
+        for p1, p2 in rng.uniform(-3, 7, size=(300, 2, 2)).round(1):
+            self.assertEqual(cc.visible(p1, p2), self.inner_cc.visible(p1, p2))
+        self.assertGreater(self.stats.edge_cache_hit_cnt, 0)
+
+    def test_visible_cnt_on_hits(self):
+        cc = EdgeCacheCollisionChecker(self.inner_cc, max_size=10, resolution=1)
+        origin = pt(0.5, 2.5)
+        targets = np.array([[1.5, 3.5], [1.5, 5.5], [0.5, 3.5]])
+        cc.visible_many(origin, targets)
+        self.assertEqual(self.stats.visible_cnt, 3)
+        with patch.object(
+            self.inner_cc, "visible", wraps=self.inner_cc.visible
+        ) as visible, patch.object(
+            self.inner_cc, "visible_many", wraps=self.inner_cc.visible_many
+        ) as visible_many:
+            # every edge is cached, including within the same pixels
+            cc.visible(pt(0.7, 2.2), pt(1.1, 3.6))
+            cc.visible_many(pt(0.2, 2.8), targets + 0.3)
+            visible.assert_not_called()
+            visible_many.assert_not_called()
+            # only the missed edges of a batch are passed on, and counted
+            cc.visible_many(origin, np.array([[1.5, 3.5], [0.5, 0.5]]))
+            self.assertEqual(visible_many.call_args[0][1].tolist(), [[0.5, 0.5]])
+        self.assertEqual(self.stats.edge_cache_hit_cnt, 5)
+        self.assertEqual(self.stats.edge_cache_miss_cnt, 4)
+        self.assertEqual(self.stats.visible_cnt, 4)
+
+    def test_visible_many(self):
+        origin = pt(0.5, 2.5)
+        self.cc.visible(origin, pt(1.5, 3.5))
+        targets = np.array([[1.5, 3.5], [1.5, 5.5], [0.5, 3.5]])
+        self.assertEqual(
+            self.cc.visible_many(origin, targets).tolist(), [True, False, True]
+        )
+        self.assertEqual(self.stats.edge_cache_hit_cnt, 1)
+        self.assertEqual(self.stats.edge_cache_miss_cnt, 3)
+        self.assertEqual(
+            self.cc.visible_many(origin, targets).tolist(), [True, False, True]
+        )
+        self.assertEqual(self.stats.edge_cache_hit_cnt, 4)
+        self.assertEqual(self.stats.visible_cnt, 3)
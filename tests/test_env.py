@@ -81,3 +81,45 @@ class TestGenerateArgs(TestCase):
 
         # test get sampler
         assert isinstance(e.sampler, Sampler)
+
+    def test_euclidean_dist_nd(self):
+        rng = np.random.default_rng(0)
+        for num_dim in (2, 3, 7):
+            p1, p2 = rng.uniform(-5, 5, (2, num_dim))
+            self.assertAlmostEqual(
+                env.Env.euclidean_dist_nd(p1, p2), np.linalg.norm(p2 - p1)
+            )
+        self.assertEqual(env.Env.euclidean_dist_nd([0, 0, 0], [1, 2, 2]), 3)
+
+    def test_step_from_to_wraps_around(self):
+        visualiser.VisualiserSwitcher.choose_visualiser("base")
+        args = generate_args(
+            planner_id="rrt",
+            map_fname="maps/test.png",
+            start_pt=np.array([25, 123]),
+            goal_pt=np.array([225, 42]),
+        )
+        args.no_display = True
+        args.epsilon = 0.05
+        e = env.Env(args, fixed_seed=0)
+        # pretend that the configurations are angles, as the klampt engine does
+        e.dist = e.radian_dist
+        e.dist_period = 2 * np.pi
+
+        # step the shorter way around, across pi, and wrap back into [-pi, pi)
+        p1, p2 = np.array([3.1, 0.0]), np.array([-3.1, 0.0])
+        np.testing.assert_allclose(e.step_from_to(p1, p2), [3.15 - 2 * np.pi, 0.0])
+        np.testing.assert_allclose(e.step_from_to(p2, p1), [2 * np.pi - 3.15, 0.0])
+        # configurations within the range stay as they are
+        np.testing.assert_allclose(
+            e.step_from_to(np.array([3.0, 0.0]), p1), [3.05, 0.0]
+        )
+        # repeated steps across pi never leave the range
+        pos = np.array([3.0, -3.0])
+        for _ in range(20):
+            pos = e.step_from_to(pos, np.array([-3.0, 3.0]))
+            self.assertTrue(np.all((-np.pi <= pos) & (pos < np.pi)))
+        np.testing.assert_allclose(pos, [-3.0, 3.0])
+        # within the step size
+        p2 = np.array([-3.16, 0.0])
+        self.assertAlmostEqual(e.dist(e.step_from_to(p1, p2), p2), 0)
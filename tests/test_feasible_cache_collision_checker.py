@@ -0,0 +1,154 @@
+import tempfile
+from unittest import TestCase
+
+import numpy as np
+
+from collisionChecker import FeasibleCacheCollisionChecker
+from tests.common_vars import CollisionCheckerWrapperTests
+from utils import disk_cache
+from utils.common import Stats
+
+
+class TestFeasibleCacheCollisionChecker(CollisionCheckerWrapperTests, TestCase):
+    def wrap(self, cc):
+        return FeasibleCacheCollisionChecker(cc, max_size=3, resolution=1)
+
+    def test_invalid_arguments(self):
+        with self.assertRaises(ValueError):
+            FeasibleCacheCollisionChecker(self.inner_cc, max_size=0, resolution=1)
+        with self.assertRaises(ValueError):
+            FeasibleCacheCollisionChecker(self.inner_cc, max_size=3, resolution=0)
+
+    def test_feasible(self):
+        self.assertTrue(self.cc.feasible((1.5, 0.5)))
+        self.assertFalse(self.cc.feasible((3.5, 0.5)))
+        self.assertEqual(self.stats.feasible_cache_miss_cnt, 2)
+        self.assertEqual(self.stats.feasible_cnt, 2)
+
+        # configurations within the same pixels
+        self.assertTrue(self.cc.feasible((1.1, 0.9)))
+        self.assertFalse(self.cc.feasible((3.7, 0.2)))
+        self.assertEqual(self.stats.feasible_cache_hit_cnt, 2)
+        self.assertEqual(self.stats.feasible_cache_hit_rate, 0.5)
+        # cached results are not passed to the collision checker
+        self.assertEqual(self.stats.feasible_cnt, 2)
+
+    def test_keys_match_pixels(self):
+        # configurations are truncated to pixels as the image space engine does
+        self.assertEqual(self.cc._key((-0.5, 0.5)), self.cc._key((0.5, 0.0)))
+        self.assertNotEqual(self.cc._key((-1.0, 0.5)), self.cc._key((-0.5, 0.5)))
+        self.assertEqual(self.cc._key((np.inf, 0.5)), self.cc._key((np.inf, 0.7)))
+        rng = np.random.default_rng(0)
+        for p in rng.uniform(-3, 7, size=(200, 2)).round(1):
+            self.assertEqual(self.cc.feasible(p), self.inner_cc.feasible(p))
+
+    def test_lru_eviction(self):
+        self.assert_lru_eviction(
+            lambda i: self.cc.feasible((1.5, i + 0.5)),
+            lambda: self.stats.feasible_cache_miss_cnt,
+        )
+
+    def test_feasible_many(self):
+        self.cc.feasible((1.5, 3.5))
+        configs = np.array([[1.5, 3.5], [3.5, 0.5], [0.5, 3.5]])
+        self.assertEqual(self.cc.feasible_many(configs).tolist(), [True, False, True])
+        self.assertEqual(self.stats.feasible_cache_hit_cnt, 1)
+        self.assertEqual(self.stats.feasible_cache_miss_cnt, 3)
+        self.assertEqual(self.cc.feasible_many(configs).tolist(), [True, False, True])
+        self.assertEqual(self.stats.feasible_cache_hit_cnt, 4)
+        self.assertEqual(self.stats.feasible_cnt, 3)
+
+    def test_persist(self):
+        with tempfile.TemporaryDirectory() as cache_dir:
+            world_key = dict(world="abc")
+            cc = FeasibleCacheCollisionChecker(
+                self.inner_cc, 10, 0.5, cache_dir=cache_dir, world_key=world_key
+            )
+            cc.feasible((1.5, 0.5))
+            cc.feasible((3.5, 0.5))
+            cc.save()
+
+            stats = Stats()
+            self.inner_cc.stats = stats
+            cc = FeasibleCacheCollisionChecker(
+                self.inner_cc, 10, 0.5, cache_dir=cache_dir, world_key=world_key
+            )
+            self.assertTrue(cc.feasible((1.6, 0.7)))
+            self.assertFalse(cc.feasible((3.5, 0.5)))
+            self.assertEqual(stats.feasible_cache_hit_cnt, 2)
+            self.assertEqual(stats.feasible_cnt, 0)
+
+            # a different resolution or world is a different entry
+            for resolution, key in ((1, world_key), (0.5, dict(world="def"))):
+                cc = FeasibleCacheCollisionChecker(
+                    self.inner_cc, 10, resolution, cache_dir=cache_dir, world_key=key
+                )
+                cc.feasible((1.5, 0.5))
+                self.assertEqual(stats.feasible_cnt, 1)
+                stats.feasible_cnt = 0
+
+    def test_persist_into_smaller_cache(self):
+        with tempfile.TemporaryDirectory() as cache_dir:
+            world_key = dict(world="abc")
+            cc = FeasibleCacheCollisionChecker(
+                self.inner_cc, 10, 1, cache_dir=cache_dir, world_key=world_key
+            )
+            for y in (0.5, 1.5, 2.5, 3.5):
+                cc.feasible((1.5, y))
+            cc.feasible((3.5, 0.5))
+            # refresh the first one, such that it is saved as the most recent one
+            cc.feasible((1.5, 0.5))
+            cc.save()
+
+            # a smaller cache only loads the most recently used ones
+            stats = Stats()
+            self.inner_cc.stats = stats
+            cc = FeasibleCacheCollisionChecker(
+                self.inner_cc, 3, 1, cache_dir=cache_dir, world_key=world_key
+            )
+            self.assertEqual(len(cc._cache), 3)
+            self.assertTrue(cc.feasible((1.5, 0.5)))
+            self.assertFalse(cc.feasible((3.5, 0.5)))
+            self.assertTrue(cc.feasible((1.5, 3.5)))
+            self.assertEqual(stats.feasible_cache_hit_cnt, 3)
+            self.assertEqual(stats.feasible_cnt, 0)
+            self.assertTrue(cc.feasible((1.5, 2.5)))
+            self.assertEqual(stats.feasible_cache_miss_cnt, 1)
+            self.assertEqual(stats.feasible_cnt, 1)
+
+            # the loaded entries keep their order of recency when saved again
+            cc.save()
+            cc = FeasibleCacheCollisionChecker(
+                self.inner_cc, 10, 1, cache_dir=cache_dir, world_key=world_key
+            )
+            expected = [(3.5, 0.5), (1.5, 3.5), (1.5, 2.5)]
+            self.assertEqual(list(cc._cache), [cc._key(p) for p in expected])
+
+    def test_persist_truncated_file(self):
+        with tempfile.TemporaryDirectory() as cache_dir:
+            world_key = dict(world="abc")
+            cc = FeasibleCacheCollisionChecker(
+                self.inner_cc, 10, 1, cache_dir=cache_dir, world_key=world_key
+            )
+            for y in (0.5, 1.5, 2.5, 3.5):
+                cc.feasible((1.5, y))
+            cc.save()
+            fname = disk_cache.get_cache_filename(
+                cache_dir, "feasible-cache", cc._persist_key
+            )
+            with open(fname, "rb") as f:
+                content = f.read()
+            with open(fname, "wb") as f:
+                f.write(content[: len(content) // 2])
+
+            # a partly written file is ignored, and replaced when saved again
+            cc = FeasibleCacheCollisionChecker(
+                self.inner_cc, 10, 1, cache_dir=cache_dir, world_key=world_key
+            )
+            self.assertEqual(len(cc._cache), 0)
+            self.assertTrue(cc.feasible((1.5, 0.5)))
+            cc.save()
+            cc = FeasibleCacheCollisionChecker(
+                self.inner_cc, 10, 1, cache_dir=cache_dir, world_key=world_key
+            )
+            self.assertEqual(list(cc._cache), [cc._key((1.5, 0.5))])
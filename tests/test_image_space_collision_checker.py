@@ -1,8 +1,20 @@
-from unittest import TestCase
+import tempfile
+import tracemalloc
+from unittest import TestCase, mock
 
 import numpy as np
 
-from collisionChecker import ImgCollisionChecker
+import collisionChecker
+from collisionChecker import (
+    ImgCollisionChecker,
+    OccupancyPyramid,
+    PackedOccupancy,
+    DEFAULT_CC_ACCELERATIONS,
+    compute_clearance_map,
+    dilate_occupancy,
+    load_occupancy_image,
+    parse_cc_accelerations,
+)
 from tests.common_vars import create_test_image, mock_image_as_np
 from utils.common import Stats, MagicDict
 
@@ -46,6 +58,39 @@ class TestImgCollisionChecker(TestCase):
         self.assertEqual(
             self.cc.get_coor_before_collision(*pts_pair([0, 2], [2, 4])), (1, 3)
         )
+        # the pixels are not counted as feasibility tests
+        self.assertEqual(self.cc.stats.feasible_cnt, 0)
+
+    def test_get_coor_before_collision_as_pixel_walk(self):
+        cc = ImgCollisionChecker(
+            "maps/room1.png", stats=Stats(), args=MagicDict(cc_accel="none")
+        )
+
+        def walk(pos1, pos2):
+            # the original walk along each pixel
+            for p in cc.get_line(pos1, pos2):
+                end_pos = (p[0], p[1])
+                if not cc.feasible(p):
+                    break
+            return end_pos
+
+        rng = np.random.default_rng(0)
+        for pos1, pos2 in rng.uniform(-20, 550, size=(500, 2, 2)):
+            self.assertEqual(cc.get_coor_before_collision(pos1, pos2), walk(pos1, pos2))
+
+    def test_get_line_indices(self):
+        for start, end in [
+            ((0, 0), (3, 4)),
+            ((3, 4), (0, 0)),
+            ((0.5, 2.7), (12.2, -3.1)),
+            ((-5, 8), (-5, 8)),
+            ((7, 1), (-2, 1)),
+            ((1, 7), (1, -2)),
+        ]:
+            xs, ys = self.cc.get_line_indices(start, end)
+            self.assertEqual(
+                list(zip(xs.tolist(), ys.tolist())), self.cc.get_line(start, end)
+            )
 
     def test_visible(self):
         self.assertTrue(self.cc.visible(*pts_pair([0, 2], [2, 4])))
@@ -54,6 +99,204 @@ class TestImgCollisionChecker(TestCase):
     def test_not_visible(self):
         self.assertFalse(self.cc.visible(*pts_pair([0, 2], [2, 6])))
         self.assertFalse(self.cc.visible(*pts_pair([0, 0], [4, 0])))
+        # partially outside of the image
+        self.assertFalse(self.cc.visible(*pts_pair([0, 0], [0, 9])))
+
+    def test_visible_many(self):
+        origin = pt(0, 2) + eps
+        targets = np.array([[2, 4], [0, 4], [2, 6], [0, 9], [np.nan, 1]]) - eps
+        self.cc.stats.visible_cnt = 0
+        self.assertEqual(
+            self.cc.visible_many(origin, targets).tolist(),
+            [True, True, False, False, False],
+        )
+        # each edge should be counted as a visibility test
+        self.assertEqual(self.cc.stats.visible_cnt, len(targets))
+        self.assertEqual(len(self.cc.visible_many(origin, np.empty((0, 2)))), 0)
+
+    def test_clearance(self):
+        self.assertEqual(self.cc.clearance((0.5, 2.5)), 1)
+        self.assertEqual(self.cc.clearance((1.5, 0.5)), 1)
+        self.assertEqual(self.cc.clearance((3.5, 0.5)), 0)
+        # outside of the image
+        self.assertEqual(self.cc.clearance((-1.5, 0.5)), 0)
+        self.assertEqual(self.cc.clearance((0.5, 9.5)), 0)
+
+    def test_visible_with_clearance(self):
+        cc = ImgCollisionChecker("maps/room1.png", stats=Stats(), args=MagicDict())
+        rng = np.random.default_rng(0)
+        free_pixels = np.argwhere(cc.image.T == 1)
+        origins = free_pixels[rng.integers(len(free_pixels), size=200)] + 0.5
+        targets = origins + rng.uniform(-60, 60, size=origins.shape)
+        for origin, target in zip(origins, targets):
+            self.assertEqual(
+                cc.visible(origin, target),
+                all(cc.feasible(p) for p in cc.get_line(origin, target)),
+            )
+        # lines in open space should be accepted without checking each pixel
+        self.assertGreater(cc.stats.clearance_accept_cnt, 0)
+        accept_cnt = cc.stats.clearance_accept_cnt
+        origin = max(origins, key=cc.clearance)
+        targets = origin + rng.uniform(-60, 60, size=targets.shape)
+        self.assertEqual(
+            cc.visible_many(origin, targets).tolist(),
+            [cc.visible(origin, t) for t in targets],
+        )
+        self.assertGreater(cc.stats.clearance_accept_cnt, accept_cnt)
+
+    def test_occupancy_pyramid(self):
+        pyramid = OccupancyPyramid(self.cc._img)
+        # halves the resolution until a single block remains
+        self.assertEqual(len(pyramid.occupied), 4)
+        self.assertEqual(pyramid.occupied[-1], (b"\x01", 1))
+        self.assertTrue(pyramid.contains(5, 3))
+        self.assertFalse(pyramid.contains(6, 3))
+        self.assertTrue(pyramid.segment_free(0, 0, 1, 3))
+        self.assertFalse(pyramid.segment_free(0, 0, 2, 3))
+
+        cc = ImgCollisionChecker("maps/room1.png", stats=Stats(), args=MagicDict())
+        pyramid = OccupancyPyramid(cc._img)
+        rng = np.random.default_rng(0)
+        w, h = cc._img.shape
+        for start, end in rng.integers(0, [w, h], size=(500, 2, 2)):
+            self.assertEqual(
+                pyramid.segment_free(*start, *end),
+                all(cc.feasible(p) for p in cc.get_line(start, end)),
+            )
+
+    def test_box_free(self):
+        self.assertTrue(self.cc.box_free(0, 0, 1, 3))
+        self.assertTrue(self.cc.box_free(1, 2, 1, 2))
+        self.assertFalse(self.cc.box_free(0, 0, 2, 0))
+        self.assertFalse(self.cc.box_free(3, 1, 4, 2))
+        # outside of the image
+        self.assertFalse(self.cc.box_free(-1, 0, 0, 0))
+        self.assertFalse(self.cc.box_free(0, 0, 1, 4))
+
+    def test_parse_cc_accelerations(self):
+        self.assertEqual(parse_cc_accelerations(None), DEFAULT_CC_ACCELERATIONS)
+        self.assertEqual(parse_cc_accelerations("sat, Pyramid"), ("sat", "pyramid"))
+        self.assertEqual(parse_cc_accelerations(["clearance"]), ("clearance",))
+        self.assertEqual(parse_cc_accelerations("none"), ())
+        # nothing by default for packed maps, unless it is asked for
+        self.assertEqual(parse_cc_accelerations(None, packed_map=True), ())
+        self.assertEqual(
+            parse_cc_accelerations("pyramid", packed_map=True), ("pyramid",)
+        )
+        with self.assertRaises(ValueError):
+            parse_cc_accelerations("clearance,unknown")
+
+    def test_visible_with_each_acceleration(self):
+        rng = np.random.default_rng(1)
+        edges = rng.uniform(-10, 510, size=(300, 2, 2))
+        ref_cc = ImgCollisionChecker(
+            "maps/room1.png", stats=Stats(), args=MagicDict(cc_accel="none")
+        )
+        ref_results = [
+            all(ref_cc.feasible(p) for p in ref_cc.get_line(*e)) for e in edges
+        ]
+        for accel in ("none", "clearance", "pyramid", "sat", "clearance,sat"):
+            cc = ImgCollisionChecker(
+                "maps/room1.png", stats=Stats(), args=MagicDict(cc_accel=accel)
+            )
+            self.assertEqual([cc.visible(*e) for e in edges], ref_results)
+            self.assertEqual(
+                cc.visible_many(edges[0, 0], edges[:, 1]).tolist(),
+                [cc.visible(edges[0, 0], e) for e in edges[:, 1]],
+            )
+            # edges are undirected
+            self.assertEqual([cc.visible(e[1], e[0]) for e in edges], ref_results)
+            if "sat" not in accel:
+                self.assertEqual(cc.stats.box_accept_cnt, 0)
+            else:
+                self.assertGreater(cc.stats.box_accept_cnt, 0)
+            if "clearance" not in accel:
+                self.assertEqual(cc.stats.clearance_accept_cnt, 0)
+
+    def test_packed_occupancy(self):
+        free = np.random.default_rng(0).uniform(size=(7, 13)) < 0.5
+        packed = PackedOccupancy(free)
+        self.assertEqual(packed.shape, free.shape)
+        self.assertLess(packed.nbytes, free.nbytes)
+        self.assertTrue(np.array_equal(packed.unpack(), free))
+        self.assertTrue(np.array_equal(np.asarray(packed), free))
+        for x in range(free.shape[0]):
+            self.assertTrue(np.array_equal(packed.row(x), free[x]))
+
+        xs, ys = np.meshgrid(np.arange(-7, 7), np.arange(-13, 13), indexing="ij")
+        self.assertTrue(np.array_equal(packed[xs, ys], free[xs, ys]))
+        self.assertEqual(packed[3, -1], free[3, -1])
+        with self.assertRaises(IndexError):
+            packed[0, 13]
+        with self.assertRaises(IndexError):
+            packed[7, 0]
+
+    def test_packed_map(self):
+        self.assertEqual(self.cc.image.dtype, bool)
+        cc = ImgCollisionChecker(
+            "maps/room1.png",
+            stats=Stats(),
+            args=MagicDict(cc_accel="none", packed_map=True),
+        )
+        ref_cc = ImgCollisionChecker(
+            "maps/room1.png", stats=Stats(), args=MagicDict(cc_accel="none")
+        )
+        self.assertIsInstance(cc._img, PackedOccupancy)
+        self.assertTrue(np.array_equal(cc.image, ref_cc.image))
+        self.assertEqual(cc.get_image_shape(), ref_cc.get_image_shape())
+
+        rng = np.random.default_rng(2)
+        edges = rng.uniform(-10, 510, size=(300, 2, 2))
+        self.assertEqual(
+            [cc.visible(*e) for e in edges], [ref_cc.visible(*e) for e in edges]
+        )
+        self.assertEqual(
+            cc.visible_many(edges[0, 0], edges[:, 1]).tolist(),
+            ref_cc.visible_many(edges[0, 0], edges[:, 1]).tolist(),
+        )
+        self.assertEqual(
+            [cc.feasible(p) for p in edges[:, 0]],
+            [ref_cc.feasible(p) for p in edges[:, 0]],
+        )
+        # the lazily built structures should see the same map
+        self.assertEqual(cc.clearance((100, 100)), ref_cc.clearance((100, 100)))
+        self.assertEqual(cc.box_free(0, 0, 50, 50), ref_cc.box_free(0, 0, 50, 50))
+
+    def test_packed_map_memory(self):
+        cc = ImgCollisionChecker(
+            "maps/room1.png", stats=Stats(), args=MagicDict(packed_map=True)
+        )
+        self.assertEqual(cc._accel, ())
+        self.assertIsNone(cc._clearance)
+        self.assertIsNone(cc._pyramid)
+
+        tracemalloc.start()
+        try:
+            cc = ImgCollisionChecker(
+                "maps/room1.png", stats=Stats(), args=MagicDict(packed_map=True)
+            )
+            peak = tracemalloc.get_traced_memory()[1]
+        finally:
+            tracemalloc.stop()
+        # no more than the boolean image at any point
+        w, h = cc.get_image_shape()
+        self.assertLess(peak, 2.5 * w * h)
+
+    def test_banded_clearance_map(self):
+        free = np.random.default_rng(0).uniform(size=(2000, 50)) < 0.99
+        full = compute_clearance_map(free)
+        self.assertEqual(full.dtype, np.float32)
+        with mock.patch.object(collisionChecker, "CLEARANCE_BAND_PIXELS", 1000):
+            tracemalloc.start()
+            try:
+                banded = compute_clearance_map(free, max_clearance=5)
+                peak = tracemalloc.get_traced_memory()[1]
+            finally:
+                tracemalloc.stop()
+        self.assertEqual(banded.dtype, np.float32)
+        self.assertTrue(np.array_equal(banded, np.minimum(full, 5)))
+        # the float32 result, plus the intermediates of a single band
+        self.assertLess(peak, 5 * free.size)
 
     def test_feasible(self):
         self.assertTrue(self.cc.feasible((1.5, 0.5)))
@@ -64,3 +307,68 @@ class TestImgCollisionChecker(TestCase):
         self.assertFalse(self.cc.feasible((3.5, 0.5)))
         self.assertFalse(self.cc.feasible((-1.5, 3.5)))
         self.assertFalse(self.cc.feasible((1.78, 4.5)))
+
+
+class TestRobotRadius(TestCase):
+    def setUp(self) -> None:
+        collisionChecker._CLEARANCE_MAPS.clear()
+        collisionChecker._DILATED_MAPS.clear()
+        self.free = load_occupancy_image("maps/room1.png")
+
+    def test_dilate_occupancy(self):
+        free = np.ones((12, 9), dtype=bool)
+        free[6, 4] = False
+        dilated = dilate_occupancy(free, 2.5)
+        xs, ys = np.meshgrid(np.arange(12), np.arange(9), indexing="ij")
+        # within the radius of the obstacle or the outside of the map
+        blocked = (
+            (np.hypot(xs - 6, ys - 4) <= 2.5)
+            | (np.minimum(xs, ys) + 1 <= 2.5)
+            | (np.minimum(11 - xs, 8 - ys) + 1 <= 2.5)
+        )
+        self.assertTrue(np.array_equal(dilated, ~blocked))
+        self.assertFalse(dilated.flags.writeable)
+
+    def test_in_process_cache(self):
+        dilated = dilate_occupancy(self.free, 5)
+        self.assertIs(dilate_occupancy(self.free.copy(), 5), dilated)
+        with mock.patch.object(
+            collisionChecker, "compute_clearance_map"
+        ) as compute_clearance_map:
+            # the distance transform is shared by all radii
+            self.assertIsNot(dilate_occupancy(self.free, 7), dilated)
+            compute_clearance_map.assert_not_called()
+
+    def test_disk_cache(self):
+        with tempfile.TemporaryDirectory() as cache_dir:
+            dilated = dilate_occupancy(self.free, 5, cache_dir=cache_dir, persist=True)
+            collisionChecker._CLEARANCE_MAPS.clear()
+            collisionChecker._DILATED_MAPS.clear()
+            with mock.patch.object(
+                collisionChecker, "compute_clearance_map"
+            ) as compute_clearance_map:
+                self.assertTrue(
+                    np.array_equal(
+                        dilate_occupancy(
+                            self.free, 5, cache_dir=cache_dir, persist=True
+                        ),
+                        dilated,
+                    )
+                )
+                compute_clearance_map.assert_not_called()
+
+    def test_collision_checker(self):
+        cc = ImgCollisionChecker(
+            "maps/room1.png", stats=Stats(), args=MagicDict(robot_radius=5)
+        )
+        point_cc = ImgCollisionChecker(
+            "maps/room1.png", stats=Stats(), args=MagicDict()
+        )
+        self.assertTrue(np.array_equal(cc._img, dilate_occupancy(self.free, 5)))
+        self.assertTrue(cc.feasible((100, 100)))
+        # free for a point, but too close to an obstacle for the disc
+        x, y = np.argwhere(compute_clearance_map(self.free) == 3)[0]
+        self.assertTrue(point_cc.feasible((x, y)))
+        self.assertFalse(cc.feasible((x, y)))
+        self.assertTrue(point_cc.visible((x, y), (x, y)))
+        self.assertFalse(cc.visible((x, y), (x, y)))
@@ -0,0 +1,89 @@
+from unittest import TestCase
+from unittest.mock import MagicMock
+
+import numpy as np
+
+from collisionChecker import KlamptCollisionChecker
+from utils.common import Stats
+
+
+class TestKlamptBisectionEdgeChecker(TestCase):
+    def setUp(self) -> None:
+        # a one dimensional space, such that the edge checker could be tested
+        # without loading a Klampt world
+        self.queries = []
+        self.obstacles = set()
+
+        def is_feasible(q):
+            self.queries.append(round(q[0], 6))
+            return round(q[0], 6) not in self.obstacles
+
+        self.cc = KlamptCollisionChecker.__new__(KlamptCollisionChecker)
+        self.cc.stats = Stats()
+        self.cc.edge_check_resolution = 0.1
+        self.cc.edge_checker = "bisection"
+        self.cc.lipschitz = None
+        self.cc.space = MagicMock()
+        self.cc.space.distance = lambda a, b: abs(b[0] - a[0])
+        self.cc.space.interpolate = lambda a, b, u: [a[0] + u * (b[0] - a[0])]
+        self.cc.space.isFeasible = is_feasible
+
+    def test_bisection_order(self):
+        self.assertTrue(self.cc._bisection_visible([0], [0.8]))
+        self.assertEqual(self.queries, [0.4, 0.2, 0.6, 0.1, 0.3, 0.5, 0.7])
+        self.assertEqual(self.cc.stats.edge_query_cnt, 7)
+
+    def test_same_configurations_as_klampt(self):
+        self.assertTrue(self.cc._bisection_visible([1], [0]))
+        # all interior configurations at the given resolution
+        self.assertEqual(
+            sorted(self.queries), [round(0.1 * i, 6) for i in range(1, 10)]
+        )
+        self.queries.clear()
+        self.assertTrue(self.cc._bisection_visible([0], [0.05]))
+        self.assertEqual(self.queries, [])
+
+    def test_default_edge_queries(self):
+        self.cc.edge_checker = "klampt"
+        self.cc.space.isVisible = MagicMock(return_value=True)
+        self.assertTrue(self.cc.visible([0] * 6, [0.8] + [0] * 5))
+        # the same configurations as the bisection edge checker
+        self.assertEqual(self.cc.stats.edge_query_cnt, 7)
+        self.cc.visible([0] * 6, [0.05] + [0] * 5)
+        self.assertEqual(self.cc.stats.edge_query_cnt, 7)
+        self.assertEqual(self.cc.stats.visible_cnt, 2)
+
+    def test_stops_at_first_collision(self):
+        self.obstacles.add(0.6)
+        self.assertFalse(self.cc._bisection_visible([0], [0.8]))
+        self.assertEqual(self.queries, [0.4, 0.2, 0.6])
+
+    def test_skip_by_clearance(self):
+        self.cc.lipschitz = 1.0
+        self.cc.clearance = MagicMock(return_value=0.5)
+        self.assertTrue(self.cc._bisection_visible([0], [0.8]))
+        # the robot cannot reach any obstacle within 0.4 from the midpoint
+        self.assertEqual(self.queries, [0.4])
+
+        self.queries.clear()
+        self.cc.clearance = MagicMock(return_value=0.3)
+        self.assertTrue(self.cc._bisection_visible([0], [0.8]))
+        self.assertEqual(self.queries, [0.4, 0.2, 0.6])
+
+    def test_edges_across_pi(self):
+        # the shorter way around, as env.Env.radian_dist measures it
+        self.cc.edge_check_resolution = 0.01
+        a, b = [3.1] + [0] * 5, [-3.1] + [0] * 5
+        self.assertTrue(self.cc.visible(a, b))
+        self.assertEqual(len(self.queries), 8)
+        self.assertTrue(all(3.1 < q < 2 * np.pi - 3.1 for q in self.queries))
+
+        self.cc.edge_checker = "klampt"
+        self.cc.space.isVisible = MagicMock(return_value=True)
+        self.cc.visible_many(np.array(b), np.array([a, [-3.0] + [0] * 5]))
+        (a1, b1), (a2, b2) = [c.args for c in self.cc.space.isVisible.call_args_list]
+        self.assertAlmostEqual(a1[0], -3.1)
+        self.assertAlmostEqual(b1[0], 3.1 - 2 * np.pi)
+        # edges that do not cross pi stay as they are
+        self.assertAlmostEqual(b2[0], -3.0)
+        self.assertEqual(len(b1), 7)
@@ -0,0 +1,119 @@
+from copy import deepcopy
+from unittest.mock import MagicMock
+
+import numpy as np
+
+import visualiser
+from env import Env
+from samplers.randomPolicySampler import RandomPolicySampler
+from tests.common_vars import template_args, use_looped_visible_many
+from tests.test_rrtPlanner import TestRRTPlanner
+from utils import planner_registry
+from utils.common import Node
+
+
+# reuse some of the test from RRTPlanner
+class TestLazyRRTPlanner(TestRRTPlanner):
+    def setUp(self) -> None:
+        args = deepcopy(template_args)
+        visualiser.VisualiserSwitcher.choose_visualiser("base")
+
+        # setup to use the correct sampler
+        args["sampler"] = RandomPolicySampler()
+
+        # use some suitable planner
+        args["planner_data_pack"] = planner_registry.PLANNERS["lazyrrt"]
+
+        self.env = Env(args)
+        self.sampler = self.env.args.sampler
+        self.planner = self.env.args.planner
+
+        self.planner.args.radius = 1000
+        # make it always be visible for testing
+        self.planner.args.env.cc.feasible = MagicMock(return_value=True)
+        self.planner.args.env.cc.visible = MagicMock(return_value=True)
+        use_looped_visible_many(self.planner.args.env.cc)
+
+    def create_tree(self):
+        # a tree of root <- a <- b, where all edges are verified
+        root = self.planner.nodes[0]
+        a = Node(root.pos + [10, 0])
+        b = Node(root.pos + [20, 0])
+        for node, parent in ((a, root), (b, a)):
+            node.parent = parent
+            node.cost = parent.cost + 10
+            self.planner._verified_parent[node] = parent
+            self.planner.add_newnode(node)
+        return root, a, b
+
+    def test_edges_are_assumed(self):
+        root, a, b = self.create_tree()
+        self.planner.args.env.cc.visible.reset_mock()
+
+        newnode = Node(root.pos + [10, 5])
+        self.planner._verified_parent[newnode] = b
+        newnode, nn = self.planner.choose_least_cost_parent(
+            newnode, b, nodes=self.planner.nodes
+        )
+        self.assertIs(nn, root)
+        self.planner.add_newnode(newnode)
+        self.planner.rewire(newnode, self.planner.nodes)
+        self.planner.args.env.cc.visible.assert_not_called()
+
+    def test_verify_path(self):
+        root, a, b = self.create_tree()
+        # b is connected to the root with an assumed edge
+        b.parent = root
+        b.cost = 20
+
+        self.planner._verify_path(b)
+        self.planner.args.env.cc.visible.assert_called_once()
+        self.assertIs(b.parent, root)
+        # it is now verified
+        self.planner._verify_path(b)
+        self.planner.args.env.cc.visible.assert_called_once()
+
+    def test_verify_path_repairs_invalid_edge(self):
+        root, a, b = self.create_tree()
+        b.parent = root
+        b.cost = 15
+        self.planner.args.env.cc.visible = MagicMock(return_value=False)
+
+        self.planner._verify_path(b)
+        self.assertIs(b.parent, a)
+        self.assertAlmostEqual(b.cost, 20)
+        self.assertIn(frozenset((root, b)), self.planner._invalid_edges)
+
+        # the invalid edge should not be assumed again
+        newnode, nn = self.planner.choose_least_cost_parent(b, a, nodes=[root, a])
+        self.assertIs(nn, a)
+
+    def test_repair_breaks_cycle(self):
+        root, a, b = self.create_tree()
+        # root <- b <- a, with assumed edges
+        b.parent = root
+        a.parent = b
+        self.planner.args.env.cc.visible = MagicMock(return_value=False)
+
+        self.planner._verify_path(a)
+        # falls back to the verified tree
+        self.assertIs(a.parent, root)
+        self.assertIs(b.parent, a)
+
+    def test_solution_is_verified(self):
+        root, a, b = self.create_tree()
+        self.planner.goal_pt = Node(b.pos + [1, 0])
+        self.planner.args.goal_radius = 5
+        self.planner.args.env.cc.visible = MagicMock(return_value=True)
+
+        self.sampler.get_valid_next_pos = MagicMock(
+            return_value=(b.pos + [1, 1], MagicMock(), MagicMock())
+        )
+        self.planner.run_once()
+        self.assertIsNotNone(self.planner.goal_pt.parent)
+        # the reported cost is the cost of the verified path
+        node, cost = self.planner.goal_pt.parent, 0
+        while node.parent is not None:
+            cost += np.linalg.norm(node.pos - node.parent.pos)
+            node = node.parent
+        self.assertAlmostEqual(self.planner.c_max, cost)
@@ -4,7 +4,7 @@ from unittest.mock import MagicMock
 import visualiser
 from env import Env
 from samplers.likelihoodPolicySampler import LikelihoodPolicySampler
-from tests.common_vars import template_args
+from tests.common_vars import template_args, use_looped_visible_many
 from tests.test_rrtPlanner import TestRRTPlanner
 from utils import planner_registry
 
@@ -29,3 +29,4 @@ class LikelihoodPolicyPlanner(TestRRTPlanner):
         # make it always be visible for testing
         self.planner.args.env.cc.feasible = MagicMock(return_value=True)
         self.planner.args.env.cc.visible = MagicMock(return_value=True)
+        use_looped_visible_many(self.planner.args.env.cc)
@@ -0,0 +1,253 @@
+import math
+from unittest import TestCase
+from unittest.mock import patch
+
+import numpy as np
+
+from env import Env
+from utils import nn_index
+
+
+class TestNearestNeighbourIndex(TestCase):
+    def setUp(self) -> None:
+        self.rng = np.random.default_rng(0)
+
+    def _create_indices(self, num_dim):
+        return (
+            nn_index.BruteForceIndex(num_dim),
+            nn_index.KDTreeIndex(num_dim, buffer_size=8),
+            nn_index.RTreeIndex(num_dim),
+            nn_index.GridIndex(num_dim, cell_size=7),
+        )
+
+    def test_same_as_brute_force(self):
+        for num_dim in (2, 4, 7):
+            brute, *indices = self._create_indices(num_dim)
+            for batch_size in (1, 1, 3, 20, 1, 150, 5, 400):
+                poses = self.rng.uniform(0, 100, (batch_size, num_dim))
+                for index in (brute, *indices):
+                    if batch_size == 1:
+                        index.add(poses[0])
+                    else:
+                        index.add_many(poses)
+                for index in indices:
+                    self.assertEqual(len(brute), len(index))
+                    self.assertTrue(np.array_equal(brute.poses, index.poses))
+
+                for pos in self.rng.uniform(-10, 110, (20, num_dim)):
+                    for index in indices:
+                        self.assertEqual(brute.nearest(pos), index.nearest(pos))
+                        self.assertEqual(
+                            brute.knn(pos, 5).tolist(), index.knn(pos, 5).tolist()
+                        )
+                        self.assertEqual(
+                            brute.within_radius(pos, 30).tolist(),
+                            index.within_radius(pos, 30).tolist(),
+                        )
+                        self.assertEqual(
+                            brute.nearest_within_radius(pos, 5),
+                            index.nearest_within_radius(pos, 5),
+                        )
+
+    def test_queries(self):
+        poses = np.array([[0, 0], [1, 1], [2, 2], [3, 3], [10, 10]])
+        for index in self._create_indices(2):
+            index.add_many(poses)
+            self.assertEqual(index.nearest(np.array([2.2, 2.1])), 2)
+            self.assertEqual(index.knn(np.array([2.2, 2.1]), 3).tolist(), [2, 3, 1])
+            # asking for more neighbours than there are
+            self.assertEqual(len(index.knn(np.array([0, 0]), 10)), 5)
+            # the radius is inclusive and the indices are in insertion order
+            self.assertEqual(
+                index.within_radius(np.array([2, 2]), np.sqrt(2)).tolist(),
+                [1, 2, 3],
+            )
+            self.assertEqual(index.within_radius(np.array([50, 50]), 1).tolist(), [])
+
+    def test_kdtree_forest(self):
+        index = nn_index.KDTreeIndex(2, buffer_size=8)
+        for pos in self.rng.uniform(0, 100, (1000, 2)):
+            index.add(pos)
+        # the trees cover contiguous ranges, and only a few trees are kept
+        start = 0
+        for tree, tree_start in index._trees:
+            self.assertEqual(tree_start, start)
+            start += tree.n
+        self.assertEqual(start, index._buffer_start)
+        self.assertLess(len(index) - index._buffer_start, 8)
+        self.assertLess(len(index._trees), 6)
+
+    def test_rtree_bulk_loading(self):
+        index = nn_index.RTreeIndex(2)
+        index.add_many(self.rng.uniform(0, 100, (10, 2)))
+        rtree = index._rtree
+        # small batches are inserted into the existing R-tree
+        index.add_many(self.rng.uniform(0, 100, (5, 2)))
+        self.assertIs(index._rtree, rtree)
+        # a batch that is larger than the existing one is bulk loaded
+        index.add_many(self.rng.uniform(0, 100, (20, 2)))
+        self.assertIsNot(index._rtree, rtree)
+        self.assertEqual(len(index._rtree), 35)
+        self.assertEqual(
+            index.within_radius(np.array([50, 50]), 200).tolist(), list(range(35))
+        )
+
+    def test_wrapped_metric(self):
+        period = 2 * np.pi
+        for num_dim in (2, 6):
+            brute = nn_index.BruteForceIndex(num_dim, period=period)
+            kdtree = nn_index.KDTreeIndex(num_dim, buffer_size=8, period=period)
+            for batch_size in (1, 30, 1, 200):
+                # including configurations outside of [-pi, pi)
+                poses = self.rng.uniform(-4, 4, (batch_size, num_dim))
+                brute.add_many(poses)
+                kdtree.add_many(poses)
+            self.assertTrue(np.array_equal(brute.poses, kdtree.poses))
+
+            for pos in self.rng.uniform(-4, 4, (20, num_dim)):
+                # the same distances as the environment of the klampt engine
+                expected = [Env.radian_dist(pos, p) for p in brute.poses]
+                np.testing.assert_allclose(
+                    brute.distances(np.arange(len(brute)), pos), expected
+                )
+                self.assertEqual(int(np.argmin(expected)), kdtree.nearest(pos))
+                self.assertEqual(
+                    brute.knn(pos, 5).tolist(), kdtree.knn(pos, 5).tolist()
+                )
+                self.assertEqual(
+                    brute.within_radius(pos, 2).tolist(),
+                    kdtree.within_radius(pos, 2).tolist(),
+                )
+
+    def test_wrapped_nearest(self):
+        index = nn_index.KDTreeIndex(1, buffer_size=2, period=2 * np.pi)
+        index.add_many(np.array([[-3.1], [0.0], [2.0], [1.0]]))
+        # the nearest configuration is across pi
+        self.assertEqual(index.nearest(np.array([3.1])), 0)
+        self.assertEqual(index.within_radius(np.array([3.1]), 0.1).tolist(), [0])
+        self.assertEqual(index.knn(np.array([3.1]), 2).tolist(), [0, 2])
+
+    def test_grid_cells(self):
+        index = nn_index.GridIndex(2, cell_size=10)
+        index.add_many(np.array([[1, 1], [5, 9], [-1, 1], [15, 25], [19, 29]]))
+        self.assertEqual(index._cells, {(0, 0): [0, 1], (-1, 0): [2], (1, 2): [3, 4]})
+        # the neighbourhood only visits the cells around the configuration
+        self.assertEqual(index.within_radius(np.array([3, 3]), 7).tolist(), [0, 1, 2])
+        # larger neighbourhoods than the index are searched in full, without
+        # math.prod (which is not available before Python 3.8)
+        with patch.object(math, "prod", side_effect=AssertionError, create=True):
+            self.assertEqual(
+                index.within_radius(np.array([3, 3]), 1e6).tolist(), [0, 1, 2, 3, 4]
+            )
+            self.assertEqual(
+                index.within_radius(np.array([3, 3]), 7).tolist(), [0, 1, 2]
+            )
+        self.assertEqual(index.nearest(np.array([12, 22])), 3)
+        self.assertEqual(index.nearest_within_radius(np.array([50, 50]), 10), None)
+        self.assertEqual(index.knn(np.array([0, 0]), 2).tolist(), [0, 2])
+        with self.assertRaises(ValueError):
+            nn_index.GridIndex(2, cell_size=0)
+
+    def test_rpforest(self):
+        num_dim = 3
+        brute = nn_index.BruteForceIndex(num_dim)
+        rpforest = nn_index.RPForestIndex(num_dim, num_trees=8, buffer_size=8)
+        # small forests are searched exactly
+        poses = self.rng.uniform(0, 100, (nn_index.RPFOREST_EXACT_SIZE, num_dim))
+        brute.add_many(poses)
+        rpforest.add_many(poses)
+        for pos in self.rng.uniform(0, 100, (20, num_dim)):
+            self.assertEqual(brute.nearest(pos), rpforest.nearest(pos))
+            self.assertEqual(brute.knn(pos, 5).tolist(), rpforest.knn(pos, 5).tolist())
+            self.assertEqual(
+                brute.within_radius(pos, 20).tolist(),
+                rpforest.within_radius(pos, 20).tolist(),
+            )
+
+        # larger forests find most of the nearest configurations
+        poses = self.rng.uniform(0, 100, (5000, num_dim))
+        brute.add_many(poses)
+        rpforest.add_many(poses)
+        self.assertTrue(np.array_equal(brute.poses, rpforest.poses))
+        self.assertGreater(rpforest._trees[0][0].depth, 0)
+        queries = self.rng.uniform(0, 100, (100, num_dim))
+        found = [brute.nearest(pos) == rpforest.nearest(pos) for pos in queries]
+        self.assertGreater(np.mean(found), 0.9)
+        for pos in queries[:20]:
+            # the neighbours within a radius are exact
+            for radius in (0, 10, 30, 200):
+                self.assertEqual(
+                    rpforest.within_radius(pos, radius).tolist(),
+                    brute.within_radius(pos, radius).tolist(),
+                )
+        # including the configurations themselves
+        for pos in poses[:20]:
+            self.assertEqual(
+                rpforest.within_radius(pos, 0).tolist(),
+                brute.within_radius(pos, 0).tolist(),
+            )
+        # the most recently added configurations are always found
+        rpforest.add(np.array([50.0, 50.0, 50.0]))
+        self.assertEqual(rpforest.nearest(np.array([50.0, 50.0, 50.01])), len(brute))
+
+        with self.assertRaises(ValueError):
+            nn_index.RPForestIndex(num_dim, num_trees=0)
+        with self.assertRaises(ValueError):
+            nn_index.RPForestIndex(num_dim, leaf_size=0)
+
+    def test_rpforest_wrapped_metric(self):
+        period = 2 * np.pi
+        brute = nn_index.BruteForceIndex(2, period=period)
+        rpforest = nn_index.RPForestIndex(2, num_trees=8, period=period)
+        poses = self.rng.uniform(-4, 4, (5000, 2))
+        brute.add_many(poses)
+        rpforest.add_many(poses)
+        queries = self.rng.uniform(-4, 4, (100, 2))
+        found = [brute.nearest(pos) == rpforest.nearest(pos) for pos in queries]
+        self.assertGreater(np.mean(found), 0.9)
+        for pos in queries[:20]:
+            self.assertEqual(
+                rpforest.within_radius(pos, 1).tolist(),
+                brute.within_radius(pos, 1).tolist(),
+            )
+
+    def test_empty(self):
+        for index in self._create_indices(2):
+            self.assertEqual(len(index.knn(np.array([0, 0]), 3)), 0)
+            self.assertEqual(len(index.within_radius(np.array([0, 0]), 3)), 0)
+            with self.assertRaises(ValueError):
+                index.nearest(np.array([0, 0]))
+
+    def test_create_index(self):
+        self.assertIsInstance(
+            nn_index.create_index(None, 3),
+            nn_index.NN_INDICES[nn_index.DEFAULT_NN_INDEX],
+        )
+        self.assertIsInstance(
+            nn_index.create_index("brute", 3), nn_index.BruteForceIndex
+        )
+        with self.assertRaises(ValueError):
+            nn_index.create_index("unknown", 3)
+        # the grid index is chosen automatically for the image engine
+        index = nn_index.create_index("auto", 2, engine="image", radius=11)
+        self.assertIsInstance(index, nn_index.GridIndex)
+        self.assertEqual(index.cell_size, 11)
+        self.assertIsInstance(
+            nn_index.create_index("auto", 2, engine="klampt", radius=11),
+            nn_index.KDTreeIndex,
+        )
+        with self.assertRaises(ValueError):
+            nn_index.create_index("grid", 2)
+        # the metric of the klampt engine wraps around
+        index = nn_index.create_index("auto", 6, engine="klampt", radius=0.1)
+        self.assertIsInstance(index, nn_index.KDTreeIndex)
+        self.assertEqual(index.period, 2 * np.pi)
+        with self.assertRaises(ValueError):
+            nn_index.create_index("rtree", 6, engine="klampt")
+        # the random projection forest index is tunable
+        index = nn_index.create_index("rpforest", 6, num_trees=7, leaf_size=9)
+        self.assertIsInstance(index, nn_index.RPForestIndex)
+        self.assertEqual((index.num_trees, index.leaf_size), (7, 9))
+        index = nn_index.create_index("rpforest", 6, engine="klampt")
+        self.assertEqual(index.num_trees, nn_index.RPFOREST_NUM_TREES)
+        self.assertEqual(index.period, 2 * np.pi)
@@ -0,0 +1,228 @@
+from unittest import TestCase
+
+import numpy as np
+
+from collisionChecker import (
+    PolygonCollisionChecker,
+    SegmentBVH,
+    extract_obstacle_edges,
+    segments_distance,
+    segments_intersect,
+    simplify_segments,
+)
+from tests.common_vars import create_test_image
+from utils.common import Stats, MagicDict
+
+
+def from_free(free, tolerance=None):
+    cc = PolygonCollisionChecker.__new__(PolygonCollisionChecker)
+    cc.stats = Stats()
+    cc._img = free
+    cc.simplify_tolerance = tolerance
+    edges = extract_obstacle_edges(free)
+    if tolerance:
+        edges = simplify_segments(edges, tolerance)
+    cc.bvh = SegmentBVH(edges, leaf_size=2)
+    return cc
+
+
+class TestPolygonCollisionChecker(TestCase):
+    def setUp(self) -> None:
+        # only the pixels with x < 2 are free
+        self.cc = PolygonCollisionChecker(
+            create_test_image(), stats=Stats(), args=MagicDict()
+        )
+
+    def test_extract_obstacle_edges(self):
+        self.assertEqual(
+            sorted(map(tuple, extract_obstacle_edges(self.cc._img).tolist())),
+            [(0, 0, 0, 4), (0, 0, 2, 0), (0, 4, 2, 4), (2, 0, 2, 4)],
+        )
+        # the border of the map is not indexed
+        self.assertEqual(self.cc.bvh.segments.tolist(), [[2, 0, 2, 4]])
+        self.assertEqual(len(extract_obstacle_edges(np.zeros((3, 4), bool))), 0)
+        # collinear unit edges are merged
+        free = np.ones((5, 5), dtype=bool)
+        free[1:4, 2] = False
+        self.assertEqual(len(extract_obstacle_edges(free)), 8)
+
+    def test_simplify_segments(self):
+        # a diagonal obstacle, whose boundary is a staircase of pixels
+        free = np.tri(40, dtype=bool)
+        edges = extract_obstacle_edges(free)
+        simplified = simplify_segments(edges, 0.75)
+        self.assertLess(len(simplified), len(edges) // 10)
+        # a triangle, at any resolution
+        self.assertEqual(len(simplified), 3)
+        fine = np.tri(160, dtype=bool)
+        self.assertEqual(len(simplify_segments(extract_obstacle_edges(fine), 0.75)), 3)
+        # a closed loop around a single free pixel is within the tolerance of its
+        # diagonal
+        hole = np.zeros((3, 3), dtype=bool)
+        hole[1, 1] = True
+        hole_edges = extract_obstacle_edges(hole)
+        hole_simplified = simplify_segments(hole_edges, 0.75)
+        self.assertEqual(len(hole_simplified), 2)
+        # every point along the edges is within the tolerance of the simplified ones
+        ts = np.linspace(0, 1, 11)[:, np.newaxis]
+        for edges, simplified in (
+            (edges, simplified),
+            (hole_edges, hole_simplified),
+        ):
+            for edge in edges:
+                for p in edge[:2] + ts * (edge[2:] - edge[:2]):
+                    self.assertLessEqual(
+                        min(segments_distance(*p, *p, *s) for s in simplified), 0.75
+                    )
+        self.assertEqual(len(simplify_segments(np.empty((0, 4)), 0.75)), 0)
+
+    def test_simplified_visible(self):
+        cc = PolygonCollisionChecker(
+            create_test_image(),
+            stats=Stats(),
+            args=MagicDict(polygon_simplify=0.75),
+        )
+        self.assertTrue(cc.visible((0.5, 0.5), (1.2, 3.5)))
+        self.assertFalse(cc.visible((0.5, 0.5), (2.5, 0.5)))
+        # within the tolerance of the boundary
+        self.assertFalse(cc.visible((0.5, 0.5), (1.5, 3.5)))
+        with self.assertRaises(ValueError):
+            PolygonCollisionChecker(
+                create_test_image(),
+                stats=Stats(),
+                args=MagicDict(polygon_simplify=0),
+            )
+
+        # simplified edges are conservative
+        rng = np.random.default_rng(1)
+        free = rng.uniform(size=(30, 20)) < 0.9
+        free[5:25, 5:15] |= np.tri(20, 10, dtype=bool)
+        exact, simplified = from_free(free), from_free(free, 0.75)
+        self.assertLess(len(simplified.bvh), len(exact.bvh))
+        num_visible = 0
+        for _ in range(500):
+            p1 = rng.uniform(-1, [31, 21])
+            p2 = p1 + rng.uniform(-6, 6, size=2)
+            if simplified.visible(p1, p2):
+                num_visible += 1
+                self.assertTrue(exact.visible(p1, p2))
+        self.assertGreater(num_visible, 0)
+
+    def test_feasible(self):
+        self.assertTrue(self.cc.feasible((1.5, 0.5)))
+        self.assertTrue(self.cc.feasible((0, 3.9)))
+        self.assertFalse(self.cc.feasible((2.5, 0.5)))
+        self.assertFalse(self.cc.feasible((-0.5, 0.5)))
+        self.assertFalse(self.cc.feasible((0.5, np.nan)))
+        self.assertEqual(self.cc.stats.feasible_cnt, 5)
+
+    def test_visible(self):
+        self.assertTrue(self.cc.visible((0.5, 0.5), (1.5, 3.5)))
+        self.assertFalse(self.cc.visible((0.5, 0.5), (2.5, 0.5)))
+        # touching an obstacle
+        self.assertFalse(self.cc.visible((0.5, 0.5), (2.0, 0.5)))
+        # leaving the map
+        self.assertFalse(self.cc.visible((0.5, 0.5), (0.5, 5.5)))
+        # starting from an obstacle
+        self.assertFalse(self.cc.visible((3.5, 0.5), (3.5, 1.5)))
+        self.assertFalse(self.cc.visible((0.5, 0.5), (np.inf, 0.5)))
+        self.assertEqual(self.cc.stats.visible_cnt, 6)
+
+    def test_visible_touching(self):
+        # only the pixel (1, 1) is an obstacle
+        free = np.ones((4, 4), dtype=bool)
+        free[1, 1] = False
+        cc = from_free(free)
+        # the corners of the obstacle, as single points and along its sides
+        for x in range(1, 4):
+            for y in range(1, 4):
+                p = (float(x), float(y))
+                self.assertEqual(cc.visible(p, p), cc.feasible(p))
+        self.assertTrue(cc.visible((2, 2), (2, 3)))
+        self.assertTrue(cc.visible((2, 1.5), (2, 1.8)))
+        self.assertTrue(cc.visible((2, 0.5), (2, 3.5)))
+        self.assertTrue(cc.visible((0.5, 2), (3.5, 2)))
+        self.assertFalse(cc.visible((1, 0.5), (1, 3.5)))
+        self.assertFalse(cc.visible((0.5, 1), (3.5, 1)))
+        # passing by a corner, which is free only for (2, 2)
+        self.assertTrue(cc.visible((1.5, 2.5), (2.5, 1.5)))
+        self.assertFalse(cc.visible((0.5, 1.5), (1.5, 0.5)))
+        self.assertFalse(cc.visible((0.5, 0.5), (1.5, 1.5)))
+        self.assertFalse(cc.visible((2.5, 0.5), (0.5, 2.5)))
+
+    def test_visible_against_dense_samples(self):
+        rng = np.random.default_rng(0)
+        free = rng.uniform(size=(30, 20)) < 0.9
+        cc = from_free(free)
+        ts = np.linspace(0, 1, 2001)[:, np.newaxis]
+        for _ in range(300):
+            p1 = rng.uniform(-1, [31, 21])
+            p2 = p1 + rng.uniform(-6, 6, size=2)
+            pts = p1 + ts * (p2 - p1)
+            pts_free = all(cc.feasible(p, save_stats=False) for p in pts)
+            # edges are undirected
+            self.assertEqual(cc.visible(p1, p2), cc.visible(p2, p1))
+            if cc.visible(p1, p2):
+                self.assertTrue(pts_free)
+            elif pts_free:
+                # the edge can only be rejected if it touches an obstacle
+                self.assertTrue(cc.bvh.intersects(*p1, *p2))
+
+
+class TestSegmentBVH(TestCase):
+    def test_intersects(self):
+        rng = np.random.default_rng(0)
+        segments = rng.uniform(0, 100, size=(200, 2))
+        segments = np.concatenate(
+            [segments, segments + rng.uniform(-5, 5, size=(200, 2))], axis=1
+        )
+        # include axis-aligned and degenerate segments
+        segments[:20, 2] = segments[:20, 0]
+        segments[20:40, 3] = segments[20:40, 1]
+        segments[40:45, 2:] = segments[40:45, :2]
+        bvh = SegmentBVH(segments, leaf_size=3)
+        for query in rng.uniform(0, 100, size=(300, 4)):
+            self.assertEqual(
+                bvh.intersects(*query),
+                any(segments_intersect(*query, *s) for s in segments),
+            )
+        for query in segments[::7]:
+            self.assertTrue(bvh.intersects(*query))
+
+    def test_intersecting(self):
+        segments = np.array([[0, 0, 2, 0], [2, 0, 2, 2], [0, 2, 0, 3]], float)
+        bvh = SegmentBVH(segments, leaf_size=1)
+        self.assertEqual(
+            sorted(bvh.intersecting(1, -1, 3, 1)), [(0, 0, 2, 0), (2, 0, 2, 2)]
+        )
+        self.assertEqual(bvh.intersecting(0, 1, 0, 1.5), [])
+
+    def test_within_distance(self):
+        rng = np.random.default_rng(0)
+        segments = rng.uniform(0, 100, size=(100, 4))
+        bvh = SegmentBVH(segments, leaf_size=3)
+        for query in rng.uniform(0, 100, size=(200, 4)):
+            distance = min(segments_distance(*query, *s) for s in segments)
+            self.assertTrue(bvh.within_distance(*query, distance + 1e-9))
+            if distance > 0:
+                self.assertFalse(bvh.within_distance(*query, distance * 0.99))
+
+    def test_segments_distance(self):
+        self.assertEqual(segments_distance(0, 0, 2, 2, 0, 2, 2, 0), 0)
+        self.assertAlmostEqual(segments_distance(0, 0, 1, 0, 0, 1, 1, 2), 1)
+        self.assertAlmostEqual(segments_distance(0, 0, 0, 0, 3, 4, 3, 4), 5)
+        self.assertAlmostEqual(segments_distance(0, 0, 2, 0, 1, 1, 3, 3), 1)
+
+    def test_empty(self):
+        self.assertFalse(SegmentBVH(np.empty((0, 4))).intersects(0, 0, 1, 1))
+
+    def test_segments_intersect(self):
+        self.assertTrue(segments_intersect(0, 0, 2, 2, 0, 2, 2, 0))
+        self.assertFalse(segments_intersect(0, 0, 1, 1, 0, 2, 2, 2))
+        # touching at an end
+        self.assertTrue(segments_intersect(0, 0, 1, 1, 1, 1, 2, 0))
+        # collinear
+        self.assertTrue(segments_intersect(0, 0, 2, 0, 1, 0, 3, 0))
+        self.assertFalse(segments_intersect(0, 0, 1, 0, 2, 0, 3, 0))
+        self.assertTrue(segments_intersect(1, 1, 1, 1, 0, 0, 2, 2))
+        self.assertFalse(segments_intersect(1, 1.5, 1, 1.5, 0, 0, 2, 2))
@@ -6,7 +6,7 @@ import numpy as np
 import visualiser
 from env import Env
 from samplers.prmSampler import PRMSampler
-from tests.common_vars import template_args, MockNumpyEquality
+from tests.common_vars import template_args, MockNumpyEquality, use_looped_visible_many
 from tests.test_rrtPlanner import TestRRTPlanner
 from utils import planner_registry
 
@@ -31,6 +31,7 @@ class PRMPlanner(TestRRTPlanner):
         # make it always be visible for testing
         self.planner.args.env.cc.feasible = MagicMock(return_value=True)
         self.planner.args.env.cc.visible = MagicMock(return_value=True)
+        use_looped_visible_many(self.planner.args.env.cc)
 
     def test_run_once_success(self):
         # PRM won't knows whether the sampled point is connectable or not before
@@ -0,0 +1,73 @@
+import functools
+from unittest import TestCase
+
+import numpy as np
+
+from collisionChecker import ImgCollisionChecker, ProcessPoolCollisionChecker
+from utils.common import Stats, MagicDict
+
+
+class TestProcessPoolCollisionChecker(TestCase):
+    @classmethod
+    def setUpClass(cls) -> None:
+        factory = functools.partial(
+            ImgCollisionChecker, "maps/room1.png", Stats(), MagicDict()
+        )
+        cls.inner_cc = factory()
+        # the workers are slow to start, hence they are shared by all tests
+        cls.cc = ProcessPoolCollisionChecker(
+            cls.inner_cc, factory, num_workers=2, min_batch_size=4
+        )
+
+    @classmethod
+    def tearDownClass(cls) -> None:
+        cls.cc.close()
+
+    def setUp(self) -> None:
+        self.inner_cc.stats = self.cc.stats = Stats()
+        self.ref_cc = ImgCollisionChecker(
+            "maps/room1.png", stats=Stats(), args=MagicDict()
+        )
+        self.rng = np.random.default_rng(0)
+
+    def test_invalid_num_workers(self):
+        with self.assertRaises(ValueError):
+            ProcessPoolCollisionChecker(self.inner_cc, None, num_workers=0)
+
+    def test_pass_through(self):
+        self.assertIs(self.cc.unwrapped, self.inner_cc)
+        self.assertEqual(self.cc.get_image_shape(), self.inner_cc.get_image_shape())
+        self.assertEqual(
+            self.cc.visible((100, 100), (120, 130)),
+            self.ref_cc.visible((100, 100), (120, 130)),
+        )
+        self.assertEqual(self.cc.stats.visible_cnt, 1)
+
+    def test_visible_many(self):
+        origin = np.array([100.0, 100.0])
+        targets = self.rng.uniform(0, 430, (101, 2))
+        self.assertEqual(
+            self.cc.visible_many(origin, targets).tolist(),
+            self.ref_cc.visible_many(origin, targets).tolist(),
+        )
+        self.assertEqual(self.cc.stats.visible_cnt, len(targets))
+        # the counts of the workers are sent back to the main process
+        self.assertGreater(self.cc.stats.clearance_accept_cnt, 0)
+        self.assertEqual(
+            self.cc.stats.clearance_accept_cnt, self.ref_cc.stats.clearance_accept_cnt
+        )
+        # small batches are checked in the main process
+        self.assertEqual(
+            self.cc.visible_many(origin, targets[:3]).tolist(),
+            self.ref_cc.visible_many(origin, targets[:3]).tolist(),
+        )
+        self.assertEqual(self.cc.visible_many(origin, targets[:0]).tolist(), [])
+        self.assertEqual(self.cc.stats.visible_cnt, len(targets) + 3)
+
+    def test_feasible_many(self):
+        configs = self.rng.uniform(-10, 440, (57, 2))
+        self.assertEqual(
+            self.cc.feasible_many(configs).tolist(),
+            self.ref_cc.feasible_many(configs).tolist(),
+        )
+        self.assertEqual(self.cc.stats.feasible_cnt, len(configs))
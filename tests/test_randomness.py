@@ -33,7 +33,7 @@ class TestRandomnessManager(TestCase):
                     num_dim, bucket_size=10 if method != "fast" else 10000
                 )
                 for i in range(10):
-                    randomness.get_random(method)
+                    self.assertEqual(len(randomness.get_random(method)), num_dim)
 
     def test_redraw(self):
         # test drawing more than NUM_DATA_POINTS to see if it will automatically refill
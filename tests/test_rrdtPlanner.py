@@ -8,7 +8,7 @@ from tqdm import tqdm
 import visualiser
 from env import Env
 from planners.rrdtPlanner import RRdTSampler
-from tests.common_vars import template_args, MockNumpyEquality
+from tests.common_vars import template_args, MockNumpyEquality, use_looped_visible_many
 from tests.test_rrtPlanner import TestRRTPlanner
 from utils import planner_registry
 
@@ -36,6 +36,7 @@ class TestRRdTPlanner(TestRRTPlanner):
         # make it always be visible for testing
         self.planner.args.env.cc.feasible = MagicMock(return_value=True)
         self.planner.args.env.cc.visible = MagicMock(return_value=True)
+        use_looped_visible_many(self.planner.args.env.cc)
 
     @staticmethod
     def flush_rrdt_sampler_pending_restarts(sampler):
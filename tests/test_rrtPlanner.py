@@ -7,8 +7,8 @@ import numpy as np
 import visualiser
 from env import Env
 from samplers.randomPolicySampler import RandomPolicySampler
-from tests.common_vars import template_args, MockNumpyEquality
-from utils import planner_registry
+from tests.common_vars import template_args, MockNumpyEquality, use_looped_visible_many
+from utils import nn_index, planner_registry
 from utils.common import Node
 
 
@@ -31,6 +31,7 @@ class TestRRTPlanner(TestCase):
         # make it always be visible for testing
         self.planner.args.env.cc.feasible = MagicMock(return_value=True)
         self.planner.args.env.cc.visible = MagicMock(return_value=True)
+        use_looped_visible_many(self.planner.args.env.cc)
 
     def test_add_newnode(self):
         # repeat the testing multiple times
@@ -46,6 +47,28 @@ class TestRRTPlanner(TestCase):
             )
             # assert that the added node is correct
             self.assertEqual(self.planner.nodes[-1], node)
+            # assert that the node is indexed
+            self.assertEqual(len(self.planner.nn_index), len(self.planner.nodes))
+            self.assertEqual(
+                self.planner.nn_index.nearest(node.pos), len(self.planner.nodes) - 1
+            )
+
+    def test_create_nn_index(self):
+        # the grid index is chosen automatically for the image engine
+        index = self.planner.create_nn_index()
+        self.assertIsInstance(index, nn_index.GridIndex)
+        self.assertEqual(index.cell_size, self.planner.args.radius)
+        self.assertEqual(len(index), 0)
+
+        self.planner.args.nn_index = "rtree"
+        self.assertIsInstance(self.planner.create_nn_index(), nn_index.RTreeIndex)
+
+        self.planner.args.nn_index = "rpforest"
+        self.planner.args.rpforest_trees = 3
+        index = self.planner.create_nn_index()
+        self.assertIsInstance(index, nn_index.RPForestIndex)
+        self.assertEqual(index.num_trees, 3)
+        self.assertEqual(index.leaf_size, nn_index.RPFOREST_LEAF_SIZE)
 
     def test_run_once_success(self):
         pos1 = np.array([101, 102])
@@ -0,0 +1,151 @@
+import os
+import tempfile
+from unittest import TestCase
+
+import numpy as np
+
+from collisionChecker import (
+    ImgCollisionChecker,
+    RobotArm4dCollisionChecker,
+    load_occupancy_image,
+    load_occupancy_map,
+)
+from tests.common_vars import create_test_image
+from utils import tiled_map
+from utils.common import Stats, MagicDict
+
+
+class TestTiledMap(TestCase):
+    def setUp(self) -> None:
+        self._tmp_dir = tempfile.TemporaryDirectory()
+        self.path = os.path.join(self._tmp_dir.name, "map.tiles")
+
+    def tearDown(self) -> None:
+        self._tmp_dir.cleanup()
+
+    def test_save_and_load(self):
+        free = np.random.default_rng(0).uniform(size=(23, 37)) < 0.7
+        # tiles that are entirely free or blocked
+        free[:8, :8] = True
+        free[8:16, :8] = False
+        tiled_map.save_tiled_occupancy(free, self.path, tile_size=8)
+        self.assertTrue(tiled_map.is_tiled_map(self.path))
+        self.assertFalse(os.path.exists(os.path.join(self.path, "0_0.npy")))
+        self.assertFalse(os.path.exists(os.path.join(self.path, "1_0.npy")))
+
+        tiles = tiled_map.TiledOccupancy(self.path)
+        self.assertEqual(tiles.shape, free.shape)
+        # tiles are memory-mapped when they are first used
+        self.assertNotIn((2, 2), tiles._tiles)
+        self.assertEqual(tiles[20, 20], free[20, 20])
+        self.assertIsInstance(tiles._tiles[2, 2].base, np.memmap)
+        self.assertFalse(tiles._tiles[2, 2].flags.writeable)
+        self.assertTrue(np.array_equal(tiles.unpack(), free))
+        self.assertTrue(np.array_equal(np.asarray(tiles), free))
+
+        xs, ys = np.meshgrid(np.arange(-23, 23), np.arange(-37, 37), indexing="ij")
+        self.assertTrue(np.array_equal(tiles[xs, ys], free[xs, ys]))
+        # pixels within a single tile
+        xs, ys = np.array([16, 17, 18, 23]), np.array([17, 17, 18, 23])
+        self.assertTrue(np.array_equal(tiles[xs - 1, ys], free[xs - 1, ys]))
+        for x, y in ((0, 0), (-1, -1), (9, 3), (22, 36)):
+            self.assertEqual(tiles[x, y], free[x, y])
+        for x, y in ((23, 0), (0, 37), (-24, 0)):
+            with self.assertRaises(IndexError):
+                tiles[x, y]
+            with self.assertRaises(IndexError):
+                tiles[np.array([0, x]), np.array([0, y])]
+
+    def test_not_tiled_map(self):
+        self.assertFalse(tiled_map.is_tiled_map(self.path))
+        self.assertFalse(tiled_map.is_tiled_map(create_test_image()))
+        os.makedirs(self.path)
+        with open(os.path.join(self.path, tiled_map.HEADER_FILENAME), "w") as f:
+            f.write('{"format": "unknown"}')
+        with self.assertRaises(ValueError):
+            tiled_map.TiledOccupancy(self.path)
+
+    def test_convert_image(self):
+        tiled_map.convert_image(create_test_image(), self.path, tile_size=2)
+        self.assertTrue(
+            np.array_equal(
+                load_occupancy_map(self.path).unpack(),
+                load_occupancy_image(create_test_image()),
+            )
+        )
+
+    def test_convert_image_bands(self):
+        from PIL import Image
+
+        max_image_pixels = Image.MAX_IMAGE_PIXELS
+        tiled_map.convert_image("maps/room1.png", self.path, tile_size=64)
+        # the decompression bomb limit of PIL is only lifted for the conversion
+        self.assertEqual(Image.MAX_IMAGE_PIXELS, max_image_pixels)
+        self.assertTrue(
+            np.array_equal(
+                load_occupancy_map(self.path).unpack(),
+                load_occupancy_image("maps/room1.png"),
+            )
+        )
+
+    def test_convert_array(self):
+        from PIL import Image
+
+        pixels = np.asarray(Image.open("maps/room1.png").convert("L"))
+        expected = load_occupancy_image("maps/room1.png")
+        for array in (pixels, pixels == 255):
+            array_file = os.path.join(self._tmp_dir.name, "map.npy")
+            np.save(array_file, array)
+            tiled_map.convert_array(array_file, self.path, tile_size=64)
+            self.assertTrue(
+                np.array_equal(load_occupancy_map(self.path).unpack(), expected)
+            )
+        np.save(array_file, pixels[None])
+        with self.assertRaises(ValueError):
+            tiled_map.convert_array(array_file, self.path)
+
+    def test_collision_checkers(self):
+        tiled_map.convert_image("maps/room1.png", self.path, tile_size=64)
+        cc = ImgCollisionChecker(self.path, stats=Stats(), args=MagicDict())
+        ref_cc = ImgCollisionChecker(
+            "maps/room1.png", stats=Stats(), args=MagicDict(cc_accel="none")
+        )
+        self.assertEqual(cc._accel, ())
+        self.assertEqual(cc.get_image_shape(), ref_cc.get_image_shape())
+        self.assertTrue(np.array_equal(cc.image, ref_cc.image))
+
+        rng = np.random.default_rng(0)
+        edges = rng.uniform(-10, 510, size=(300, 2, 2))
+        self.assertEqual(
+            [cc.visible(*e) for e in edges], [ref_cc.visible(*e) for e in edges]
+        )
+        self.assertEqual(
+            cc.visible_many(edges[0, 0], edges[:, 1]).tolist(),
+            ref_cc.visible_many(edges[0, 0], edges[:, 1]).tolist(),
+        )
+        self.assertEqual(
+            [cc.feasible(p) for p in edges[:, 0]],
+            [ref_cc.feasible(p) for p in edges[:, 0]],
+        )
+
+        kwargs = dict(stick_robot_length_config=[12.3, 7.7], stats=Stats())
+        cc = RobotArm4dCollisionChecker(self.path, args=MagicDict(), **kwargs)
+        ref_cc = RobotArm4dCollisionChecker(
+            "maps/room1.png", args=MagicDict(cc_accel="none"), **kwargs
+        )
+        w, h = cc.get_image_shape()
+        configs = np.concatenate(
+            [rng.uniform(-2, [w + 2, h + 2], (300, 2)), rng.uniform(-4, 4, (300, 2))],
+            axis=1,
+        )
+        self.assertEqual(
+            [cc.feasible(p) for p in configs], [ref_cc.feasible(p) for p in configs]
+        )
+        self.assertEqual(
+            [cc.visible(a, b) for a, b in zip(configs[:-1], configs[1:])],
+            [ref_cc.visible(a, b) for a, b in zip(configs[:-1], configs[1:])],
+        )
+        with self.assertRaises(ValueError):
+            RobotArm4dCollisionChecker(
+                self.path, args=MagicDict(cspace_bins=8), **kwargs
+            )
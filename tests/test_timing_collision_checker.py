@@ -0,0 +1,103 @@
+import csv
+import os
+import tempfile
+from unittest import TestCase
+from unittest.mock import patch
+
+import numpy as np
+
+from collisionChecker import TimingCollisionChecker
+from tests.common_vars import CollisionCheckerWrapperTests
+from tests.test_image_space_collision_checker import pt
+from utils.common import LatencyHistograms
+
+
+class TestLatencyHistograms(TestCase):
+    def test_record(self):
+        histograms = LatencyHistograms()
+        histograms.record("feasible", "free", 1)
+        histograms.record("feasible", "free", 1500)
+        histograms.record("feasible", "free", 2047)
+        histograms.record("visible", "blocked", 0, length_bucket=3)
+        counts = histograms.counts[("feasible", "free", None)]
+        self.assertEqual(counts[1], 1)
+        self.assertEqual(counts[11], 2)
+        self.assertEqual(sum(counts), 3)
+        self.assertEqual(histograms.total_ns[("feasible", "free", None)], 3548)
+        self.assertEqual(histograms.counts[("visible", "blocked", 3)][0], 1)
+
+    def test_length_to_bucket(self):
+        self.assertEqual(LatencyHistograms.length_to_bucket(0.5), 0)
+        self.assertEqual(LatencyHistograms.length_to_bucket(np.nan), 0)
+        self.assertEqual(LatencyHistograms.length_to_bucket(1), 1)
+        self.assertEqual(LatencyHistograms.length_to_bucket(7.9), 3)
+        self.assertEqual(LatencyHistograms.length_to_bucket(8), 4)
+
+    def test_write_csv(self):
+        histograms = LatencyHistograms()
+        histograms.record("visible", "free", 100, length_bucket=2)
+        histograms.record("visible", "free", 120, length_bucket=2)
+        with tempfile.TemporaryDirectory() as tmp_dir:
+            fname = os.path.join(tmp_dir, "stats.latency.csv")
+            histograms.write_csv(fname)
+            with open(fname) as f:
+                rows = list(csv.DictReader(f))
+        self.assertEqual(len(rows), 2)
+        self.assertEqual(rows[0]["min_edge_length"], "2")
+        self.assertEqual(rows[0]["max_edge_length"], "4")
+        self.assertEqual(rows[0]["min_latency_ns"], "64")
+        self.assertEqual(rows[0]["max_latency_ns"], "128")
+        self.assertEqual(rows[0]["count"], "2")
+        self.assertEqual(rows[1]["total_latency_ns"], "220")
+
+
+class TestTimingCollisionChecker(CollisionCheckerWrapperTests, TestCase):
+    def wrap(self, cc):
+        self.assertIsNone(cc.stats.latency)
+        return TimingCollisionChecker(cc)
+
+    def count(self, method, outcome, length_bucket=None):
+        return sum(self.stats.latency.counts[(method, outcome, length_bucket)])
+
+    def test_visible(self):
+        self.assertTrue(self.cc.visible(pt(0.5, 2.5), pt(1.5, 3.5)))
+        self.assertFalse(self.cc.visible(pt(0.5, 2.5), pt(1.5, 5.5)))
+        self.assertEqual(self.count("visible", "free", 1), 1)
+        self.assertEqual(self.count("visible", "blocked", 2), 1)
+        self.assertEqual(self.stats.visible_cnt, 2)
+
+    def test_feasible(self):
+        self.assertTrue(self.cc.feasible((1.5, 0.5)))
+        self.assertFalse(self.cc.feasible((3.5, 0.5)))
+        self.assertEqual(self.count("feasible", "free"), 1)
+        self.assertEqual(self.count("feasible", "blocked"), 1)
+
+    def test_batches(self):
+        origin = pt(0.5, 2.5)
+        self.cc.visible_many(origin, np.array([[1.5, 3.5], [0.5, 3.5]]))
+        self.cc.visible_many(origin, np.array([[1.5, 3.5], [1.5, 5.5]]))
+        self.assertEqual(self.count("visible_many", "free"), 1)
+        self.assertEqual(self.count("visible_many", "blocked"), 1)
+        self.cc.feasible_many(np.array([[1.5, 0.5], [3.5, 0.5]]))
+        self.assertEqual(self.count("feasible_many", "blocked"), 1)
+
+    def test_latency_buckets(self):
+        # each check takes 2 ** (the number of calls to the clock) ns
+        clock = iter(np.cumsum([2 ** (i // 2) if i % 2 else 0 for i in range(20)]))
+        with patch("time.perf_counter_ns", side_effect=lambda: int(next(clock))):
+            self.assertTrue(self.cc.feasible((1.5, 0.5)))
+            self.assertFalse(self.cc.feasible((3.5, 0.5)))
+            self.assertFalse(self.cc.feasible((3.5, 1.5)))
+            self.assertTrue(self.cc.visible(pt(0.5, 0.5), pt(0.5, 3.5)))
+            self.assertFalse(self.cc.visible(pt(0.5, 0.5), pt(3.5, 0.5)))
+        counts = self.stats.latency.counts
+        # the free and the blocked checks are recorded apart, in their own buckets
+        self.assertEqual(counts[("feasible", "free", None)][1], 1)
+        self.assertEqual(counts[("feasible", "blocked", None)][2], 1)
+        self.assertEqual(counts[("feasible", "blocked", None)][3], 1)
+        self.assertEqual(self.stats.latency.total_ns[("feasible", "blocked", None)], 6)
+        # edges of length 3 are bucketed into [2, 4)
+        self.assertEqual(counts[("visible", "free", 2)][4], 1)
+        self.assertEqual(counts[("visible", "blocked", 2)][5], 1)
+        self.assertEqual(self.count("visible", "free", 2), 1)
+        self.assertEqual(self.count("visible", "blocked", 2), 1)
@@ -0,0 +1,89 @@
+import os
+import tempfile
+from unittest import TestCase
+
+import numpy as np
+
+from collisionChecker import VoxelCollisionChecker
+from utils.common import Stats, MagicDict
+
+
+class TestVoxelCollisionChecker(TestCase):
+    def setUp(self) -> None:
+        self._tmp_dir = tempfile.TemporaryDirectory()
+        self.fname = os.path.join(self._tmp_dir.name, "map.npy")
+        self.occupancy = np.zeros((10, 12, 14), dtype=np.uint8)
+        # a wall at x = 5 with a hole around (y, z) = (2, 3)
+        self.occupancy[5] = 1
+        self.occupancy[5, 2, 3] = 0
+        np.save(self.fname, self.occupancy)
+        self.cc = VoxelCollisionChecker(self.fname, stats=Stats(), args=MagicDict())
+
+    def tearDown(self) -> None:
+        del self.cc
+        self._tmp_dir.cleanup()
+
+    def test_shape(self):
+        self.assertEqual(self.cc.get_dimension(), 3)
+        self.assertEqual(self.cc.get_image_shape(), (10, 12, 14))
+        self.assertIsInstance(self.cc._occupancy, np.memmap)
+
+    def test_invalid_map(self):
+        np.save(self.fname, np.array(None))
+        with self.assertRaises(ValueError):
+            VoxelCollisionChecker(self.fname, stats=Stats(), args=MagicDict())
+
+    def test_feasible(self):
+        self.assertTrue(self.cc.feasible((0.5, 0.5, 0.5)))
+        self.assertTrue(self.cc.feasible((5.9, 2.1, 3.9)))
+        self.assertFalse(self.cc.feasible((5.5, 2.5, 4.5)))
+        # outside of the map
+        self.assertFalse(self.cc.feasible((-0.5, 0.5, 0.5)))
+        self.assertFalse(self.cc.feasible((0.5, 12.0, 0.5)))
+        self.assertFalse(self.cc.feasible((np.nan, 0.5, 0.5)))
+        self.assertEqual(self.cc.stats.feasible_cnt, 6)
+
+        configs = np.random.default_rng(0).uniform(-2, 16, size=(200, 3))
+        configs[0, 1] = np.inf
+        self.assertEqual(
+            self.cc.feasible_many(configs).tolist(),
+            [self.cc.feasible(p, save_stats=False) for p in configs],
+        )
+        self.assertEqual(self.cc.stats.feasible_cnt, 206)
+
+    def test_visible(self):
+        self.assertTrue(self.cc.visible((1.5, 1.5, 1.5), (4.5, 11.5, 13.5)))
+        self.assertFalse(self.cc.visible((1.5, 1.5, 1.5), (8.5, 1.5, 1.5)))
+        # through the hole of the wall
+        self.assertTrue(self.cc.visible((3.5, 2.5, 3.5), (7.5, 2.5, 3.5)))
+        self.assertTrue(self.cc.visible((3.5, 0.5, 1.5), (7.5, 4.5, 5.5)))
+        self.assertFalse(self.cc.visible((3.5, 0.5, 1.5), (7.5, 4.5, 7.5)))
+        # leaving the map
+        self.assertFalse(self.cc.visible((1.5, 1.5, 1.5), (1.5, 1.5, 20.5)))
+        self.assertFalse(self.cc.visible((1.5, 1.5, 1.5), (1.5, np.nan, 1.5)))
+        self.assertEqual(self.cc.stats.visible_cnt, 7)
+
+    def test_line_indices(self):
+        rng = np.random.default_rng(0)
+        for start, end in rng.integers(-20, 20, size=(100, 2, 3)):
+            voxels = VoxelCollisionChecker.get_line_indices(start, end)
+            self.assertTrue(np.array_equal(voxels[0], start))
+            self.assertTrue(np.array_equal(voxels[-1], end))
+            # consecutive voxels are adjacent, and each step moves along the major
+            # axis
+            steps = np.abs(np.diff(voxels, axis=0))
+            self.assertTrue((steps <= 1).all())
+            self.assertEqual(len(voxels), np.abs(end - start).max() + 1)
+
+    def test_visible_many(self):
+        rng = np.random.default_rng(0)
+        targets = rng.uniform(-2, 16, size=(300, 3))
+        targets[0, 2] = np.nan
+        for origin in ((3.5, 2.5, 3.5), (7.5, 6.5, 9.5), (-1.0, 0.5, 0.5)):
+            self.assertEqual(
+                self.cc.visible_many(np.array(origin), targets).tolist(),
+                [self.cc.visible(origin, t) for t in targets],
+            )
+        self.assertEqual(
+            self.cc.visible_many(np.zeros(3), np.empty((0, 3))).tolist(), []
+        )
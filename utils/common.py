@@ -1,5 +1,5 @@
 import logging
-from typing import List
+from typing import Dict, List
 
 import numpy as np
 from rtree import index
@@ -111,6 +111,96 @@ class Node:
         return hash(tuple(self.pos))
 
 
+class LatencyHistograms:
+    """Log-bucketed histograms of the latency of timed calls, one per kind of call
+    and outcome (and, for edges, the length of the edge). Bucket :math:`i` counts
+    the calls that took :math:`[2^{i-1}, 2^i)` nanoseconds, hence recording a call
+    only needs an integer ``bit_length``.
+
+    :ivar counts: the histogram of each key of (method, outcome, edge length
+        bucket), where the edge length bucket is ``None`` for calls that are not
+        about a single edge
+    :ivar total_ns: the total latency (in nanoseconds) of each key
+
+    :vartype counts: Dict[tuple, List[int]]
+    :vartype total_ns: Dict[tuple, int]
+    """
+
+    NUM_BUCKETS = 64
+
+    def __init__(self):
+        self.counts = {}
+        self.total_ns = {}
+
+    def record(self, method: str, outcome: str, ns: int, length_bucket=None):
+        """Record the latency of a call
+
+        :param method: the name of the method that is called
+        :param outcome: the outcome of the call, e.g., free or blocked
+        :param ns: the latency in nanoseconds
+        :param length_bucket: the bucket of the length of the edge, if applicable
+
+        """
+        key = (method, outcome, length_bucket)
+        counts = self.counts.get(key)
+        if counts is None:
+            counts = self.counts[key] = [0] * self.NUM_BUCKETS
+            self.total_ns[key] = 0
+        counts[min(ns.bit_length(), self.NUM_BUCKETS - 1)] += 1
+        self.total_ns[key] += ns
+
+    @staticmethod
+    def length_to_bucket(length: float) -> int:
+        """Get the bucket of an edge length, where bucket :math:`i` contains the
+        lengths within :math:`[2^{i-1}, 2^i)`, and bucket 0 contains lengths below 1
+
+        :param length: the length of an edge
+
+        """
+        if not length >= 1:
+            return 0
+        return min(int(length).bit_length(), LatencyHistograms.NUM_BUCKETS - 1)
+
+    def write_csv(self, fname: str):
+        """Write the non-empty buckets of all histograms as a csv file
+
+        :param fname: the filename of the csv file
+
+        """
+        import csv
+
+        def bucket_range(i):
+            return (0 if i == 0 else 2 ** (i - 1)), 2 ** i
+
+        with open(fname, "w", newline="") as f:
+            writer = csv.writer(f, quoting=csv.QUOTE_ALL)
+            writer.writerow(
+                [
+                    "method",
+                    "outcome",
+                    "min_edge_length",
+                    "max_edge_length",
+                    "min_latency_ns",
+                    "max_latency_ns",
+                    "count",
+                    "total_latency_ns",
+                ]
+            )
+            for key in sorted(self.counts, key=lambda k: (k[0], k[1], k[2] or 0)):
+                method, outcome, length_bucket = key
+                lengths = ("", "")
+                if length_bucket is not None:
+                    lengths = bucket_range(length_bucket)
+                for i, count in enumerate(self.counts[key]):
+                    if count > 0:
+                        writer.writerow(
+                            [method, outcome, *lengths, *bucket_range(i), count, ""]
+                        )
+                writer.writerow(
+                    [method, outcome, *lengths, "", "", "", self.total_ns[key]]
+                )
+
+
 class Stats:
     r"""
     Stores statistics of a planning problem instance
@@ -128,6 +218,25 @@ class Stats:
     :ivar sampler_fail: UNDOCUMENTED
     :ivar visible_cnt: the number of calls to visibility test in the collision checker
     :ivar feasible_cnt: the number of calls to feasibility test in the collision checker
+    :ivar clearance_accept_cnt: the number of line segments (edges, or the sticks of
+        the 4D robot arm) that the collision checker accepted directly from its
+        clearance map, without checking each pixel
+    :ivar box_accept_cnt: the number of line segments that the collision checker
+        accepted directly from its summed-area table, as their bounding boxes are
+        free of obstacles
+    :ivar edge_cache_hit_cnt: the number of visibility tests that are answered by
+        the edge cache
+    :ivar edge_cache_miss_cnt: the number of visibility tests that are not in the
+        edge cache, and hence are passed to the collision checker
+    :ivar edge_query_cnt: the number of configurations that are tested along edges
+        by the Klampt engine, which is an upper bound for the blocked edges of its
+        default edge checker
+    :ivar feasible_cache_hit_cnt: the number of feasibility tests that are answered
+        by the feasibility cache
+    :ivar feasible_cache_miss_cnt: the number of feasibility tests that are not in
+        the feasibility cache, and hence are passed to the collision checker
+    :ivar latency: the latency histograms of the collision checks, which is
+        ``None`` unless they are timed
 
     :type invalid_samples_connections: int
     :type invalid_samples_obstacles: int
@@ -139,6 +248,14 @@ class Stats:
     :type sampler_fail: int
     :type visible_cnt: int
     :type feasible_cnt: int
+    :type clearance_accept_cnt: int
+    :type box_accept_cnt: int
+    :type edge_cache_hit_cnt: int
+    :type edge_cache_miss_cnt: int
+    :type edge_query_cnt: int
+    :type feasible_cache_hit_cnt: int
+    :type feasible_cache_miss_cnt: int
+    :type latency: :class:`LatencyHistograms`
     """
 
     def __init__(self, showSampledPoint=True):
@@ -152,6 +269,24 @@ class Stats:
         self.sampler_fail = 0
         self.visible_cnt = 0
         self.feasible_cnt = 0
+        self.clearance_accept_cnt = 0
+        self.box_accept_cnt = 0
+        self.edge_cache_hit_cnt = 0
+        self.edge_cache_miss_cnt = 0
+        self.edge_query_cnt = 0
+        self.feasible_cache_hit_cnt = 0
+        self.feasible_cache_miss_cnt = 0
+        self.latency = None
+
+    @property
+    def feasible_cache_hit_rate(self) -> float:
+        """The fraction of feasibility tests that are answered by the feasibility
+        cache, which is zero before any test
+
+        :return: the hit rate of the feasibility cache
+        """
+        total = self.feasible_cache_hit_cnt + self.feasible_cache_miss_cnt
+        return self.feasible_cache_hit_cnt / total if total > 0 else 0.0
 
     def add_invalid(self, obs):
         """
@@ -170,6 +305,26 @@ class Stats:
         """
         self.valid_sample += 1
 
+    def counts(self) -> Dict[str, int]:
+        """Get the counters of the stats, e.g. to send the counts of a collision
+        checker in another process back to the main one
+
+        :return: the value of each counter
+        """
+        return {
+            attr: value
+            for attr, value in vars(self).items()
+            if isinstance(value, int) and not isinstance(value, bool)
+        }
+
+    def add_counts(self, counts: Dict[str, int]):
+        """Add counts (e.g. from :meth:`counts`) to the counters of the stats
+
+        :param counts: the count to add to each counter
+        """
+        for attr, count in counts.items():
+            setattr(self, attr, getattr(self, attr) + count)
+
     def add_sampled_node(self, pos: np.ndarray):
         """Add a sampled node position
 
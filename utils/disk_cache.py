@@ -0,0 +1,128 @@
+import hashlib
+import json
+import logging
+import os
+import zipfile
+import zlib
+from typing import Callable, Dict, Optional
+
+import numpy as np
+
+LOGGER = logging.getLogger(__name__)
+
+DEFAULT_CACHE_DIR = "~/.cache/sbp-env"
+
+
+def hash_array(array: np.ndarray) -> str:
+    """Return a digest of the content, shape and type of the given array, which is
+    stable across runs.
+
+    :param array: the array to hash
+    """
+    array = np.ascontiguousarray(array)
+    h = hashlib.sha1()
+    h.update(str((array.shape, array.dtype.str)).encode())
+    h.update(array.tobytes())
+    return h.hexdigest()
+
+
+def get_cache_filename(cache_dir: Optional[str], name: str, key: Dict) -> str:
+    """Return the filename of a cached entry.
+
+    :param cache_dir: the folder that stores the cache, defaults to
+        :data:`DEFAULT_CACHE_DIR` if it is ``None``
+    :param name: the kind of the cached entry, used as the filename prefix
+    :param key: a json serialisable dictionary that identifies the entry
+    """
+    if cache_dir is None:
+        cache_dir = DEFAULT_CACHE_DIR
+    digest = hashlib.sha1(json.dumps(key, sort_keys=True).encode()).hexdigest()
+    return os.path.join(os.path.expanduser(cache_dir), f"{name}-{digest}.npz")
+
+
+def hash_file(fname: str) -> str:
+    """Return a digest of the content of the given file
+
+    :param fname: the file to hash
+    """
+    h = hashlib.sha1()
+    with open(fname, "rb") as f:
+        for chunk in iter(lambda: f.read(1 << 20), b""):
+            h.update(chunk)
+    return h.hexdigest()
+
+
+def load(
+    cache_dir: Optional[str], name: str, key: Dict
+) -> Optional[Dict[str, np.ndarray]]:
+    """Load a dictionary of arrays from the disk cache.
+
+    :param cache_dir: the folder that stores the cache, defaults to
+        :data:`DEFAULT_CACHE_DIR` if it is ``None``
+    :param name: the kind of the cached entry, used as the filename prefix
+    :param key: a json serialisable dictionary that identifies the entry
+
+    :return: the dictionary of arrays, or ``None`` if it is not cached
+    """
+    fname = get_cache_filename(cache_dir, name, key)
+    if os.path.exists(fname):
+        try:
+            with np.load(fname) as data:
+                LOGGER.info(f"Loaded cached {name} from '{fname}'")
+                return dict(data)
+        # a truncated or partly written file fails as a zip archive, and its
+        # arrays are only decompressed by dict()
+        except (
+            OSError,
+            ValueError,
+            EOFError,
+            KeyError,
+            zipfile.BadZipFile,
+            zlib.error,
+        ) as e:
+            LOGGER.warning(f"Ignoring corrupted cache '{fname}': {e}")
+    return None
+
+
+def save(cache_dir: Optional[str], name: str, key: Dict, arrays: Dict[str, np.ndarray]):
+    """Save a dictionary of arrays to the disk cache, replacing any existing entry.
+
+    :param cache_dir: the folder that stores the cache, defaults to
+        :data:`DEFAULT_CACHE_DIR` if it is ``None``
+    :param name: the kind of the cached entry, used as the filename prefix
+    :param key: a json serialisable dictionary that identifies the entry
+    :param arrays: the dictionary of arrays to save
+    """
+    fname = get_cache_filename(cache_dir, name, key)
+    os.makedirs(os.path.dirname(fname), exist_ok=True)
+    # write to a temporary file first, such that concurrent runs never see a
+    # partially written cache
+    tmp_fname = f"{fname}.{os.getpid()}.tmp"
+    with open(tmp_fname, "wb") as f:
+        np.savez_compressed(f, **arrays)
+    os.replace(tmp_fname, fname)
+    LOGGER.info(f"Saved {name} to cache '{fname}'")
+
+
+def load_or_build(
+    cache_dir: Optional[str],
+    name: str,
+    key: Dict,
+    build: Callable[[], Dict[str, np.ndarray]],
+) -> Dict[str, np.ndarray]:
+    """Load a dictionary of arrays from the disk cache, or build and save it if it
+    is not cached yet.
+
+    :param cache_dir: the folder that stores the cache, defaults to
+        :data:`DEFAULT_CACHE_DIR` if it is ``None``
+    :param name: the kind of the cached entry, used as the filename prefix
+    :param key: a json serialisable dictionary that identifies the entry
+    :param build: the function that builds the arrays on a cache miss
+
+    :return: the dictionary of arrays
+    """
+    arrays = load(cache_dir, name, key)
+    if arrays is None:
+        arrays = build()
+        save(cache_dir, name, key, arrays)
+    return arrays
@@ -0,0 +1,867 @@
+"""Incremental nearest neighbour indices of the configurations of a tree.
+
+The planners add the configuration of each new node to an index, which identifies
+it by its insertion order (i.e. the position of the node within the list of nodes of
+the tree), and query the index for the nearest node or the neighbourhood of a
+configuration instead of computing the distances to all nodes.
+
+The metric is the Euclidean distance over all dimensions of the configurations. For
+the engines whose configurations are angles (see :data:`ENGINE_PERIODS`), each
+dimension wraps around, i.e. the configurations lie on a torus.
+"""
+import functools
+import itertools
+import math
+import operator
+import typing
+from abc import ABC, abstractmethod
+
+import numpy as np
+from rtree import index as rtree_index
+from scipy import spatial
+
+# the number of most recently added configurations that the k-d tree index checks
+# by brute force, before they are built into a static tree
+KDTREE_BUFFER_SIZE = 64
+# a new tree of the k-d tree index is merged with the tree before it, unless that
+# one is this many times larger. The overhead of querying a tree is much larger
+# than the cost of rebuilding trees, hence the trees are merged eagerly.
+KDTREE_MERGE_RATIO = 8
+# the relative tolerance of the bounds of the rings of cells that the grid index has
+# searched, such that a configuration is never missed due to rounding errors
+GRID_TOLERANCE = 1e-9
+# the default number of trees of the random projection forest index, more trees
+# find the nearest configuration more often but take longer to query
+RPFOREST_NUM_TREES = 4
+# the default number of configurations within each leaf of the random projection
+# trees, larger leaves find the nearest configuration more often but take longer to
+# query
+RPFOREST_LEAF_SIZE = 32
+# a random projection forest of at most this many configurations has no trees, and
+# is checked exactly instead, which is cheaper than descending the trees
+RPFOREST_EXACT_SIZE = 1024
+#: the period of each dimension of the configurations of the engines whose metric
+#: wraps around, i.e. :meth:`env.Env.radian_dist`
+ENGINE_PERIODS = {"klampt": 2 * np.pi}
+
+
+def distances(
+    poses: np.ndarray, pos: np.ndarray, period: typing.Optional[float] = None
+) -> np.ndarray:
+    """Compute the distances from a configuration to each of the given ones
+
+    :param poses: the configurations, one per row
+    :param pos: the configuration to compute the distances from
+    :param period: the period of each dimension if it wraps around, or ``None`` for
+        the plain Euclidean distance
+
+    :return: the distance to each configuration
+    """
+    diff = np.asarray(poses, dtype=float) - pos
+    if period is not None:
+        # the shorter way around of each dimension
+        diff = np.abs(diff) % period
+        diff = np.minimum(diff, period - diff)
+    # much cheaper than np.linalg.norm for few configurations
+    return np.sqrt(np.einsum("ij,ij->i", diff, diff))
+
+
+def wrap(poses: np.ndarray, period: float) -> np.ndarray:
+    """Wrap configurations into :math:`[0, period)` in each dimension
+
+    :param poses: the configurations to wrap
+    :param period: the period of each dimension
+
+    """
+    wrapped = np.mod(poses, period)
+    # a tiny negative value is rounded up to the period
+    return np.where(wrapped < period, wrapped, 0.0)
+
+
+class NearestNeighbourIndex(ABC):
+    """An incremental index of configurations under the Euclidean metric, which
+    identifies each configuration by the order that it was added in.
+
+    :param num_dim: the number of dimensions of the configurations
+    :param period: the period of each dimension if the metric wraps around (only if
+        :attr:`supports_period`), or ``None`` for the plain Euclidean metric
+    """
+
+    #: whether the index supports a metric that wraps around
+    supports_period = False
+
+    def __init__(self, num_dim: int, period: typing.Optional[float] = None):
+        if period is not None and not self.supports_period:
+            raise ValueError(
+                f"{type(self).__name__} does not support a metric that wraps around"
+            )
+        self.num_dim = num_dim
+        self.period = period
+        self._poses = np.empty((16, num_dim))
+        self._size = 0
+
+    def __len__(self):
+        return self._size
+
+    @property
+    def poses(self) -> np.ndarray:
+        """The configurations in the index, in the order that they were added"""
+        return self._poses[: self._size]
+
+    def add(self, pos: np.ndarray):
+        """Add a configuration to the index, whose index is the current size
+
+        :param pos: the configuration to add
+        """
+        self.add_many(np.asarray(pos)[np.newaxis])
+
+    def add_many(self, poses: np.ndarray):
+        """Add a batch of configurations to the index, in their given order
+
+        :param poses: the configurations to add, one per row
+        """
+        poses = np.asarray(poses, dtype=float).reshape(-1, self.num_dim)
+        size = self._size + len(poses)
+        if size > len(self._poses):
+            # grow geometrically, such that adding is amortised constant time
+            grown = np.empty((max(size, 2 * len(self._poses)), self.num_dim))
+            grown[: self._size] = self.poses
+            self._poses = grown
+        self._poses[self._size : size] = poses
+        self._size = size
+        self._added(len(poses))
+
+    def _added(self, num_added: int):
+        """Called after configurations are added, to update the index
+
+        :param num_added: the number of configurations that were added
+        """
+        pass
+
+    def distances(self, indices: np.ndarray, pos: np.ndarray) -> np.ndarray:
+        """Compute the distances from a configuration to the indexed ones, under the
+        metric of the index
+
+        :param indices: the indices of the configurations
+        :param pos: the configuration to compute the distances from
+
+        :return: the distance to each of the configurations
+        """
+        return distances(self._poses[indices], pos, self.period)
+
+    @abstractmethod
+    def nearest(self, pos: np.ndarray) -> int:
+        """Find the nearest configuration
+
+        :param pos: the configuration to query
+
+        :return: the index of the nearest configuration
+        """
+        raise NotImplementedError()
+
+    @abstractmethod
+    def knn(self, pos: np.ndarray, k: int) -> np.ndarray:
+        """Find the ``k`` nearest configurations
+
+        :param pos: the configuration to query
+        :param k: the number of configurations to find
+
+        :return: the indices of the (up to) ``k`` nearest configurations, from the
+            nearest to the farthest
+        """
+        raise NotImplementedError()
+
+    @abstractmethod
+    def within_radius(self, pos: np.ndarray, radius: float) -> np.ndarray:
+        """Find the configurations within a radius (inclusive)
+
+        :param pos: the configuration to query
+        :param radius: the radius of the neighbourhood
+
+        :return: the indices of the configurations within the radius, in the order
+            that they were added
+        """
+        raise NotImplementedError()
+
+    def nearest_within_radius(
+        self, pos: np.ndarray, radius: float
+    ) -> typing.Optional[int]:
+        """Find the nearest configuration within a radius (inclusive), which is much
+        cheaper than :meth:`nearest` for an index that is far away from the given
+        configuration.
+
+        :param pos: the configuration to query
+        :param radius: the radius of the neighbourhood
+
+        :return: the index of the nearest configuration, or ``None`` if there is
+            none within the radius
+        """
+        candidates = self.within_radius(pos, radius)
+        if len(candidates) == 0:
+            return None
+        return int(candidates[np.argmin(self.distances(candidates, pos))])
+
+
+class BruteForceIndex(NearestNeighbourIndex):
+    """Computes the distances to all configurations for each query, which takes
+    linear time.
+    """
+
+    supports_period = True
+
+    def _distances(self, pos: np.ndarray) -> np.ndarray:
+        return distances(self.poses, pos, self.period)
+
+    def nearest(self, pos):
+        return int(np.argmin(self._distances(pos)))
+
+    def knn(self, pos, k):
+        distances = self._distances(pos)
+        if k < len(distances):
+            candidates = np.argpartition(distances, k - 1)[:k]
+        else:
+            candidates = np.arange(len(distances))
+        return candidates[np.argsort(distances[candidates], kind="stable")]
+
+    def within_radius(self, pos, radius):
+        return np.flatnonzero(self._distances(pos) <= radius)
+
+
+class KDTreeIndex(NearestNeighbourIndex):
+    """A forest of static k-d trees, which are rebuilt in geometric batches (i.e.
+    the logarithmic method). The most recently added configurations are kept in a
+    small buffer that is checked by brute force. Once the buffer is full, it is built
+    into a tree, and it is merged with the trees that are less than
+    :data:`KDTREE_MERGE_RATIO` times larger. Hence, each configuration is rebuilt
+    into a tree :math:`O(\\log n)` times, and a query visits :math:`O(\\log n)`
+    trees.
+
+    Each tree covers a contiguous range of the configurations, since it is always
+    merged with the tree that was built right before it. For a metric that wraps
+    around, the trees are built over the wrapped configurations with periodic
+    boundaries.
+
+    :param num_dim: the number of dimensions of the configurations
+    :param buffer_size: the number of configurations that are kept in the buffer
+    :param period: the period of each dimension if the metric wraps around
+    """
+
+    supports_period = True
+
+    def __init__(
+        self,
+        num_dim: int,
+        buffer_size: int = KDTREE_BUFFER_SIZE,
+        period: typing.Optional[float] = None,
+    ):
+        super().__init__(num_dim, period)
+        self.buffer_size = buffer_size
+        # the static trees and the index of the first configuration of each, from
+        # the largest (oldest) to the smallest
+        self._trees: typing.List[typing.Tuple[spatial.cKDTree, int]] = []
+        # the index of the first configuration that is not in any tree
+        self._buffer_start = 0
+
+    def _added(self, num_added):
+        if self._size - self._buffer_start < self.buffer_size:
+            return
+        start = self._buffer_start
+        # merge with the trees that are not much larger than the new one
+        while (
+            self._trees
+            and (self._size - start) * KDTREE_MERGE_RATIO >= start - self._trees[-1][1]
+        ):
+            start = self._trees.pop()[1]
+        self._trees.append((self._build(start, self._size), start))
+        self._buffer_start = self._size
+
+    def _build(self, start: int, end: int) -> spatial.cKDTree:
+        """Build a static tree of the given range of configurations
+
+        :param start: the index of the first configuration
+        :param end: the index after the last configuration
+
+        """
+        return spatial.cKDTree(
+            self._tree_pos(self._poses[start:end]),
+            balanced_tree=False,
+            boxsize=self.period,
+        )
+
+    def _tree_pos(self, pos: np.ndarray) -> np.ndarray:
+        """Return the given configuration in the coordinates of the trees
+
+        :param pos: the configuration
+
+        """
+        if self.period is None:
+            return pos
+        return wrap(pos, self.period)
+
+    def _buffer_distances(self, pos: np.ndarray) -> np.ndarray:
+        return distances(self._poses[self._buffer_start : self._size], pos, self.period)
+
+    def nearest(self, pos):
+        best, best_distance = -1, np.inf
+        tree_pos = self._tree_pos(pos)
+        if self._trees:
+            tree, start = self._trees[0]
+            best_distance, best = tree.query(tree_pos)
+            best += start
+        buffer_distances = self._buffer_distances(pos)
+        if len(buffer_distances):
+            i = int(np.argmin(buffer_distances))
+            if buffer_distances[i] < best_distance:
+                best, best_distance = self._buffer_start + i, buffer_distances[i]
+        for tree, start in self._trees[1:]:
+            # Only look for configurations that are closer than the best one so far,
+            # which are usually none. This is much cheaper than a nearest query.
+            candidates = tree.query_ball_point(tree_pos, best_distance)
+            if candidates:
+                candidates = start + np.asarray(candidates)
+                candidate_distances = self.distances(candidates, pos)
+                i = int(np.argmin(candidate_distances))
+                if candidate_distances[i] < best_distance:
+                    best, best_distance = candidates[i], candidate_distances[i]
+        if best < 0:
+            raise ValueError("The index is empty")
+        return int(best)
+
+    def knn(self, pos, k):
+        tree_pos = self._tree_pos(pos)
+        indices = [np.arange(self._buffer_start, self._size)]
+        all_distances = [self._buffer_distances(pos)]
+        for tree, start in self._trees:
+            distance, i = tree.query(tree_pos, k=min(k, tree.n))
+            indices.append(start + np.atleast_1d(i))
+            all_distances.append(np.atleast_1d(distance))
+        indices, all_distances = np.concatenate(indices), np.concatenate(all_distances)
+        return indices[np.argsort(all_distances, kind="stable")[:k]]
+
+    def within_radius(self, pos, radius):
+        tree_pos = self._tree_pos(pos)
+        buffer_distances = self._buffer_distances(pos)
+        indices = [self._buffer_start + np.flatnonzero(buffer_distances <= radius)]
+        for tree, start in self._trees:
+            indices.append(
+                start + np.asarray(tree.query_ball_point(tree_pos, radius), int)
+            )
+        return np.sort(np.concatenate(indices))
+
+
+class RTreeIndex(NearestNeighbourIndex):
+    """An R-tree of the configurations, where each configuration is stored as a
+    point with its index as the id. The configurations are inserted one by one,
+    except for a batch that is at least as large as the existing configurations
+    (e.g. when a smaller tree is merged into this one), where the whole R-tree is
+    bulk loaded again instead, which is much faster and gives a better packed tree.
+
+    :param num_dim: the number of dimensions of the configurations
+    """
+
+    def __init__(self, num_dim: int):
+        super().__init__(num_dim)
+        self._properties = rtree_index.Property()
+        self._properties.dimension = num_dim
+        self._rtree = rtree_index.Index(interleaved=True, properties=self._properties)
+
+    @staticmethod
+    def _point(pos: np.ndarray) -> np.ndarray:
+        return np.concatenate([pos, pos])
+
+    def _added(self, num_added):
+        start = self._size - num_added
+        if num_added > 1 and num_added >= start:
+            self._rtree = rtree_index.Index(
+                ((i, self._point(pos), None) for i, pos in enumerate(self.poses)),
+                interleaved=True,
+                properties=self._properties,
+            )
+        else:
+            for i in range(start, self._size):
+                self._rtree.insert(i, self._point(self._poses[i]))
+
+    def _sorted_by_distance(self, pos: np.ndarray, candidates) -> np.ndarray:
+        """Sort the candidates by their distances, where ties are broken by the
+        order that they were added in
+
+        :param pos: the configuration to query
+        :param candidates: the indices of the candidates
+
+        """
+        candidates = np.sort(np.fromiter(candidates, int))
+        return candidates[np.argsort(self.distances(candidates, pos), kind="stable")]
+
+    def nearest(self, pos):
+        if self._size == 0:
+            raise ValueError("The index is empty")
+        # all of the configurations with the same least distance are returned
+        return int(
+            self._sorted_by_distance(pos, self._rtree.nearest(self._point(pos), 1))[0]
+        )
+
+    def knn(self, pos, k):
+        if self._size == 0 or k < 1:
+            return np.empty(0, dtype=int)
+        candidates = self._rtree.nearest(self._point(pos), k)
+        return self._sorted_by_distance(pos, candidates)[:k]
+
+    def within_radius(self, pos, radius):
+        pos = np.asarray(pos, dtype=float)
+        # the configurations within the bounding box of the ball
+        candidates = np.fromiter(
+            self._rtree.intersection(np.concatenate([pos - radius, pos + radius])), int
+        )
+        return np.sort(candidates[self.distances(candidates, pos) <= radius])
+
+
+@functools.lru_cache(maxsize=None)
+def _ring_offsets(num_dim: int, ring: int) -> typing.Tuple[typing.Tuple[int, ...]]:
+    """Return the offsets of the cells that are exactly ``ring`` cells away (in the
+    Chebyshev distance) from a cell
+
+    :param num_dim: the number of dimensions of the grid
+    :param ring: the Chebyshev distance of the cells
+
+    """
+    return tuple(
+        offset
+        for offset in itertools.product(range(-ring, ring + 1), repeat=num_dim)
+        if max(map(abs, offset), default=0) == ring
+    )
+
+
+class RandomProjectionForest:
+    """A static forest of random projection trees, with the query interface of
+    :class:`scipy.spatial.cKDTree` that :class:`KDTreeIndex` uses.
+
+    Each tree splits the configurations in halves at the median of their
+    projections onto a random unit direction, with one direction per level, until
+    the leaves have fewer than twice ``leaf_size`` configurations. The nearest
+    neighbours are approximated by only searching the leaves that the query falls
+    into, i.e. one leaf per tree. The neighbours within a radius are exact, as the
+    planners that rewire their neighbourhoods rely on finding all of them, and are
+    only searched among the configurations whose projections onto the first
+    direction are within the radius. A forest of at most
+    :data:`RPFOREST_EXACT_SIZE` configurations is searched exactly instead.
+
+    For a metric that wraps around, the trees are built over the configurations
+    that are embedded onto circles, where nearby angles stay nearby.
+
+    :param data: the configurations, one per row
+    :param num_trees: the number of trees
+    :param leaf_size: the least number of configurations within each leaf
+    :param rng: the random generator of the directions
+    :param period: the period of each dimension if the metric wraps around
+    """
+
+    def __init__(
+        self,
+        data: np.ndarray,
+        num_trees: int,
+        leaf_size: int,
+        rng: np.random.Generator,
+        period: typing.Optional[float] = None,
+    ):
+        self.data = data
+        self.n = len(data)
+        self.period = period
+        self.depth = 0
+        if self.n > RPFOREST_EXACT_SIZE:
+            self.depth = max(0, math.floor(math.log2(self.n / leaf_size)))
+        features = self._features(data)
+        directions = rng.standard_normal((num_trees, self.depth, features.shape[1]))
+        self._directions = directions / np.linalg.norm(
+            directions, axis=2, keepdims=True
+        )
+        # the split of each node of each tree, stored as a binary heap
+        self._thresholds = np.empty((num_trees, 2 ** self.depth - 1))
+        # the configurations of each tree in the order of their leaves
+        self._orders: np.ndarray
+
+        # the nodes of each level split at the same positions in every tree
+        level_bounds = [np.array([0, self.n])]
+        for _ in range(self.depth):
+            bounds = level_bounds[-1]
+            split_bounds = np.empty(2 * len(bounds) - 1, dtype=int)
+            split_bounds[0::2] = bounds
+            split_bounds[1::2] = (bounds[:-1] + bounds[1:]) // 2
+            level_bounds.append(split_bounds)
+        self._leaf_bounds = level_bounds[-1]
+
+        # the projections of each configuration onto the direction of each level
+        level_projections = np.einsum("nd,tld->tln", features, self._directions)
+        # larger than the range of the projections, which keeps the nodes apart
+        span = 2 * np.abs(level_projections).max(initial=0) + 1
+        # all of the trees are split level by level at once
+        orders = np.tile(np.arange(self.n), (num_trees, 1))
+        for level in range(self.depth):
+            bounds = level_bounds[level]
+            nodes = np.repeat(np.arange(len(bounds) - 1), np.diff(bounds))
+            projections = np.take_along_axis(
+                level_projections[:, level], orders, axis=1
+            )
+            # sort the configurations of each node by their projections, where the
+            # nodes are already in order
+            by_projection = np.argsort(projections + nodes * span, axis=1)
+            orders = np.take_along_axis(orders, by_projection, axis=1)
+            projections = np.take_along_axis(projections, by_projection, axis=1)
+            mids = level_bounds[level + 1][1::2]
+            self._thresholds[:, 2 ** level - 1 : 2 ** (level + 1) - 1] = (
+                projections[:, mids - 1] + projections[:, mids]
+            ) / 2
+        self._orders = orders
+        if self.depth > 0:
+            # the configurations sorted by their projections onto the first direction
+            projections = level_projections[0, 0]
+            self._ball_order = np.argsort(projections, kind="stable")
+            self._ball_projections = projections[self._ball_order]
+        # much cheaper to descend the trees with plain floats
+        self._threshold_lists = self._thresholds.tolist()
+
+    def _features(self, poses: np.ndarray) -> np.ndarray:
+        """Return the coordinates of the given configurations that the trees split
+
+        :param poses: the configurations
+
+        """
+        if self.period is None:
+            return poses
+        # the chord between two points on a circle is never longer than the arc
+        angles = poses * (2 * np.pi / self.period)
+        radius = self.period / (2 * np.pi)
+        return np.concatenate([np.cos(angles), np.sin(angles)], axis=-1) * radius
+
+    def _leaf_candidates(self, trees: np.ndarray, leaves: np.ndarray) -> np.ndarray:
+        """Return the configurations within the given leaves
+
+        :param trees: the index of the tree of each leaf
+        :param leaves: the index of each leaf within its tree
+
+        """
+        return np.concatenate(
+            [
+                self._orders[tree, start:end]
+                for tree, start, end in zip(
+                    trees.tolist(),
+                    self._leaf_bounds[leaves].tolist(),
+                    self._leaf_bounds[leaves + 1].tolist(),
+                )
+            ]
+        )
+
+    def _candidates(self, pos: np.ndarray) -> np.ndarray:
+        """Find the configurations within the leaves that the given configuration
+        falls into
+
+        :param pos: the configuration to query
+
+        :return: the indices of the configurations, which may repeat
+        """
+        if self.depth == 0:
+            return np.arange(self.n)
+        projections = (self._directions @ self._features(pos)).tolist()
+        leaves = []
+        for thresholds, tree_projections in zip(self._threshold_lists, projections):
+            node = 0
+            for projection in tree_projections:
+                node = 2 * node + (2 if projection > thresholds[node] else 1)
+            leaves.append(node)
+        leaves = np.array(leaves) - (2 ** self.depth - 1)
+        return self._leaf_candidates(np.arange(len(leaves)), leaves)
+
+    def query(self, pos: np.ndarray, k: int = 1):
+        """Find the approximately ``k`` nearest configurations
+
+        :param pos: the configuration to query
+        :param k: the number of configurations to find
+
+        :return: the distances and the indices of the configurations, from the
+            nearest to the farthest, which are scalars if ``k`` is 1
+        """
+        candidates = self._candidates(pos)
+        if k == 1:
+            candidate_distances = distances(self.data[candidates], pos, self.period)
+            i = np.argmin(candidate_distances)
+            return candidate_distances[i], candidates[i]
+        candidates = np.unique(candidates)
+        candidate_distances = distances(self.data[candidates], pos, self.period)
+        nearest = np.argsort(candidate_distances, kind="stable")[:k]
+        return candidate_distances[nearest], candidates[nearest]
+
+    def query_ball_point(self, pos: np.ndarray, r: float) -> typing.List[int]:
+        """Find the configurations within a radius (inclusive)
+
+        :param pos: the configuration to query
+        :param r: the radius of the neighbourhood
+
+        :return: the indices of the configurations within the radius
+        """
+        if self.depth == 0:
+            candidates = np.arange(self.n)
+        else:
+            # Neither embedding the angles onto circles nor projecting onto a unit
+            # direction increases the distances, hence the configurations whose
+            # projections are further away than the radius are outside of it.
+            projection = float(self._directions[0, 0] @ self._features(pos))
+            # widened against round-off, as the distances are checked exactly
+            r_window = r + 1e-9 * (abs(projection) + r + 1)
+            start = np.searchsorted(self._ball_projections, projection - r_window)
+            end = np.searchsorted(
+                self._ball_projections, projection + r_window, side="right"
+            )
+            candidates = np.sort(self._ball_order[start:end])
+        return candidates[
+            distances(self.data[candidates], pos, self.period) <= r
+        ].tolist()
+
+
+class RPForestIndex(KDTreeIndex):
+    """An approximate index, which is a :class:`KDTreeIndex` whose static trees are
+    :class:`RandomProjectionForest` instead. Each nearest neighbour query descends
+    one path per tree, hence its cost grows with the number of trees and the leaf
+    size, and only logarithmically with the number of configurations, regardless
+    of the number of dimensions where k-d trees degrade to checking most
+    configurations. The most recently added configurations in the buffer are
+    always checked exactly. The queries of the neighbours within a radius (e.g.
+    the choose-parent and rewire steps of RRT*) are exact, but they check a slab
+    of the configurations around the query, whose share grows with the radius.
+
+    :param num_dim: the number of dimensions of the configurations
+    :param num_trees: the number of trees of each forest, which trades the query
+        time for the recall of the nearest neighbours
+    :param leaf_size: the least number of configurations within each leaf, which
+        trades the query time for the recall of the nearest neighbours
+    :param buffer_size: the number of configurations that are kept in the buffer
+    :param period: the period of each dimension if the metric wraps around
+    :param seed: the random seed of the directions of the trees
+    """
+
+    def __init__(
+        self,
+        num_dim: int,
+        num_trees: int = RPFOREST_NUM_TREES,
+        leaf_size: int = RPFOREST_LEAF_SIZE,
+        buffer_size: int = KDTREE_BUFFER_SIZE,
+        period: typing.Optional[float] = None,
+        seed: int = 0,
+    ):
+        super().__init__(num_dim, buffer_size=buffer_size, period=period)
+        if num_trees < 1 or leaf_size < 1:
+            raise ValueError(
+                f"The number of trees and the leaf size must be positive, got "
+                f"{num_trees} and {leaf_size}"
+            )
+        self.num_trees = num_trees
+        self.leaf_size = leaf_size
+        # independent of the global random state, which the samplers use
+        self._rng = np.random.default_rng(seed)
+
+    def _build(self, start, end):
+        return RandomProjectionForest(
+            self._poses[start:end],
+            self.num_trees,
+            self.leaf_size,
+            self._rng,
+            period=self.period,
+        )
+
+    def _tree_pos(self, pos):
+        # the forests embed the configurations themselves
+        return pos
+
+    def nearest(self, pos):
+        # much cheaper than the radius queries of the smaller forests
+        best, best_distance = -1, np.inf
+        for forest, start in self._trees:
+            distance, i = forest.query(pos)
+            if distance < best_distance:
+                best, best_distance = start + i, distance
+        buffer_distances = self._buffer_distances(pos)
+        if len(buffer_distances):
+            i = int(np.argmin(buffer_distances))
+            if buffer_distances[i] < best_distance:
+                best = self._buffer_start + i
+        if best < 0:
+            raise ValueError("The index is empty")
+        return int(best)
+
+
+class GridIndex(NearestNeighbourIndex):
+    """A uniform grid of cells, which is stored as a hash table from the coordinates
+    of each non-empty cell to the indices of the configurations within it. Adding a
+    configuration takes constant time. When the cell size is comparable to the
+    radius of the neighbourhood queries (as the planners do), a radius query only
+    visits the :math:`3^d` cells around the configuration, which takes constant
+    expected time for configurations of a bounded workspace, e.g. the image of the
+    ``image`` engine.
+
+    The nearest neighbours are searched ring by ring of cells around the
+    configuration, until no unvisited cell could contain a nearer configuration.
+    Whenever a search would visit more cells than there are configurations (e.g.
+    for a small tree), it computes the distances to all configurations instead.
+
+    :param num_dim: the number of dimensions of the configurations
+    :param cell_size: the length of the sides of each cell
+    """
+
+    def __init__(self, num_dim: int, cell_size: float):
+        super().__init__(num_dim)
+        if cell_size <= 0:
+            raise ValueError(f"The cell size must be positive, got {cell_size}")
+        self.cell_size = cell_size
+        self._cells: typing.Dict[typing.Tuple[int, ...], typing.List[int]] = {}
+
+    def _cell(self, pos: typing.List[float]) -> typing.Tuple[int, ...]:
+        return tuple(math.floor(x / self.cell_size) for x in pos)
+
+    def _added(self, num_added):
+        start = self._size - num_added
+        cells = np.floor(self._poses[start : self._size] / self.cell_size)
+        for i, cell in enumerate(cells.astype(int).tolist(), start=start):
+            self._cells.setdefault(tuple(cell), []).append(i)
+
+    def _candidates(
+        self, pos: np.ndarray, k: int
+    ) -> typing.Tuple[np.ndarray, np.ndarray]:
+        """Find the candidates that include the ``k`` nearest configurations
+
+        :param pos: the configuration to query
+        :param k: the number of configurations to find
+
+        :return: the sorted indices of the candidates, and their distances
+        """
+        coordinates = pos.tolist()
+        centre = self._cell(coordinates)
+        # the distances from the configuration to the lower and the upper sides of
+        # its own cell
+        margins = [
+            *(x - c * self.cell_size for x, c in zip(coordinates, centre)),
+            *((c + 1) * self.cell_size - x for x, c in zip(coordinates, centre)),
+        ]
+        margin = min(margins)
+        candidates = []
+        ring = 0
+        while (2 * ring + 1) ** self.num_dim <= self._size:
+            num_candidates = len(candidates)
+            for offset in _ring_offsets(self.num_dim, ring):
+                cell = tuple(map(operator.add, centre, offset))
+                candidates.extend(self._cells.get(cell, ()))
+            if len(candidates) >= k and len(candidates) > num_candidates:
+                candidate_distances = self.distances(candidates, pos)
+                kth_distance = np.partition(candidate_distances, k - 1)[k - 1]
+                # every configuration of the unvisited cells is at least this far
+                bound = margin + ring * self.cell_size
+                if kth_distance * (1 + GRID_TOLERANCE) < bound:
+                    order = np.argsort(candidates)
+                    return (
+                        np.asarray(candidates, dtype=int)[order],
+                        candidate_distances[order],
+                    )
+            ring += 1
+        candidates = np.arange(self._size)
+        return candidates, self.distances(candidates, pos)
+
+    def nearest(self, pos):
+        if self._size == 0:
+            raise ValueError("The index is empty")
+        candidates, distances = self._candidates(np.asarray(pos, dtype=float), 1)
+        return int(candidates[np.argmin(distances)])
+
+    def knn(self, pos, k):
+        if self._size == 0 or k < 1:
+            return np.empty(0, dtype=int)
+        candidates, distances = self._candidates(
+            np.asarray(pos, dtype=float), min(k, self._size)
+        )
+        return candidates[np.argsort(distances, kind="stable")[:k]]
+
+    def within_radius(self, pos, radius):
+        pos = np.asarray(pos, dtype=float)
+        coordinates = pos.tolist()
+        lower = self._cell([x - radius for x in coordinates])
+        upper = self._cell([x + radius for x in coordinates])
+        # math.prod is not available before Python 3.8
+        num_cells = np.prod([u - l + 1 for l, u in zip(lower, upper)], dtype=float)
+        if num_cells > self._size:
+            candidates = np.arange(self._size)
+        else:
+            candidates = np.asarray(
+                [
+                    i
+                    for cell in itertools.product(
+                        *(range(l, u + 1) for l, u in zip(lower, upper))
+                    )
+                    for i in self._cells.get(cell, ())
+                ],
+                dtype=int,
+            )
+        return np.sort(candidates[self.distances(candidates, pos) <= radius])
+
+
+#: the supported nearest neighbour indices
+NN_INDICES = {
+    "brute": BruteForceIndex,
+    "kdtree": KDTreeIndex,
+    "rtree": RTreeIndex,
+    "grid": GridIndex,
+    "rpforest": RPForestIndex,
+}
+#: the indices whose nearest neighbours are approximate, although their neighbours
+#: within a radius are exact
+APPROXIMATE_NN_INDICES = ("rpforest",)
+#: the name that chooses an index from the engine of the environment
+AUTO_NN_INDEX = "auto"
+DEFAULT_NN_INDEX = "kdtree"
+
+
+def create_index(
+    name: typing.Optional[str],
+    num_dim: int,
+    engine: typing.Optional[str] = None,
+    radius: typing.Optional[float] = None,
+    num_trees: typing.Optional[int] = None,
+    leaf_size: typing.Optional[int] = None,
+) -> NearestNeighbourIndex:
+    """Create an empty nearest neighbour index
+
+    :param name: the name of the index in :data:`NN_INDICES`, or
+        :data:`AUTO_NN_INDEX` (also if it is ``None``) to choose the grid index for
+        the ``image`` engine and :data:`DEFAULT_NN_INDEX` otherwise
+    :param num_dim: the number of dimensions of the configurations
+    :param engine: the engine of the environment, whose metric wraps around if it
+        is in :data:`ENGINE_PERIODS`
+    :param radius: the radius of the neighbourhood queries of the planner, which
+        is the cell size of the grid index
+    :param num_trees: the number of trees of the random projection forest index,
+        defaults to :data:`RPFOREST_NUM_TREES` if it is ``None``
+    :param leaf_size: the leaf size of the random projection forest index, defaults
+        to :data:`RPFOREST_LEAF_SIZE` if it is ``None``
+
+    """
+    if name is None or name == AUTO_NN_INDEX:
+        name = "grid" if engine == "image" and radius else DEFAULT_NN_INDEX
+    try:
+        index_class = NN_INDICES[name]
+    except KeyError:
+        raise ValueError(
+            f"Unknown nearest neighbour index '{name}', supported indices are "
+            f"{[AUTO_NN_INDEX, *NN_INDICES]}"
+        )
+    kwargs = {}
+    period = ENGINE_PERIODS.get(engine)
+    if period is not None:
+        if not index_class.supports_period:
+            raise ValueError(
+                f"The nearest neighbour index '{name}' does not support the metric "
+                f"of the '{engine}' engine, which wraps around"
+            )
+        kwargs["period"] = period
+    if index_class is GridIndex:
+        if radius is None:
+            raise ValueError("The grid index requires the radius of the planner")
+        kwargs["cell_size"] = radius
+    elif index_class is RPForestIndex:
+        kwargs["num_trees"] = RPFOREST_NUM_TREES if num_trees is None else num_trees
+        kwargs["leaf_size"] = RPFOREST_LEAF_SIZE if leaf_size is None else leaf_size
+    return index_class(num_dim, **kwargs)
@@ -0,0 +1,320 @@
+#!/usr/bin/env python
+"""Convert an image into a tiled occupancy map, which the "image" and "4d" engines
+load by memory-mapping its tiles, such that maps larger than the physical memory
+can be used (see :class:`TiledOccupancy`).
+
+Image formats such as PNG can only be decoded as a whole, hence the image must
+fit in memory once while it is converted. A map that does not should be given as
+a 2D ``.npy`` array of grey levels (or booleans) instead, indexed as
+``[row, column]`` like the image, which is memory-mapped and read band by band.
+
+Usage:
+  tiled_map.py <IMAGE> <OUTPUT_DIR> [options]
+  tiled_map.py (-h | --help)
+
+Options:
+  -h --help              Show this screen.
+  --tile-size=SIZE       Number of pixels along each side of a tile.
+                         [default: 1024]
+"""
+import json
+import logging
+import os
+import typing
+
+import numpy as np
+
+LOGGER = logging.getLogger(__name__)
+
+HEADER_FILENAME = "header.json"
+TILED_MAP_FORMAT = "sbp-env-tiled-occupancy"
+TILED_MAP_VERSION = 1
+DEFAULT_TILE_SIZE = 1024
+
+
+def is_tiled_map(path) -> bool:
+    """Check if the given map is a folder of a tiled occupancy map.
+
+    :param path: the map, which might also be a file-like object
+
+    """
+    if not isinstance(path, (str, os.PathLike)):
+        return False
+    return os.path.isfile(os.path.join(path, HEADER_FILENAME))
+
+
+def _tile_filename(path: str, tx: int, ty: int) -> str:
+    return os.path.join(path, f"{tx}_{ty}.npy")
+
+
+def _write_band(
+    path: str, band: np.ndarray, ty: int, tile_size: int, uniform: typing.Dict
+):
+    """Write a band of tiles that share the same second tile index
+
+    :param path: the folder of the tiled map
+    :param band: the boolean occupancy of the band, indexed as ``[x, y]``
+    :param ty: the second tile index of the band
+    :param tile_size: the number of pixels along each side of a tile
+    :param uniform: the dictionary to record the tiles that are entirely free or
+        entirely blocked, which are not written to the disk
+    """
+    for tx in range(-(-band.shape[0] // tile_size)):
+        tile = band[tx * tile_size : (tx + 1) * tile_size]
+        if tile.all() or not tile.any():
+            uniform[f"{tx}_{ty}"] = bool(tile.flat[0])
+        else:
+            np.save(_tile_filename(path, tx, ty), np.packbits(tile, axis=1))
+
+
+def _write_header(path: str, shape: typing.Tuple[int, int], tile_size: int, uniform):
+    # written last, such that a partially converted map is never recognised
+    with open(os.path.join(path, HEADER_FILENAME), "w") as f:
+        json.dump(
+            dict(
+                format=TILED_MAP_FORMAT,
+                version=TILED_MAP_VERSION,
+                shape=list(shape),
+                tile_size=tile_size,
+                uniform=uniform,
+            ),
+            f,
+        )
+
+
+def save_tiled_occupancy(
+    free: np.ndarray, path: str, tile_size: int = DEFAULT_TILE_SIZE
+):
+    """Save an occupancy grid as a tiled map, where each tile is stored as a
+    bit-packed ``.npy`` file (packed along the second axis, as in
+    :class:`collisionChecker.PackedOccupancy`). Tiles that are entirely free or
+    entirely blocked are only recorded in the header.
+
+    :param free: the boolean occupancy grid where free pixels are True, indexed
+        as ``[x, y]``. Any array that supports slicing (e.g. a memory-mapped one)
+        could be used, as it is read one band of tiles at a time.
+    :param path: the folder to save the tiled map into
+    :param tile_size: the number of pixels along each side of a tile
+    """
+    os.makedirs(path, exist_ok=True)
+    w, h = free.shape
+    uniform = {}
+    for ty in range(-(-h // tile_size)):
+        band = np.asarray(free[:, ty * tile_size : (ty + 1) * tile_size], dtype=bool)
+        _write_band(path, band, ty, tile_size, uniform)
+    _write_header(path, (w, h), tile_size, uniform)
+
+
+def _convert_bands(
+    read_rows: typing.Callable[[int, int], np.ndarray],
+    size: typing.Tuple[int, int],
+    path: str,
+    tile_size: int,
+):
+    """Convert an image into a tiled map one band of tiles at a time, where only
+    white pixels are free
+
+    :param read_rows: read the grey levels of the rows within ``[top, bottom)`` of
+        the image, indexed as ``[row, column]``
+    :param size: the width and the height of the image
+    :param path: the folder to save the tiled map into
+    :param tile_size: the number of pixels along each side of a tile
+    """
+    os.makedirs(path, exist_ok=True)
+    w, h = size
+    uniform = {}
+    for ty in range(-(-h // tile_size)):
+        rows = read_rows(ty * tile_size, min((ty + 1) * tile_size, h))
+        # need to transpose because pygame has a difference coordinate system than
+        # matplotlib matrix
+        _write_band(path, (np.asarray(rows) == 255).T, ty, tile_size, uniform)
+    _write_header(path, (w, h), tile_size, uniform)
+
+
+def convert_image(img: typing.IO, path: str, tile_size: int = DEFAULT_TILE_SIZE):
+    """Convert an image into a tiled map, where only white pixels are free (the same
+    as :func:`collisionChecker.load_occupancy_image`). Each band of tiles is
+    converted to grey levels and thresholded on its own, but the image itself is
+    decoded as a whole by PIL, hence it must fit in memory (see
+    :func:`convert_array` otherwise).
+
+    :param img: a file-like object (e.g. a filename) for the image
+    :param path: the folder to save the tiled map into
+    :param tile_size: the number of pixels along each side of a tile
+    """
+    from PIL import Image
+
+    # city-scale maps are far larger than the decompression bomb limit of PIL, which
+    # is only lifted for this image
+    max_image_pixels, Image.MAX_IMAGE_PIXELS = Image.MAX_IMAGE_PIXELS, None
+    try:
+        image = Image.open(img)
+    finally:
+        Image.MAX_IMAGE_PIXELS = max_image_pixels
+    w, h = image.size
+    _convert_bands(
+        lambda top, bottom: image.crop((0, top, w, bottom)).convert("L"),
+        (w, h),
+        path,
+        tile_size,
+    )
+
+
+def convert_array(array_file: typing.IO, path: str, tile_size: int = DEFAULT_TILE_SIZE):
+    """Convert a ``.npy`` array of an image into a tiled map, where only white
+    pixels (or True ones of a boolean array) are free. The array is memory-mapped
+    and read one band of tiles at a time, such that maps larger than the memory
+    could be converted.
+
+    :param array_file: a file-like object (e.g. a filename) for the 2D array of
+        grey levels of the image, indexed as ``[row, column]``
+    :param path: the folder to save the tiled map into
+    :param tile_size: the number of pixels along each side of a tile
+    """
+    pixels = np.load(array_file, mmap_mode="r")
+    if pixels.ndim != 2:
+        raise ValueError(f"Expected a 2D array of an image, got {pixels.shape}")
+
+    def read_rows(top, bottom):
+        rows = pixels[top:bottom]
+        return rows.astype(np.uint8) * 255 if rows.dtype == bool else rows
+
+    h, w = pixels.shape
+    _convert_bands(read_rows, (w, h), path, tile_size)
+
+
+class TiledOccupancy:
+    """A read-only boolean occupancy grid that is stored as tiles on the disk (see
+    :func:`save_tiled_occupancy`). Each tile is memory-mapped when it is first
+    accessed, hence the operating system only pages in the parts of the map that
+    are being queried, and processes that plan on the same map share the page
+    cache.
+
+    It supports the same subset of array indexing as
+    :class:`collisionChecker.PackedOccupancy`, i.e., indexing with a pair of
+    integers or a pair of integer arrays, where negative indices wrap around.
+
+    :param path: the folder of the tiled map
+    """
+
+    def __init__(self, path: str):
+        with open(os.path.join(path, HEADER_FILENAME), "r") as f:
+            header = json.load(f)
+        if header.get("format") != TILED_MAP_FORMAT:
+            raise ValueError(f"'{path}' is not a tiled occupancy map")
+        if header.get("version") != TILED_MAP_VERSION:
+            raise ValueError(
+                f"Unsupported tiled map version {header.get('version')} in '{path}'"
+            )
+        self.path = path
+        self.shape = tuple(header["shape"])
+        self.dtype = np.dtype(bool)
+        self.tile_size = int(header["tile_size"])
+        self._num_tiles_y = -(-self.shape[1] // self.tile_size)
+        self._tiles = {}
+        for key, value in header["uniform"].items():
+            tx, ty = map(int, key.split("_"))
+            self._tiles[tx, ty] = bool(value)
+
+    def _tile(self, tx: int, ty: int) -> typing.Union[bool, np.ndarray]:
+        """Get a tile, which is either a bool for uniform tiles or the memory-mapped
+        bit-packed tile
+
+        :param tx: the first tile index
+        :param ty: the second tile index
+
+        """
+        tile = self._tiles.get((tx, ty))
+        if tile is None:
+            tile = np.load(_tile_filename(self.path, tx, ty), mmap_mode="r")
+            # a plain view of the mapped memory avoids the overhead of np.memmap
+            tile = tile.view(np.ndarray)
+            self._tiles[tx, ty] = tile
+        return tile
+
+    def _lookup(self, tx: int, ty: int, xs, ys):
+        """Look up pixels within the same tile
+
+        :param tx: the first tile index
+        :param ty: the second tile index
+        :param xs: the first pixel coordinates within the tile
+        :param ys: the second pixel coordinates within the tile
+
+        """
+        tile = self._tile(tx, ty)
+        if isinstance(tile, bool):
+            return np.full(np.shape(xs), tile)
+        return (tile[xs, ys >> 3] >> (7 - (ys & 7)) & 1).astype(bool)
+
+    def __getitem__(self, index):
+        x, y = index
+        w, h = self.shape
+        if isinstance(x, (int, np.integer)) and isinstance(y, (int, np.integer)):
+            # fast path for checking a single pixel
+            if not (-w <= x < w and -h <= y < h):
+                raise IndexError(f"index {(x, y)} is out of bounds for {self.shape}")
+            x, y = int(x) % w, int(y) % h
+            tx, ty = x // self.tile_size, y // self.tile_size
+            return self._lookup(
+                tx, ty, x - tx * self.tile_size, y - ty * self.tile_size
+            )[()]
+        x, y = np.asarray(x), np.asarray(y)
+        if x.shape != y.shape:
+            x, y = np.broadcast_arrays(x, y)
+        if x.size == 0:
+            return np.zeros(x.shape, dtype=bool)
+        xmin, xmax, ymin, ymax = x.min(), x.max(), y.min(), y.max()
+        if xmin < -w or xmax >= w or ymin < -h or ymax >= h:
+            raise IndexError(f"index out of bounds for {self.shape}")
+        if xmin < 0 or ymin < 0:
+            x, y = x % w, y % h
+            xmin, xmax, ymin, ymax = x.min(), x.max(), y.min(), y.max()
+        s = self.tile_size
+        tx, ty = xmin // s, ymin // s
+        if tx == xmax // s and ty == ymax // s:
+            # most lines lie within a single tile
+            return self._lookup(int(tx), int(ty), x - tx * s, y - ty * s)
+        tx, ty = x // s, y // s
+        xs, ys = x - tx * s, y - ty * s
+        keys = tx * self._num_tiles_y + ty
+        free = np.empty(x.shape, dtype=bool)
+        for key in np.unique(keys):
+            in_tile = keys == key
+            free[in_tile] = self._lookup(
+                *divmod(int(key), self._num_tiles_y), xs[in_tile], ys[in_tile]
+            )
+        return free
+
+    def unpack(self) -> np.ndarray:
+        """Load the whole occupancy grid into memory
+
+        :return: the boolean occupancy grid where free pixels are True
+        """
+        free = np.empty(self.shape, dtype=bool)
+        s = self.tile_size
+        for tx in range(-(-self.shape[0] // s)):
+            for ty in range(self._num_tiles_y):
+                block = free[tx * s : (tx + 1) * s, ty * s : (ty + 1) * s]
+                tile = self._tile(tx, ty)
+                if isinstance(tile, bool):
+                    block[...] = tile
+                else:
+                    block[...] = np.unpackbits(tile, axis=1, count=block.shape[1]).view(
+                        bool
+                    )
+        return free
+
+    def __array__(self, dtype=None):
+        free = self.unpack()
+        return free if dtype is None else free.astype(dtype)
+
+
+if __name__ == "__main__":
+    from docopt import docopt
+
+    args = docopt(__doc__)
+    if args["<IMAGE>"].endswith(".npy"):
+        convert = convert_array
+    else:
+        convert = convert_image
+    convert(args["<IMAGE>"], args["<OUTPUT_DIR>"], int(args["--tile-size"]))
@@ -403,7 +403,7 @@ class PygameEnvVisualiser(BaseEnvVisualiser):
                     mouse_pos = np.array(e.pos) / self.args.scaling
                     from collisionChecker import RobotArm4dCollisionChecker
 
-                    if type(self.cc) == RobotArm4dCollisionChecker:
+                    if type(self.cc.unwrapped) == RobotArm4dCollisionChecker:
                         mouse_pos = np.array(
                             [*mouse_pos, *np.random.uniform(-np.pi, np.pi, 2)]
                         )
@@ -527,7 +527,7 @@ class PygameEnvVisualiser(BaseEnvVisualiser):
 
         import collisionChecker
 
-        if type(self.cc) == collisionChecker.RobotArm4dCollisionChecker:
+        if type(self.cc.unwrapped) == collisionChecker.RobotArm4dCollisionChecker:
             self.draw_stick_robot(node1, layer=self.path_layers)
         else:
             pygame.draw.line(